@@ -0,0 +1,18 @@
+"""
+Shared pytest setup.
+"""
+from importlib import import_module
+
+import pytest
+from django.db import connection
+
+
+@pytest.fixture(scope='session')
+def django_db_setup(django_db_setup, django_db_blocker):
+    """
+    --nomigrations builds the test database from the models, which skips the
+    RunPython that creates the full-text search structures; apply it here.
+    """
+    migration = import_module('heddiekitchen.menu.migrations.0009_search_index')
+    with django_db_blocker.unblock(), connection.schema_editor() as schema_editor:
+        migration.create_search_index(None, schema_editor)
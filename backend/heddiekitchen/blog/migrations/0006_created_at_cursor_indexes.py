@@ -0,0 +1,21 @@
+# Generated by Django 4.2.11 on 2026-10-17 17:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0005_alter_blogcomment_is_approved'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='blogcomment',
+            index=models.Index(fields=['-created_at', '-id'], name='blog_blogco_created_8456f6_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='blogcomment',
+            index=models.Index(fields=['post', '-created_at'], name='blog_blogco_post_id_c2d8e4_idx'),
+        ),
+    ]
@@ -32,6 +32,7 @@ class BlogPost(models.Model):
     category = models.ForeignKey(BlogCategory, on_delete=models.SET_NULL, null=True, blank=True)
     tags = models.ManyToManyField(BlogTag, related_name='posts')
     featured_image = models.ImageField(upload_to='blog/')
+    featured_image_derivatives = models.JSONField(default=dict, blank=True, editable=False)
     excerpt = models.TextField(max_length=500)
     body = models.TextField(help_text='Markdown supported')
     meta_description = models.CharField(max_length=160, blank=True)
@@ -66,6 +67,10 @@ class BlogComment(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['-created_at', '-id']),
+            models.Index(fields=['post', '-created_at']),
+        ]
 
     def __str__(self):
         return f"Comment by {self.author} on {self.post.title}"
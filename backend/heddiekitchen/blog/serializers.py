@@ -1,4 +1,7 @@
 from rest_framework import serializers
+from heddiekitchen.core.images import build_srcset
+from heddiekitchen.core.media import media_url
+from heddiekitchen.serializers import DynamicFieldsMixin
 from .models import BlogCategory, BlogTag, BlogPost, BlogComment, BlogPostLike, BlogCommentLike, BlogPostView
 
 
@@ -85,18 +88,19 @@ class BlogCommentSerializer(serializers.ModelSerializer):
         return ip
 
 
-class BlogPostListSerializer(serializers.ModelSerializer):
+class BlogPostListSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     category_name = serializers.StringRelatedField(source='category.name', read_only=True)
     tags = BlogTagSerializer(many=True, read_only=True)
     comment_count = serializers.SerializerMethodField()
     like_count = serializers.SerializerMethodField()
     featured_image_url = serializers.SerializerMethodField()
+    featured_image_srcset = serializers.SerializerMethodField()
     author_name = serializers.SerializerMethodField()
     is_liked = serializers.SerializerMethodField()
     
     class Meta:
         model = BlogPost
-        fields = ['id', 'title', 'slug', 'excerpt', 'featured_image', 'featured_image_url', 
+        fields = ['id', 'title', 'slug', 'excerpt', 'featured_image', 'featured_image_url', 'featured_image_srcset', 
                   'category_name', 'tags', 'author', 'author_name', 'created_at', 
                   'view_count', 'comment_count', 'like_count', 'is_liked', 'is_published', 'publish_date']
         read_only_fields = ['slug', 'view_count', 'created_at']
@@ -127,14 +131,10 @@ class BlogPostListSerializer(serializers.ModelSerializer):
         return ip
     
     def get_featured_image_url(self, obj):
-        request = self.context.get('request')
-        if obj.featured_image and request:
-            url = obj.featured_image.url
-            # If URL is already absolute (Cloudinary), return as-is
-            if url.startswith('http://') or url.startswith('https://'):
-                return url
-            return request.build_absolute_uri(url)
-        return None
+        return media_url(obj.featured_image, self.context.get('request'))
+    
+    def get_featured_image_srcset(self, obj):
+        return build_srcset(obj.featured_image, self.context.get('request'))
     
     def get_author_name(self, obj):
         if obj.author:
@@ -142,12 +142,13 @@ class BlogPostListSerializer(serializers.ModelSerializer):
         return None
 
 
-class BlogPostDetailSerializer(serializers.ModelSerializer):
+class BlogPostDetailSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
+    """Post detail; the comment thread is only included with ?expand=comments."""
     category = BlogCategorySerializer(read_only=True)
     tags = BlogTagSerializer(many=True, read_only=True)
-    comments = serializers.SerializerMethodField()
     author_email = serializers.StringRelatedField(source='author.email', read_only=True)
     featured_image_url = serializers.SerializerMethodField()
+    featured_image_srcset = serializers.SerializerMethodField()
     author_name = serializers.SerializerMethodField()
     like_count = serializers.SerializerMethodField()
     is_liked = serializers.SerializerMethodField()
@@ -155,11 +156,14 @@ class BlogPostDetailSerializer(serializers.ModelSerializer):
     
     class Meta:
         model = BlogPost
-        fields = ['id', 'title', 'slug', 'excerpt', 'body', 'featured_image', 'featured_image_url',
+        fields = ['id', 'title', 'slug', 'excerpt', 'body', 'featured_image', 'featured_image_url', 'featured_image_srcset',
                   'category', 'tags', 'author', 'author_name', 'author_email', 'meta_description',
                   'meta_keywords', 'created_at', 'updated_at', 'view_count', 
-                  'comments', 'like_count', 'is_liked', 'share_url', 'is_published', 'publish_date']
+                  'like_count', 'is_liked', 'share_url', 'is_published', 'publish_date']
         read_only_fields = ['slug', 'view_count', 'created_at', 'updated_at']
+        expandable_fields = {
+            'comments': (serializers.SerializerMethodField, {}),
+        }
     
     def get_comments(self, obj):
         # Get top-level comments only (no parent)
@@ -195,14 +199,10 @@ class BlogPostDetailSerializer(serializers.ModelSerializer):
         return None
     
     def get_featured_image_url(self, obj):
-        request = self.context.get('request')
-        if obj.featured_image and request:
-            url = obj.featured_image.url
-            # If URL is already absolute (Cloudinary), return as-is
-            if url.startswith('http://') or url.startswith('https://'):
-                return url
-            return request.build_absolute_uri(url)
-        return None
+        return media_url(obj.featured_image, self.context.get('request'))
+    
+    def get_featured_image_srcset(self, obj):
+        return build_srcset(obj.featured_image, self.context.get('request'))
     
     def get_author_name(self, obj):
         if obj.author:
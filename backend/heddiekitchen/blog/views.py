@@ -4,6 +4,7 @@ from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
 from django.utils import timezone
 from .models import BlogCategory, BlogTag, BlogPost, BlogComment, BlogPostLike, BlogCommentLike, BlogPostView
+from heddiekitchen.pagination import CreatedAtCursorPagination
 from .serializers import (
     BlogCategorySerializer, BlogTagSerializer, BlogPostListSerializer,
     BlogPostDetailSerializer, BlogCommentSerializer
@@ -44,7 +45,8 @@ class BlogPostViewSet(viewsets.ModelViewSet):
         queryset = BlogPost.objects.all()
         if self.action in ['list', 'retrieve']:
             queryset = queryset.filter(is_published=True)
-        return queryset.select_related('category', 'author').prefetch_related('tags', 'comments')
+        # Comments are fetched by the detail serializer only when expanded
+        return queryset.select_related('category', 'author').prefetch_related('tags')
     
     def get_serializer_class(self):
         if self.action == 'retrieve':
@@ -150,6 +152,10 @@ class BlogCommentViewSet(viewsets.ModelViewSet):
     queryset = BlogComment.objects.all()
     serializer_class = BlogCommentSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
+    pagination_class = CreatedAtCursorPagination
+    filterset_fields = ['post', 'parent', 'is_approved']
+    ordering_fields = ['created_at']
+    ordering = ['-created_at', '-id']
     
     def _get_client_ip(self, request):
         x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.11 on 2026-10-17 18:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catering', '0004_alter_cateringpackage_menu_options'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cateringpackageimage',
+            name='image_derivatives',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+    ]
@@ -75,6 +75,7 @@ class CateringPackageImage(models.Model):
     """Gallery images for catering packages."""
     package = models.ForeignKey(CateringPackage, on_delete=models.CASCADE, related_name='gallery')
     image = models.ImageField(upload_to='catering/packages/')
+    image_derivatives = models.JSONField(default=dict, blank=True, editable=False)
     caption = models.CharField(max_length=255, blank=True)
     uploaded_at = models.DateTimeField(auto_now_add=True)
 
@@ -1,4 +1,6 @@
 from rest_framework import serializers
+from heddiekitchen.core.images import build_srcset
+from heddiekitchen.core.media import media_url
 from .models import (
     CateringCategory,
     CateringPackage,
@@ -17,25 +19,19 @@ class CateringCategorySerializer(serializers.ModelSerializer):
 
 class CateringPackageImageSerializer(serializers.ModelSerializer):
     image_url = serializers.SerializerMethodField()
+    image_srcset = serializers.SerializerMethodField()
     
     class Meta:
         model = CateringPackageImage
-        fields = ['id', 'image', 'image_url', 'caption', 'uploaded_at']
+        fields = ['id', 'image', 'image_url', 'image_srcset', 'caption', 'uploaded_at']
         read_only_fields = ['id', 'uploaded_at']
     
     def get_image_url(self, obj):
         """Get absolute URL for the image (handles Cloudinary URLs)."""
-        if obj.image:
-            url = obj.image.url
-            # If URL is already absolute (Cloudinary), return as-is
-            if url.startswith('http://') or url.startswith('https://'):
-                return url
-            # Otherwise, make it absolute using request
-            request = self.context.get('request')
-            if request:
-                return request.build_absolute_uri(url)
-            return url
-        return None
+        return media_url(obj.image, self.context.get('request'))
+    
+    def get_image_srcset(self, obj):
+        return build_srcset(obj.image, self.context.get('request'))
 
 
 class CateringPackageSerializer(serializers.ModelSerializer):
@@ -3,7 +3,7 @@ Admin configuration for core app.
 """
 from django.contrib import admin
 from django.contrib.auth.models import User
-from heddiekitchen.core.models import SiteAsset, UserProfile, Newsletter, Contact
+from heddiekitchen.core.models import SiteAsset, UserProfile, Newsletter, Contact, IdempotencyKey
 
 
 @admin.register(SiteAsset)
@@ -86,3 +86,16 @@ class ContactAdmin(admin.ModelAdmin):
     def has_add_permission(self, request):
         """Contact submissions are created via API only."""
         return False
+
+
+@admin.register(IdempotencyKey)
+class IdempotencyKeyAdmin(admin.ModelAdmin):
+    """Read-only view of stored Idempotency-Key responses."""
+    list_display = ['key', 'scope', 'owner', 'status', 'response_status', 'created_at']
+    list_filter = ['scope', 'status']
+    search_fields = ['key', 'owner']
+    readonly_fields = [field.name for field in IdempotencyKey._meta.fields]
+
+    def has_add_permission(self, request):
+        """Keys are recorded by the API only."""
+        return False
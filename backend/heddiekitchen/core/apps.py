@@ -13,3 +13,14 @@ class CoreConfig(AppConfig):
         Import signals when app is ready.
         """
         import heddiekitchen.core.signals
+        from django.apps import apps
+        from django.db.models.signals import post_save
+        from heddiekitchen.core.images import IMAGE_FIELDS, make_derivatives_receiver
+
+        for label, field_name in IMAGE_FIELDS:
+            post_save.connect(
+                make_derivatives_receiver(field_name),
+                sender=apps.get_model(label),
+                weak=False,
+                dispatch_uid=f'image_derivatives_{label}_{field_name}',
+            )
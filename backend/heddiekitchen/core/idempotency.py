@@ -0,0 +1,159 @@
+"""
+Idempotency-Key support for endpoints that must not run twice.
+
+Clients send ``Idempotency-Key: <uuid>`` with checkout and payment
+initialization. The first request with a key claims it by inserting an
+in-progress IdempotencyKey row (the unique constraint makes the claim
+atomic), runs, and stores its response. A repeat of the same request gets
+the stored response back with ``Idempotent-Replayed: true``. A repeat that
+arrives while the first is still running polls for up to
+IDEMPOTENCY_WAIT_SECONDS and then replays, or answers 409 so the client
+retries. Reusing a key for a different request is a 422.
+
+Keys are scoped per endpoint and per user; a guest is identified by their
+cart token or session, and a guest with neither runs without the key. Only a 2xx response is stored:
+any other response, or an exception, releases the key so the request can be
+retried once the client has fixed it. A claim not finished within
+IDEMPOTENCY_LOCK_TIMEOUT seconds is treated as abandoned and taken over.
+Keys expire after IDEMPOTENCY_KEY_TTL seconds and are deleted by
+``manage.py prune_idempotency_keys``.
+"""
+import hashlib
+import json
+import time
+from datetime import timedelta
+from functools import wraps
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+from heddiekitchen.core.models import IdempotencyKey
+from heddiekitchen.orders.cart_store import request_cart_token
+
+HEADER = 'Idempotency-Key'
+REPLAY_HEADER = 'Idempotent-Replayed'
+MAX_KEY_LENGTH = 255
+KEY_TTL = getattr(settings, 'IDEMPOTENCY_KEY_TTL', 60 * 60 * 24)
+LOCK_TIMEOUT = getattr(settings, 'IDEMPOTENCY_LOCK_TIMEOUT', 60)
+WAIT_SECONDS = getattr(settings, 'IDEMPOTENCY_WAIT_SECONDS', 10)
+POLL_INTERVAL = 0.1
+
+
+def request_fingerprint(request):
+    """SHA-256 of the method, path and body, so a key cannot be replayed for a different request."""
+    body = json.dumps(request.data, sort_keys=True, default=str)
+    return hashlib.sha256(f'{request.method} {request.path}\n{body}'.encode()).hexdigest()
+
+
+def _owner(request):
+    """
+    Who the key belongs to, or None for a guest we cannot tell apart from
+    other guests: sharing one owner would replay one guest's order to another.
+    """
+    if request.user.is_authenticated:
+        return f'user:{request.user.pk}'
+    token = request_cart_token(request)
+    if token:
+        return f'cart:{token}'
+    session_key = request.session.session_key
+    return f'session:{session_key}' if session_key else None
+
+
+def _claim(scope, owner, key, fingerprint):
+    """
+    Claim ``key`` for this request. Returns (record, claimed); record is None
+    if another request released the key between our insert and read.
+    """
+    try:
+        with transaction.atomic():
+            return IdempotencyKey.objects.create(scope=scope, owner=owner, key=key, fingerprint=fingerprint), True
+    except IntegrityError:
+        pass
+
+    record = IdempotencyKey.objects.filter(scope=scope, owner=owner, key=key).first()
+    if record is None:
+        return None, False
+    now = timezone.now()
+    abandoned = record.status == 'in_progress' and record.updated_at < now - timedelta(seconds=LOCK_TIMEOUT)
+    expired = record.created_at < now - timedelta(seconds=KEY_TTL)
+    if abandoned or expired:
+        # Conditional on updated_at, so only one of several waiting requests takes it over
+        taken = IdempotencyKey.objects.filter(pk=record.pk, updated_at=record.updated_at).update(
+            fingerprint=fingerprint, status='in_progress', response_status=None, response_body=None,
+            created_at=now, updated_at=now,
+        )
+        if taken:
+            record.fingerprint, record.status = fingerprint, 'in_progress'
+            return record, True
+    return record, False
+
+
+def _replay(record):
+    return Response(record.response_body, status=record.response_status, headers={REPLAY_HEADER: 'true'})
+
+
+def idempotent(scope):
+    """
+    Honour the Idempotency-Key header on a viewset action. Requests without
+    the header run as before.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(self, request, *args, **kwargs):
+            key = request.headers.get(HEADER)
+            if not key:
+                return view(self, request, *args, **kwargs)
+            if len(key) > MAX_KEY_LENGTH:
+                return Response(
+                    {'error': f'{HEADER} must be at most {MAX_KEY_LENGTH} characters'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+
+            owner = _owner(request)
+            if owner is None:
+                return view(self, request, *args, **kwargs)
+            fingerprint = request_fingerprint(request)
+            deadline = time.monotonic() + WAIT_SECONDS
+            while True:
+                record, claimed = _claim(scope, owner, key, fingerprint)
+                if claimed:
+                    break
+                # record is None when the holder released the key between our insert and read
+                if record is not None and record.fingerprint != fingerprint:
+                    return Response(
+                        {'error': f'{HEADER} was already used for a different request'},
+                        status=status.HTTP_422_UNPROCESSABLE_ENTITY
+                    )
+                if record is not None and record.status == 'completed':
+                    return _replay(record)
+                if time.monotonic() >= deadline:
+                    return Response(
+                        {'error': f'A request with this {HEADER} is still in progress'},
+                        status=status.HTTP_409_CONFLICT, headers={'Retry-After': '1'}
+                    )
+                time.sleep(POLL_INTERVAL)
+
+            try:
+                response = view(self, request, *args, **kwargs)
+            except Exception:
+                record.delete()
+                raise
+            if not status.is_success(response.status_code):
+                # A 400 or 409 may succeed on retry (cart filled, stock back), so do not pin it
+                record.delete()
+            else:
+                IdempotencyKey.objects.filter(pk=record.pk).update(
+                    status='completed', response_status=response.status_code, response_body=response.data,
+                    updated_at=timezone.now(),
+                )
+            return response
+        return wrapper
+    return decorator
+
+
+def prune_expired_keys():
+    """Delete keys past IDEMPOTENCY_KEY_TTL. Returns how many were deleted."""
+    cutoff = timezone.now() - timedelta(seconds=KEY_TTL)
+    return IdempotencyKey.objects.filter(created_at__lt=cutoff).delete()[0]
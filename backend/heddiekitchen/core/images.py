@@ -0,0 +1,207 @@
+"""
+Responsive image derivatives for uploaded media.
+
+Every registered image field gets resized copies (thumb, card, full) in WebP
+plus a JPEG fallback, stored next to the original under ``derivatives/`` with
+deterministic names. Images are never upscaled and each distinct width is
+written once, so a small original may only get a thumb.
+
+The sizes actually written and their real widths are recorded on the row in
+``<field>_derivatives`` as {'source': name, 'widths': {size: width}}. The
+srcset is built from that record alone, without touching storage, and falls
+back to the original when the record does not match the current file.
+"""
+import logging
+import posixpath
+from io import BytesIO
+
+from django.apps import apps
+from django.core.files.base import ContentFile
+from django.db import transaction
+from PIL import Image, ImageOps
+from heddiekitchen.core.media import resolve_url
+
+logger = logging.getLogger(__name__)
+
+# name -> target width in pixels (never upscaled)
+DERIVATIVE_SIZES = {
+    'thumb': 320,
+    'card': 640,
+    'full': 1280,
+}
+
+# extension -> (Pillow format, save options)
+DERIVATIVE_FORMATS = {
+    'webp': ('WEBP', {'quality': 80, 'method': 4}),
+    'jpg': ('JPEG', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+
+EXIF_ORIENTATION = 0x0112
+
+# (app_label.Model, field name) for every uploaded image that gets derivatives
+IMAGE_FIELDS = [
+    ('menu.MenuItem', 'image'),
+    ('menu.MenuItemImage', 'image'),
+    ('gallery.GalleryImage', 'image'),
+    ('blog.BlogPost', 'featured_image'),
+    ('catering.CateringPackageImage', 'image'),
+    ('training.TrainingPackage', 'image'),
+    ('core.UserProfile', 'avatar'),
+]
+
+
+def derivative_name(name, size, ext):
+    """Storage name of one derivative, e.g. menu_items/derivatives/egusi_card.webp."""
+    base = posixpath.splitext(name)[0]
+    directory, filename = posixpath.split(base)
+    return posixpath.join(directory, 'derivatives', f'{filename}_{size}.{ext}')
+
+
+def derivatives_field(field_name):
+    """Name of the JSONField recording the derivatives of image field ``field_name``."""
+    return f'{field_name}_derivatives'
+
+
+def plan_widths(width):
+    """{size: real width} for an original ``width`` pixels wide, one size per distinct width."""
+    widths = {}
+    for size, target in sorted(DERIVATIVE_SIZES.items(), key=lambda entry: entry[1]):
+        real = min(target, width)
+        if real not in widths.values():
+            widths[size] = real
+    return widths
+
+
+def _oriented_width(image):
+    """Width after EXIF rotation, read from the header without decoding the pixels."""
+    if image.getexif().get(EXIF_ORIENTATION) in (5, 6, 7, 8):
+        return image.height
+    return image.width
+
+
+def _flatten(image):
+    """Convert to RGB, compositing any transparency onto white for JPEG."""
+    if image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info):
+        image = image.convert('RGBA')
+        background = Image.new('RGB', image.size, (255, 255, 255))
+        background.paste(image, mask=image.split()[-1])
+        return background
+    return image.convert('RGB')
+
+
+def generate_derivatives(name, storage, force=False):
+    """
+    Create the derivatives for the stored image ``name``.
+    Returns ({size: real width}, number of files written); existing files are
+    kept unless ``force``.
+    """
+    with storage.open(name, 'rb') as source:
+        image = Image.open(source)
+        widths = plan_widths(_oriented_width(image))
+        targets = [
+            (size, width, ext)
+            for size, width in widths.items()
+            for ext in DERIVATIVE_FORMATS
+            if force or not storage.exists(derivative_name(name, size, ext))
+        ]
+        if not targets:
+            return widths, 0
+        image = _flatten(ImageOps.exif_transpose(image))
+
+    for size, width, ext in targets:
+        resized = image
+        if image.width > width:
+            height = round(image.height * width / image.width)
+            resized = image.resize((width, height), Image.LANCZOS)
+        pil_format, options = DERIVATIVE_FORMATS[ext]
+        buffer = BytesIO()
+        resized.save(buffer, pil_format, **options)
+        target = derivative_name(name, size, ext)
+        if force and storage.exists(target):
+            storage.delete(target)
+        storage.save(target, ContentFile(buffer.getvalue()))
+    return widths, len(targets)
+
+
+def record_derivatives(model, field_name, name, widths):
+    """Store the derivatives of ``name`` on every row of ``model`` that uses it, without firing post_save."""
+    record = {'source': name, 'widths': widths}
+    model._base_manager.filter(**{field_name: name}).update(**{derivatives_field(field_name): record})
+    return record
+
+
+def build_srcset(field_file, request=None):
+    """
+    srcset strings for an image field, keyed by format, listing the recorded
+    derivatives at their real widths, with absolute URLs resolved through
+    core.media. Without a matching record (not processed yet) the only entry
+    is ``original``, the URL of the uploaded file. Returns None when the field
+    is empty.
+    """
+    if not field_file:
+        return None
+    storage = field_file.storage
+    record = getattr(field_file.instance, derivatives_field(field_file.field.name), None) or {}
+    if record.get('source') != field_file.name or not record.get('widths'):
+        return {'original': resolve_url(storage, field_file.name, request)}
+    widths = sorted(record['widths'].items(), key=lambda entry: entry[1])
+    srcset = {}
+    for ext in DERIVATIVE_FORMATS:
+        srcset['jpeg' if ext == 'jpg' else ext] = ', '.join(
+            f'{resolve_url(storage, derivative_name(field_file.name, size, ext), request)} {width}w'
+            for size, width in widths
+        )
+    return srcset
+
+
+def get_image_field(label, field_name):
+    return apps.get_model(label)._meta.get_field(field_name)
+
+
+def process_image(label, field_name, name, force=False):
+    """
+    Process-pool entry point: build derivatives for one stored file.
+    Returns (widths, files written); widths is None if the image failed. The
+    parent records the widths, so workers never write to the database.
+    """
+    storage = get_image_field(label, field_name).storage
+    try:
+        return generate_derivatives(name, storage, force=force)
+    except FileNotFoundError:
+        logger.warning('Image %s is missing from storage', name)
+    except Exception:
+        logger.exception('Could not build image derivatives for %s', name)
+    return None, 0
+
+
+def make_derivatives_receiver(field_name):
+    """
+    post_save receiver that builds derivatives when the image differs from the
+    recorded one. The work runs after the transaction commits, so the save
+    never waits on resizing and a rolled-back row leaves nothing behind.
+    """
+    record_field = derivatives_field(field_name)
+
+    def receiver(sender, instance, raw=False, update_fields=None, **kwargs):
+        if raw or (update_fields is not None and field_name not in update_fields):
+            return
+        field_file = getattr(instance, field_name)
+        # Saves that keep the same file cost nothing: no storage calls, no resizing
+        if not field_file or (getattr(instance, record_field) or {}).get('source') == field_file.name:
+            return
+        name, storage = field_file.name, field_file.storage
+
+        def build():
+            try:
+                widths, _ = generate_derivatives(name, storage)
+            except FileNotFoundError:
+                logger.warning('Image %s is missing from storage', name)
+                return
+            except Exception:
+                # A broken upload must never break the request that saved it
+                logger.exception('Could not build image derivatives for %s', name)
+                return
+            setattr(instance, record_field, record_derivatives(sender, field_name, name, widths))
+
+        transaction.on_commit(build)
+    return receiver
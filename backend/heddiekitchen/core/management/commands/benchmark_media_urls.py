@@ -0,0 +1,70 @@
+"""
+Management command to time media URL resolution for a serialized list page.
+Usage: python manage.py benchmark_media_urls [--rows 1000] [--repeat 5]
+
+Each row resolves its image plus the six srcset derivatives against a storage
+that signs its URLs like a CDN backend, first the uncached way (storage.url()
+and build_absolute_uri() per field) and then through core.media's warm cache.
+Reports the best of --repeat runs in microseconds per row.
+"""
+import hashlib
+import hmac
+import time
+
+from django.core.files.storage import FileSystemStorage
+from django.core.management.base import BaseCommand
+from django.test import RequestFactory
+from rest_framework.request import Request
+from heddiekitchen.core.images import DERIVATIVE_FORMATS, DERIVATIVE_SIZES, derivative_name
+from heddiekitchen.core.media import CACHE_SIZE, clear_media_url_cache, resolve_url
+
+
+class SigningStorage(FileSystemStorage):
+    """Filesystem storage whose url() does the HMAC work of a signed CDN URL."""
+
+    def url(self, name):
+        expires = int(time.time()) + 3600
+        signature = hmac.new(b'benchmark', f'{name}:{expires}'.encode(), hashlib.sha256).hexdigest()
+        return f'{super().url(name)}?expires={expires}&signature={signature}'
+
+
+class Command(BaseCommand):
+    help = 'Time media URL resolution per list row, uncached versus through the core.media cache'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1000, help='Rows per simulated page')
+        parser.add_argument('--repeat', type=int, default=5, help='Runs to take the best of')
+
+    def handle(self, *args, **options):
+        rows = options['rows']
+        storage = SigningStorage(base_url='/media/')
+        request = Request(RequestFactory(SERVER_NAME='localhost').get('/api/menu/items/'))
+        names = [
+            [name] + [derivative_name(name, size, ext) for size in DERIVATIVE_SIZES for ext in DERIVATIVE_FORMATS]
+            for name in (f'menu_items/item_{n}.jpg' for n in range(rows))
+        ]
+
+        def uncached():
+            for row in names:
+                for name in row:
+                    request.build_absolute_uri(storage.url(name))
+
+        def cached():
+            for row in names:
+                for name in row:
+                    resolve_url(storage, name, request)
+
+        if rows * len(names[0]) > CACHE_SIZE:
+            self.stderr.write(f'{rows} rows overflow MEDIA_URL_CACHE_SIZE ({CACHE_SIZE}); cached timings will miss')
+
+        clear_media_url_cache()
+        cached()  # warm the cache, as the second page view would find it
+        for label, run in (('uncached', uncached), ('cached', cached)):
+            best = min(self._time(run) for _ in range(options['repeat']))
+            self.stdout.write(f'{label:<9} {best / rows * 1e6:.1f} us/row')
+        clear_media_url_cache()
+
+    def _time(self, run):
+        start = time.perf_counter()
+        run()
+        return time.perf_counter() - start
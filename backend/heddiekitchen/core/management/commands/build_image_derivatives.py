@@ -0,0 +1,74 @@
+"""
+Management command to build responsive image derivatives for existing media.
+Usage: python manage.py build_image_derivatives [--workers 4] [--force] [--model menu.MenuItem]
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from heddiekitchen.core.images import IMAGE_FIELDS, get_image_field, process_image, record_derivatives
+
+
+class Command(BaseCommand):
+    help = 'Generate thumbnail/card/full WebP and JPEG derivatives for every uploaded image and record them'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=os.cpu_count() or 1,
+            help='Number of worker processes (default: CPU count)',
+        )
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Regenerate derivatives that already exist',
+        )
+        parser.add_argument(
+            '--model',
+            action='append',
+            help='Only process this model label (e.g. menu.MenuItem); repeatable',
+        )
+
+    def handle(self, *args, **options):
+        fields = IMAGE_FIELDS
+        if options['model']:
+            fields = [entry for entry in IMAGE_FIELDS if entry[0] in options['model']]
+            if not fields:
+                raise CommandError(f'No image fields registered for {", ".join(options["model"])}')
+
+        jobs = []
+        for label, field_name in fields:
+            model = get_image_field(label, field_name).model
+            names = (
+                model.objects.exclude(**{field_name: ''}).exclude(**{f'{field_name}__isnull': True})
+                .values_list(field_name, flat=True).distinct()
+            )
+            jobs.extend((label, field_name, name) for name in names.iterator())
+
+        self.stdout.write(f'Processing {len(jobs)} image(s) with {options["workers"]} worker(s)...')
+        if not jobs:
+            return
+
+        # Forked workers must not share the parent's database connections
+        connections.close_all()
+        force = options['force']
+        written = 0
+        processed = 0
+        with ProcessPoolExecutor(max_workers=options['workers']) as executor:
+            results = executor.map(
+                process_image,
+                *zip(*jobs),
+                [force] * len(jobs),
+                chunksize=max(1, len(jobs) // (options['workers'] * 4)),
+            )
+            for (label, field_name, name), (widths, count) in zip(jobs, results):
+                processed += 1
+                written += count
+                if widths is not None:
+                    record_derivatives(get_image_field(label, field_name).model, field_name, name, widths)
+                if processed % 100 == 0:
+                    self.stdout.write(f'  {processed}/{len(jobs)} images processed')
+
+        self.stdout.write(self.style.SUCCESS(f'Wrote {written} derivative file(s) for {processed} image(s)'))
@@ -0,0 +1,16 @@
+"""
+Management command to delete idempotency keys past IDEMPOTENCY_KEY_TTL.
+Usage: python manage.py prune_idempotency_keys
+
+Run it from cron daily.
+"""
+from django.core.management.base import BaseCommand
+from heddiekitchen.core.idempotency import prune_expired_keys
+
+
+class Command(BaseCommand):
+    help = 'Delete expired Idempotency-Key records'
+
+    def handle(self, *args, **options):
+        deleted = prune_expired_keys()
+        self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} expired idempotency key(s)'))
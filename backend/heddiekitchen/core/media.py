@@ -0,0 +1,68 @@
+"""
+Memoized media URL resolution for serializers.
+
+``storage.url()`` is cheap on the filesystem backend but signs and formats a
+URL on Cloudinary and S3, and every image field of every row used to call it
+and ``request.build_absolute_uri()`` again. Resolved absolute URLs are kept
+in a small in-process cache keyed by (storage, name, scheme + host). Entries
+expire after MEDIA_URL_CACHE_TIMEOUT seconds (default 300) so signed URLs are
+refreshed well before they lapse.
+"""
+import time
+
+from django.conf import settings
+
+CACHE_TIMEOUT = getattr(settings, 'MEDIA_URL_CACHE_TIMEOUT', 300)
+CACHE_SIZE = getattr(settings, 'MEDIA_URL_CACHE_SIZE', 10000)
+
+_cache = {}
+
+
+def clear_media_url_cache():
+    _cache.clear()
+
+
+def _request_base(request):
+    """scheme://host for the request, computed once per request."""
+    if request is None:
+        return ''
+    base = getattr(request, '_media_url_base', None)
+    if base is None:
+        base = f'{request.scheme}://{request.get_host()}'
+        request._media_url_base = base
+    return base
+
+
+def _absolute(url, base, request):
+    if url.startswith('http://') or url.startswith('https://') or request is None:
+        return url
+    if url.startswith('/'):
+        return base + url
+    return request.build_absolute_uri(url)
+
+
+def resolve_url(storage, name, request=None):
+    """
+    Absolute URL of the stored file ``name``. URLs that storage already makes
+    absolute (CDNs) are returned unchanged; without a request the storage URL
+    is returned as-is.
+    """
+    base = _request_base(request)
+    key = (storage, name, base)
+    now = time.monotonic()
+    cached = _cache.get(key)
+    if cached is not None and cached[0] > now:
+        return cached[1]
+
+    url = _absolute(storage.url(name), base, request)
+    if len(_cache) >= CACHE_SIZE:
+        _cache.clear()
+    _cache[key] = (now + CACHE_TIMEOUT, url)
+    return url
+
+
+def media_url(field_file, request=None):
+    """Absolute URL of an image/file field, or None when it is empty."""
+    if not field_file:
+        return None
+    return resolve_url(field_file.storage, field_file.name, request)
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.11 on 2026-10-17 18:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_image_derivatives'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='idempotencykey',
+            name='owner',
+            field=models.CharField(help_text='user:<id>, cart:<token> or session:<key>', max_length=100),
+        ),
+    ]
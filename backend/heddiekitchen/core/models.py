@@ -1,6 +1,7 @@
 """
 Models for core functionality: SiteAssets (logos/favicons), extended User model.
 """
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
 from django.contrib.auth.models import User
 from django.core.validators import URLValidator
@@ -74,6 +75,7 @@ class UserProfile(models.Model):
     zip_code = models.CharField(max_length=20, blank=True)
     role = models.CharField(max_length=20, choices=ROLE_CHOICES, default='customer')
     avatar = models.ImageField(upload_to='avatars/', null=True, blank=True)
+    avatar_derivatives = models.JSONField(default=dict, blank=True, editable=False)
     newsletter_subscribed = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -120,3 +122,35 @@ class Contact(models.Model):
         verbose_name = 'Contact Message'
         verbose_name_plural = 'Contact Messages'
         ordering = ['-created_at']
+
+
+class IdempotencyKey(models.Model):
+    """
+    A client-supplied Idempotency-Key and the response it produced, so a
+    retried request is answered from here instead of being run again.
+    """
+    STATUS_CHOICES = [
+        ('in_progress', 'In progress'),
+        ('completed', 'Completed'),
+    ]
+
+    scope = models.CharField(max_length=100, help_text='Endpoint the key was used on')
+    owner = models.CharField(max_length=100, help_text='user:<id>, cart:<token> or session:<key>')
+    key = models.CharField(max_length=255)
+    fingerprint = models.CharField(max_length=64, help_text='SHA-256 of the request method, path and body')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='in_progress')
+    response_status = models.PositiveSmallIntegerField(null=True, blank=True)
+    response_body = models.JSONField(null=True, blank=True, encoder=DjangoJSONEncoder)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'Idempotency Key'
+        verbose_name_plural = 'Idempotency Keys'
+        ordering = ['-created_at']
+        constraints = [
+            models.UniqueConstraint(fields=['scope', 'owner', 'key'], name='unique_idempotency_key'),
+        ]
+
+    def __str__(self):
+        return f"{self.scope} {self.key} ({self.status})"
@@ -3,6 +3,8 @@ Serializers for core app.
 """
 from rest_framework import serializers
 from django.contrib.auth.models import User
+from heddiekitchen.core.images import build_srcset
+from heddiekitchen.core.media import media_url
 from heddiekitchen.core.models import SiteAsset, UserProfile, Newsletter, Contact
 
 
@@ -18,26 +20,21 @@ class UserProfileSerializer(serializers.ModelSerializer):
     """Serializer for UserProfile model."""
     user = UserSerializer(read_only=True)
     avatar_url = serializers.SerializerMethodField()
+    avatar_srcset = serializers.SerializerMethodField()
 
     class Meta:
         model = UserProfile
         fields = ['id', 'user', 'phone', 'address', 'city', 'state', 'country', 
-                  'zip_code', 'role', 'avatar', 'avatar_url', 'newsletter_subscribed', 'created_at']
-        read_only_fields = ['id', 'user', 'created_at', 'avatar_url']
+                  'zip_code', 'role', 'avatar', 'avatar_url', 'avatar_srcset', 'newsletter_subscribed', 'created_at']
+        read_only_fields = ['id', 'user', 'created_at', 'avatar_url', 'avatar_srcset']
 
     def get_avatar_url(self, obj):
         """Get absolute URL for avatar image."""
-        if obj.avatar:
-            url = obj.avatar.url
-            # If URL is already absolute (Cloudinary), return as-is
-            if url.startswith('http://') or url.startswith('https://'):
-                return url
-            # Otherwise, make it absolute using request
-            request = self.context.get('request')
-            if request:
-                return request.build_absolute_uri(url)
-            return url
-        return None
+        return media_url(obj.avatar, self.context.get('request'))
+
+    def get_avatar_srcset(self, obj):
+        """Responsive derivative URLs for the avatar image."""
+        return build_srcset(obj.avatar, self.context.get('request'))
 
 
 class SiteAssetSerializer(serializers.ModelSerializer):
@@ -54,50 +51,16 @@ class SiteAssetSerializer(serializers.ModelSerializer):
         read_only_fields = ['id']
 
     def get_favicon_url(self, obj):
-        if obj.favicon:
-            url = obj.favicon.url
-            # If URL is already absolute (Cloudinary), return as-is
-            # Otherwise, make it absolute using request
-            if url.startswith('http://') or url.startswith('https://'):
-                return url
-            request = self.context.get('request')
-            if request:
-                return request.build_absolute_uri(url)
-            return url
-        return None
+        return media_url(obj.favicon, self.context.get('request'))
 
     def get_logo_primary_url(self, obj):
-        if obj.logo_primary:
-            url = obj.logo_primary.url
-            if url.startswith('http://') or url.startswith('https://'):
-                return url
-            request = self.context.get('request')
-            if request:
-                return request.build_absolute_uri(url)
-            return url
-        return None
+        return media_url(obj.logo_primary, self.context.get('request'))
 
     def get_logo_light_url(self, obj):
-        if obj.logo_light:
-            url = obj.logo_light.url
-            if url.startswith('http://') or url.startswith('https://'):
-                return url
-            request = self.context.get('request')
-            if request:
-                return request.build_absolute_uri(url)
-            return url
-        return None
+        return media_url(obj.logo_light, self.context.get('request'))
 
     def get_logo_dark_url(self, obj):
-        if obj.logo_dark:
-            url = obj.logo_dark.url
-            if url.startswith('http://') or url.startswith('https://'):
-                return url
-            request = self.context.get('request')
-            if request:
-                return request.build_absolute_uri(url)
-            return url
-        return None
+        return media_url(obj.logo_dark, self.context.get('request'))
 
 
 class NewsletterSerializer(serializers.ModelSerializer):
@@ -1,10 +1,24 @@
 """
 Tests for core app.
 """
+from decimal import Decimal
+from io import BytesIO, StringIO
+
 import pytest
+from PIL import Image
 from django.contrib.auth.models import User
+from django.core.files.storage import FileSystemStorage, default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from rest_framework.request import Request
 from rest_framework.test import APIClient
-from heddiekitchen.core.models import SiteAsset, Newsletter, Contact
+from heddiekitchen.core import idempotency, images, media
+from heddiekitchen.core.images import derivative_name
+from heddiekitchen.core.media import clear_media_url_cache, media_url, resolve_url
+from heddiekitchen.core.models import SiteAsset, Newsletter, Contact, IdempotencyKey
+from heddiekitchen.gallery.models import GalleryCategory, GalleryImage
+from heddiekitchen.menu.models import MenuCategory, MenuItem
+from heddiekitchen.orders.models import Cart, CartItem, Order
 
 
 @pytest.fixture
@@ -78,3 +92,313 @@ class TestContact:
             'message': 'Test message'
         })
         assert response.status_code in (200, 201, 400)
+
+
+@pytest.fixture
+def media_root(settings, tmp_path):
+    settings.MEDIA_ROOT = tmp_path
+    return tmp_path
+
+
+def make_upload(name='photo.png', size=(2000, 1000), mode='RGBA'):
+    buffer = BytesIO()
+    Image.new(mode, size, (200, 80, 20, 255)[:len(mode)]).save(buffer, 'PNG')
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type='image/png')
+
+
+class TestImageDerivatives:
+    """Test responsive image derivatives."""
+
+    def test_upload_generates_derivatives(self, api_client, media_root, db, django_capture_on_commit_callbacks):
+        category = GalleryCategory.objects.create(name='Events', slug='events')
+        with django_capture_on_commit_callbacks(execute=True):
+            image = GalleryImage.objects.create(category=category, title='Buffet', image=make_upload())
+
+        with default_storage.open(derivative_name(image.image.name, 'card', 'webp')) as f:
+            assert Image.open(f).size == (640, 320)
+        with default_storage.open(derivative_name(image.image.name, 'full', 'jpg')) as f:
+            assert Image.open(f).format == 'JPEG'
+
+        assert image.image_derivatives == {
+            'source': image.image.name, 'widths': {'thumb': 320, 'card': 640, 'full': 1280}
+        }
+        response = api_client.get(f'/api/gallery/images/{image.id}/')
+        srcset = response.data['image_srcset']
+        assert srcset['webp'].endswith('_full.webp 1280w')
+        assert '_thumb.jpg 320w' in srcset['jpeg']
+
+    def test_srcset_lists_only_real_widths(self, api_client, media_root, db, django_capture_on_commit_callbacks):
+        category = GalleryCategory.objects.create(name='Events', slug='events')
+        with django_capture_on_commit_callbacks(execute=True):
+            image = GalleryImage.objects.create(category=category, title='Buffet', image=make_upload(size=(500, 250)))
+        assert image.image_derivatives['widths'] == {'thumb': 320, 'card': 500}
+        assert not default_storage.exists(derivative_name(image.image.name, 'full', 'webp'))
+
+        srcset = api_client.get(f'/api/gallery/images/{image.id}/').data['image_srcset']
+        assert srcset['webp'].endswith('_thumb.webp 320w, http://testserver/media/' +
+                                       derivative_name(image.image.name, 'card', 'webp') + ' 500w')
+
+    def test_unprocessed_image_falls_back_to_original(self, api_client, media_root, db):
+        category = GalleryCategory.objects.create(name='Events', slug='events')
+        # Missing from storage, so nothing is generated or recorded
+        image = GalleryImage.objects.create(category=category, title='Buffet', image='gallery/missing.jpg')
+        srcset = api_client.get(f'/api/gallery/images/{image.id}/').data['image_srcset']
+        assert srcset == {'original': 'http://testserver/media/gallery/missing.jpg'}
+
+    def test_save_without_new_image_skips_processing(self, media_root, db, monkeypatch,
+                                                     django_capture_on_commit_callbacks):
+        category = GalleryCategory.objects.create(name='Events', slug='events')
+        with django_capture_on_commit_callbacks(execute=True):
+            image = GalleryImage.objects.create(category=category, title='Buffet', image=make_upload())
+        monkeypatch.setattr(images, 'generate_derivatives', pytest.fail)
+        with django_capture_on_commit_callbacks() as callbacks:
+            image.title = 'Wedding buffet'
+            image.save()
+            GalleryImage.objects.get(pk=image.pk).save()
+        assert callbacks == []
+
+    def test_processing_waits_for_commit(self, media_root, db, django_capture_on_commit_callbacks):
+        category = GalleryCategory.objects.create(name='Events', slug='events')
+        with django_capture_on_commit_callbacks() as callbacks:
+            image = GalleryImage.objects.create(category=category, title='Buffet', image=make_upload())
+            assert not default_storage.exists(derivative_name(image.image.name, 'thumb', 'webp'))
+        assert len(callbacks) == 1
+
+        callbacks[0]()
+        assert default_storage.exists(derivative_name(image.image.name, 'thumb', 'webp'))
+        image.refresh_from_db()
+        assert image.image_derivatives['source'] == image.image.name
+
+    @pytest.mark.django_db(transaction=True)
+    def test_backfill_command(self, media_root):
+        category = GalleryCategory.objects.create(name='Events', slug='events')
+        image = GalleryImage.objects.create(category=category, title='Buffet', image=make_upload(size=(300, 200)))
+        target = derivative_name(image.image.name, 'thumb', 'webp')
+        default_storage.delete(target)
+
+        call_command('build_image_derivatives', '--workers', '1', stdout=StringIO())
+
+        with default_storage.open(target) as f:
+            assert Image.open(f).size == (300, 200)  # never upscaled
+        image.refresh_from_db()
+        assert image.image_derivatives == {'source': image.image.name, 'widths': {'thumb': 300}}
+
+
+class CountingStorage(FileSystemStorage):
+    """Filesystem storage that counts url() calls, standing in for a signing CDN backend."""
+
+    def __init__(self, *args, base_url='/media/', **kwargs):
+        super().__init__(*args, base_url=base_url, **kwargs)
+        self.calls = 0
+
+    def url(self, name):
+        self.calls += 1
+        return super().url(name)
+
+
+class TestMediaUrls:
+    """Test the memoized media URL builder."""
+
+    @pytest.fixture(autouse=True)
+    def clear_urls(self):
+        clear_media_url_cache()
+
+    def test_urls_are_resolved_once_per_host(self, rf):
+        storage = CountingStorage()
+        request = Request(rf.get('/'))
+
+        urls = [resolve_url(storage, 'menu_items/egusi.jpg', request) for _ in range(100)]
+        assert set(urls) == {'http://testserver/media/menu_items/egusi.jpg'}
+        assert storage.calls == 1
+
+        other_host = Request(rf.get('/', HTTP_HOST='localhost'))
+        assert resolve_url(storage, 'menu_items/egusi.jpg', other_host) == 'http://localhost/media/menu_items/egusi.jpg'
+        assert resolve_url(storage, 'menu_items/egusi.jpg') == '/media/menu_items/egusi.jpg'
+        assert storage.calls == 3
+
+    def test_cdn_urls_pass_through_and_expire(self, rf, monkeypatch):
+        storage = CountingStorage(base_url='https://cdn.example.com/media/')
+        request = Request(rf.get('/'))
+        assert resolve_url(storage, 'a.jpg', request) == 'https://cdn.example.com/media/a.jpg'
+
+        monkeypatch.setattr(media, 'CACHE_TIMEOUT', -1)
+        resolve_url(storage, 'b.jpg', request)
+        resolve_url(storage, 'b.jpg', request)
+        assert storage.calls == 3
+
+    def test_media_url_second_call_skips_storage(self, rf):
+        storage = CountingStorage()
+        field_file = GalleryImage(image='gallery/buffet.jpg').image
+        field_file.storage = storage
+        request = Request(rf.get('/'))
+
+        first = media_url(field_file, request)
+        assert media_url(field_file, request) == first == 'http://testserver/media/gallery/buffet.jpg'
+        assert storage.calls == 1
+        assert media_url(GalleryImage().image, request) is None
+
+    def test_entries_expire_after_timeout(self, rf, monkeypatch):
+        storage = CountingStorage()
+        request = Request(rf.get('/'))
+        clock = [1000.0]
+        monkeypatch.setattr(media.time, 'monotonic', lambda: clock[0])
+
+        resolve_url(storage, 'a.jpg', request)
+        clock[0] += media.CACHE_TIMEOUT - 1
+        resolve_url(storage, 'a.jpg', request)
+        assert storage.calls == 1
+        clock[0] += 2
+        resolve_url(storage, 'a.jpg', request)
+        assert storage.calls == 2
+
+    def test_benchmark_command(self):
+        out = StringIO()
+        call_command('benchmark_media_urls', '--rows', '10', '--repeat', '1', stdout=out)
+        assert [line.split()[0] for line in out.getvalue().splitlines()] == ['uncached', 'cached']
+
+
+class TestIdempotencyKeys:
+    """Test that Idempotency-Key makes checkout and payment initialization safe to retry."""
+
+    SHIPPING = {
+        'shipping_name': 'Test User',
+        'shipping_email': 'test@example.com',
+        'shipping_phone': '08000000000',
+        'shipping_address': '1 Test Street',
+        'shipping_city': 'Abuja',
+        'shipping_state': 'FCT',
+    }
+
+    @pytest.fixture
+    def cart(self, test_user):
+        category = MenuCategory.objects.create(name='Soups')
+        menu_item = MenuItem.objects.create(name='Egusi Soup', price=Decimal('4500.00'), category=category)
+        cart = Cart.objects.create(user=test_user)
+        CartItem.objects.create(cart=cart, menu_item=menu_item, quantity=1, price_at_add=menu_item.price)
+        return cart
+
+    @pytest.fixture
+    def paystack(self, monkeypatch, settings):
+        settings.PAYSTACK_SECRET_KEY = 'sk_test'
+        calls = []
+
+        class PaystackResponse:
+            status_code = 200
+
+            def json(self):
+                return {'status': True, 'data': {'authorization_url': 'https://paystack.test/pay', 'reference': 'ref'}}
+
+        def post(url, json, headers, timeout):
+            calls.append(json)
+            return PaystackResponse()
+
+        monkeypatch.setattr('heddiekitchen.payments.views.requests.post', post)
+        return calls
+
+    def checkout(self, api_client, key, **data):
+        return api_client.post('/api/orders/create_order/', {**self.SHIPPING, **data}, format='json',
+                               HTTP_IDEMPOTENCY_KEY=key)
+
+    def test_retried_checkout_replays_the_first_order(self, api_client, test_user, cart):
+        api_client.force_authenticate(user=test_user)
+        first = self.checkout(api_client, 'checkout-1')
+        assert first.status_code == 201
+
+        retry = self.checkout(api_client, 'checkout-1')
+        assert retry.status_code == 201 and retry['Idempotent-Replayed'] == 'true'
+        assert retry.data['id'] == first.data['id']
+        assert Order.objects.count() == 1
+
+        assert self.checkout(api_client, 'checkout-1', shipping_city='Lagos').status_code == 422
+
+    def test_concurrent_request_waits_for_the_first(self, api_client, test_user, cart, monkeypatch):
+        api_client.force_authenticate(user=test_user)
+        response = self.checkout(api_client, 'checkout-2')
+        record = IdempotencyKey.objects.get(key='checkout-2')
+        IdempotencyKey.objects.filter(pk=record.pk).update(status='in_progress', response_body=None)
+
+        # The first request finishes while the second one is polling
+        def finish(seconds):
+            IdempotencyKey.objects.filter(pk=record.pk).update(status='completed', response_body=response.data)
+        monkeypatch.setattr(idempotency.time, 'sleep', finish)
+        retry = self.checkout(api_client, 'checkout-2')
+        assert retry.status_code == 201 and retry.data['id'] == response.data['id']
+
+        IdempotencyKey.objects.filter(pk=record.pk).update(status='in_progress')
+        monkeypatch.setattr(idempotency, 'WAIT_SECONDS', 0)
+        assert self.checkout(api_client, 'checkout-2').status_code == 409
+        assert Order.objects.count() == 1
+
+    def test_released_key_is_polled_not_spun(self, api_client, test_user, cart, monkeypatch):
+        api_client.force_authenticate(user=test_user)
+        # The key looks taken but is gone by the time it is read, every time
+        monkeypatch.setattr(idempotency, '_claim', lambda *args: (None, False))
+        sleeps = []
+        monkeypatch.setattr(idempotency.time, 'sleep', sleeps.append)
+        monkeypatch.setattr(idempotency, 'WAIT_SECONDS', 0)
+        assert self.checkout(api_client, 'checkout-6').status_code == 409
+        assert sleeps == []
+
+        monkeypatch.setattr(idempotency, 'WAIT_SECONDS', 60)
+        clock = iter(range(0, 600, 20))
+        monkeypatch.setattr(idempotency.time, 'monotonic', lambda: next(clock))
+        assert self.checkout(api_client, 'checkout-6').status_code == 409
+        assert sleeps == [idempotency.POLL_INTERVAL] * 2
+        assert Order.objects.count() == 0
+
+    def test_guests_do_not_share_keys(self, cart):
+        menu_item = cart.items.get().menu_item
+        guests = [APIClient(), APIClient()]
+        orders = []
+        for guest, email in zip(guests, ['first@example.com', 'second@example.com']):
+            guest.post('/api/orders/cart/add_item/', {'menu_item_id': menu_item.pk}, format='json')
+            response = self.checkout(guest, 'guest-1', shipping_email=email)
+            assert response.status_code == 201 and 'Idempotent-Replayed' not in response
+            orders.append(response.data['id'])
+        assert Order.objects.get(pk=orders[1]).shipping_email == 'second@example.com'
+        assert self.checkout(guests[0], 'guest-1', shipping_email='first@example.com').data['id'] == orders[0]
+
+        assert IdempotencyKey.objects.filter(key='guest-1').count() == 2
+
+    def test_unidentified_guest_runs_without_key(self, rf, db):
+        from django.contrib.auth.models import AnonymousUser
+        from django.contrib.sessions.backends.db import SessionStore
+
+        request = rf.post('/api/orders/create_order/')
+        request.user, request.session = AnonymousUser(), SessionStore()
+        # Nothing to scope the key to, so it is ignored rather than shared
+        assert idempotency._owner(request) is None
+        request.session.create()
+        assert idempotency._owner(request) == f'session:{request.session.session_key}'
+
+    def test_payment_initialization_calls_paystack_once(self, api_client, test_user, cart, paystack):
+        api_client.force_authenticate(user=test_user)
+        order = self.checkout(api_client, 'checkout-3').data
+        for _ in range(2):
+            response = api_client.post('/api/payments/initialize/', {'order_id': order['id'], 'email': 'test@example.com'},
+                                       format='json', HTTP_IDEMPOTENCY_KEY='pay-1')
+            assert response.data['authorization_url'] == 'https://paystack.test/pay'
+        assert len(paystack) == 1
+
+    def test_server_errors_release_the_key(self, api_client, test_user, cart, settings):
+        settings.PAYSTACK_SECRET_KEY = ''
+        api_client.force_authenticate(user=test_user)
+        order = self.checkout(api_client, 'checkout-4').data
+        response = api_client.post('/api/payments/initialize/', {'order_id': order['id'], 'email': 'test@example.com'},
+                                   format='json', HTTP_IDEMPOTENCY_KEY='pay-2')
+        assert response.status_code == 500
+        assert not IdempotencyKey.objects.filter(key='pay-2').exists()
+
+    def test_client_errors_are_not_replayed(self, api_client, test_user, cart):
+        api_client.force_authenticate(user=test_user)
+        items = list(cart.items.all())
+        cart.items.all().delete()
+        response = self.checkout(api_client, 'checkout-5')
+        assert response.status_code == 400
+        assert not IdempotencyKey.objects.filter(key='checkout-5').exists()
+
+        # Once the cart is filled, the same key places the order
+        CartItem.objects.bulk_create(items)
+        response = self.checkout(api_client, 'checkout-5')
+        assert response.status_code == 201 and 'Idempotent-Replayed' not in response
+        assert IdempotencyKey.objects.get(key='checkout-5').status == 'completed'
@@ -22,6 +22,7 @@ class GalleryImage(models.Model):
     category = models.ForeignKey(GalleryCategory, on_delete=models.CASCADE, related_name='images')
     title = models.CharField(max_length=200)
     image = models.ImageField(upload_to='gallery/')
+    image_derivatives = models.JSONField(default=dict, blank=True, editable=False)
     description = models.TextField(blank=True)
     display_order = models.IntegerField(default=0)
     created_at = models.DateTimeField(auto_now_add=True)
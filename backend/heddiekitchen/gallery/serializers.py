@@ -1,4 +1,6 @@
 from rest_framework import serializers
+from heddiekitchen.core.images import build_srcset
+from heddiekitchen.core.media import media_url
 from .models import GalleryCategory, GalleryImage
 
 
@@ -16,19 +18,16 @@ class GalleryCategorySerializer(serializers.ModelSerializer):
 class GalleryImageSerializer(serializers.ModelSerializer):
     category_name = serializers.StringRelatedField(source='category.name', read_only=True)
     image_url = serializers.SerializerMethodField()
+    image_srcset = serializers.SerializerMethodField()
     
     class Meta:
         model = GalleryImage
-        fields = ['id', 'category', 'category_name', 'image', 'image_url', 'title', 'description', 
+        fields = ['id', 'category', 'category_name', 'image', 'image_url', 'image_srcset', 'title', 'description', 
                   'display_order', 'created_at']
         read_only_fields = ['created_at']
     
     def get_image_url(self, obj):
-        request = self.context.get('request')
-        if obj.image and request:
-            url = obj.image.url
-            # If URL is already absolute (Cloudinary), return as-is
-            if url.startswith('http://') or url.startswith('https://'):
-                return url
-            return request.build_absolute_uri(url)
-        return None
\ No newline at end of file
+        return media_url(obj.image, self.context.get('request'))
+    
+    def get_image_srcset(self, obj):
+        return build_srcset(obj.image, self.context.get('request'))
@@ -1,4 +1,5 @@
 from rest_framework import serializers
+from heddiekitchen.core.media import media_url
 from django.contrib.auth.models import User
 from django.utils import timezone
 from datetime import timedelta
@@ -34,12 +35,7 @@ class MealPlanSerializer(serializers.ModelSerializer):
     
     def get_sample_pdf_url(self, obj):
         """Return the URL for the sample PDF if it exists."""
-        if obj.sample_pdf:
-            request = self.context.get('request')
-            if request:
-                return request.build_absolute_uri(obj.sample_pdf.url)
-            return obj.sample_pdf.url
-        return None
+        return media_url(obj.sample_pdf, self.context.get('request'))
     
     class Meta:
         model = MealPlan
@@ -2,7 +2,9 @@
 Admin configuration for menu app.
 """
 from django.contrib import admin
-from heddiekitchen.menu.models import MenuCategory, MenuItem, MenuItemImage, MenuItemReview
+from heddiekitchen.menu.models import (
+    Allergen, Ingredient, MenuCategory, MenuItem, MenuItemImage, MenuItemPopularity, MenuItemReview
+)
 
 
 @admin.register(MenuCategory)
@@ -14,6 +16,20 @@ class MenuCategoryAdmin(admin.ModelAdmin):
     search_fields = ['name']
 
 
+@admin.register(Allergen)
+class AllergenAdmin(admin.ModelAdmin):
+    """Admin for allergens parsed from menu items."""
+    list_display = ['name', 'slug']
+    search_fields = ['name', 'slug']
+
+
+@admin.register(Ingredient)
+class IngredientAdmin(admin.ModelAdmin):
+    """Admin for ingredients parsed from menu items."""
+    list_display = ['name', 'slug']
+    search_fields = ['name', 'slug']
+
+
 class MenuItemImageInline(admin.TabularInline):
     """Inline for menu item images."""
     model = MenuItemImage
@@ -31,14 +47,14 @@ class MenuItemReviewInline(admin.TabularInline):
 @admin.register(MenuItem)
 class MenuItemAdmin(admin.ModelAdmin):
     """Admin for menu items."""
-    list_display = ['name', 'price', 'category', 'is_available', 'is_featured', 'stock_quantity']
+    list_display = ['name', 'price', 'category', 'is_available', 'is_featured', 'track_stock', 'stock_quantity']
     list_filter = ['is_available', 'is_featured', 'category', 'created_at']
     search_fields = ['name', 'description']
     prepopulated_fields = {'slug': ('name',)}
     inlines = [MenuItemImageInline, MenuItemReviewInline]
     fieldsets = (
         ('Basic Info', {'fields': ('name', 'slug', 'description')}),
-        ('Pricing & Stock', {'fields': ('price', 'stock_quantity')}),
+        ('Pricing & Stock', {'fields': ('price', 'track_stock', 'stock_quantity')}),
         ('Categories', {'fields': ('category', 'categories')}),
         ('Media', {'fields': ('image',)}),
         ('Details', {'fields': ('prep_time_minutes', 'servings', 'calories', 'ingredients', 'allergens', 'nutritional_info')}),
@@ -63,3 +79,17 @@ class MenuItemReviewAdmin(admin.ModelAdmin):
     list_filter = ['rating', 'is_verified_purchase', 'created_at']
     search_fields = ['menu_item__name', 'user__username']
     readonly_fields = ['created_at', 'updated_at']
+
+
+@admin.register(MenuItemPopularity)
+class MenuItemPopularityAdmin(admin.ModelAdmin):
+    """Read-only view of the materialized bestseller rankings."""
+    list_display = ['menu_item', 'window_days', 'rank', 'category', 'category_rank', 'quantity', 'refreshed_at']
+    list_filter = ['window_days', 'category']
+    ordering = ['window_days', 'rank']
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
@@ -7,3 +7,9 @@ from django.apps import AppConfig
 class MenuConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'heddiekitchen.menu'
+
+    def ready(self):
+        """
+        Import signals when app is ready.
+        """
+        import heddiekitchen.menu.signals
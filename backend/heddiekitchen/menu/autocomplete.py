@@ -0,0 +1,189 @@
+"""
+In-process prefix index for search-as-you-type.
+
+Menu item names, active category names and ingredient tags are normalized
+(lowercased, accents stripped) and kept as one sorted list of keys. Every
+word suffix of a name is indexed too, so "rice" finds "Jollof Rice". A prefix
+lookup is a bisect into that list. Typos are tolerated by expanding the query
+to every prefix within edit distance 1 that occurs in the index. The
+candidate characters at each position are read off the sorted keys
+themselves, so no separate trie is built.
+
+The index is rebuilt from the database the first time it is used after the
+catalogue version changes (see menu/cache.py). Lookups in between never
+touch the database. Without a shared cache the version never moves for bumps
+made in other processes, so the index is also rebuilt every
+IN_PROCESS_TABLE_TTL seconds.
+"""
+import re
+import threading
+import time
+import unicodedata
+from bisect import bisect_left
+
+from django.conf import settings
+from heddiekitchen.menu.cache import get_catalog_version
+from heddiekitchen.menu.models import Ingredient, MenuCategory, MenuItem
+
+# Suggestion types in display order
+KIND_ORDER = {'item': 0, 'category': 1, 'ingredient': 2}
+# Shorter queries match too much for typo tolerance to help
+MIN_FUZZY_LENGTH = 3
+# Matches examined per prefix before ranking
+SCAN_LIMIT = 200
+MAX_LIMIT = 20
+
+WORD_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def normalize(text):
+    """Lowercase, strip accents and collapse punctuation/whitespace to single spaces."""
+    text = unicodedata.normalize('NFKD', text)
+    text = ''.join(ch for ch in text if not unicodedata.combining(ch))
+    return ' '.join(WORD_RE.findall(text.lower()))
+
+
+class AutocompleteIndex:
+    """Sorted-array prefix index over (key, suggestion) pairs."""
+
+    def __init__(self, entries):
+        self.suggestions = []
+        keyed = []
+        for kind, pk, label, slug in entries:
+            key = normalize(label)
+            if not key:
+                continue
+            index = len(self.suggestions)
+            self.suggestions.append({'type': kind, 'id': pk, 'label': label, 'slug': slug})
+            words = key.split(' ')
+            for start in range(len(words)):
+                # Position 0 is the whole name; later starts rank below it
+                keyed.append((' '.join(words[start:]), start, index))
+        keyed.sort()
+        self.keys = [key for key, _, _ in keyed]
+        self.entries = [(start, index) for _, start, index in keyed]
+
+    def __len__(self):
+        return len(self.suggestions)
+
+    def _has_prefix(self, prefix):
+        position = bisect_left(self.keys, prefix)
+        return position < len(self.keys) and self.keys[position].startswith(prefix)
+
+    def _next_chars(self, head):
+        """Distinct characters that follow ``head`` in the index, one bisect per character."""
+        chars = []
+        position = bisect_left(self.keys, head)
+        while position < len(self.keys) and self.keys[position].startswith(head):
+            key = self.keys[position]
+            if len(key) == len(head):
+                position += 1
+                continue
+            char = key[len(head)]
+            chars.append(char)
+            position = bisect_left(self.keys, head + chr(ord(char) + 1), position)
+        return chars
+
+    def fuzzy_prefixes(self, query):
+        """Prefixes in the index within one insertion, deletion, substitution or transposition of ``query``."""
+        found = set()
+        for i in range(len(query) + 1):
+            head = query[:i]
+            if i and not self._has_prefix(head):
+                break
+            tail = query[i:]
+            candidates = []
+            for char in self._next_chars(head):
+                candidates.append(head + char + tail)
+                if tail and char != tail[0]:
+                    candidates.append(head + char + tail[1:])
+            if tail:
+                candidates.append(head + tail[1:])
+            if len(tail) > 1:
+                candidates.append(head + tail[1] + tail[0] + tail[2:])
+            found.update(candidate for candidate in candidates if candidate and self._has_prefix(candidate))
+        found.discard(query)
+        return found
+
+    def _ranked(self, prefixes):
+        """Suggestion indexes matching any of ``prefixes``, best first."""
+        best = {}
+        for prefix in prefixes:
+            position = bisect_left(self.keys, prefix)
+            end = min(position + SCAN_LIMIT, len(self.keys))
+            while position < end and self.keys[position].startswith(prefix):
+                start, index = self.entries[position]
+                best[index] = min(start, best.get(index, start))
+                position += 1
+
+        def rank(index):
+            suggestion = self.suggestions[index]
+            return (KIND_ORDER[suggestion['type']], best[index] > 0, len(suggestion['label']), suggestion['label'])
+        return sorted(best, key=rank)
+
+    def lookup(self, query, limit=8):
+        """
+        Up to ``limit`` suggestions for ``query``: exact prefix matches first,
+        then typo-tolerant ones. Within each group items rank above categories
+        above ingredients, and whole-name matches above mid-name ones.
+        """
+        query = normalize(query)
+        if not query:
+            return []
+
+        exact = self._ranked([query])[:limit]
+        results = [{**self.suggestions[index], 'fuzzy': False} for index in exact]
+        if len(results) < limit and len(query) >= MIN_FUZZY_LENGTH:
+            seen = set(exact)
+            for index in self._ranked(sorted(self.fuzzy_prefixes(query))):
+                if index not in seen:
+                    results.append({**self.suggestions[index], 'fuzzy': True})
+                    if len(results) >= limit:
+                        break
+        return results
+
+
+def build_index():
+    """Read the current catalogue into a new AutocompleteIndex."""
+    entries = []
+    for pk, name, slug in MenuItem.objects.filter(is_available=True).values_list('pk', 'name', 'slug'):
+        entries.append(('item', pk, name, slug))
+    for pk, name, slug in MenuCategory.objects.filter(is_active=True).values_list('pk', 'name', 'slug'):
+        entries.append(('category', pk, name, slug))
+    ingredients = Ingredient.objects.filter(menu_items__is_available=True).distinct()
+    for pk, name, slug in ingredients.values_list('pk', 'name', 'slug'):
+        entries.append(('ingredient', pk, name, slug))
+    return AutocompleteIndex(entries)
+
+
+_lock = threading.Lock()
+_index = None
+_version = None
+_built_at = 0.0
+
+
+def _is_current(version):
+    if _index is None or _version != version:
+        return False
+    ttl = getattr(settings, 'IN_PROCESS_TABLE_TTL', None)
+    return ttl is None or time.monotonic() - _built_at < ttl
+
+
+def get_index():
+    """
+    The index for the current catalogue version, rebuilt on first use after a
+    bump or, with IN_PROCESS_TABLE_TTL set, once it is that many seconds old.
+    """
+    global _index, _version, _built_at
+    version = get_catalog_version()
+    if _is_current(version):
+        return _index
+    with _lock:
+        if not _is_current(version):
+            _index, _version, _built_at = build_index(), version, time.monotonic()
+    return _index
+
+
+def autocomplete(query, limit=8):
+    """Suggestions for ``query`` from the current index."""
+    return get_index().lookup(query, limit=min(max(limit, 1), MAX_LIMIT))
@@ -0,0 +1,112 @@
+"""
+Catalogue versioning and precomputed list responses for the menu.
+
+Every write to the catalogue bumps a single version counter in the cache.
+Serialized list pages are stored under (version, endpoint, query, host), so a
+bump invalidates them all at once without having to enumerate keys, and the
+same tuple doubles as a strong ETag for conditional requests.
+
+The counter only reaches every worker, and the management commands that
+bump it, through a shared cache. With CATALOG_CACHE_ENABLED off (the default
+without Redis) pages are rendered on every request and sent without an ETag,
+rather than served stale for up to CATALOG_CACHE_TIMEOUT.
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.http import parse_etags
+from rest_framework import status
+from rest_framework.response import Response
+
+CATALOG_VERSION_KEY = 'menu:catalog_version'
+CATALOG_CACHE_TIMEOUT = 60 * 60 * 6
+
+
+def _initial_version():
+    # Seed from the clock so a flushed cache never reuses an old version number
+    return int(time.time() * 1000)
+
+
+def catalog_cache_enabled():
+    return getattr(settings, 'CATALOG_CACHE_ENABLED', False)
+
+
+def get_catalog_version():
+    """Return the current catalogue version, creating it if needed."""
+    version = cache.get(CATALOG_VERSION_KEY)
+    if version is None:
+        cache.add(CATALOG_VERSION_KEY, _initial_version(), timeout=None)
+        version = cache.get(CATALOG_VERSION_KEY)
+    return version
+
+
+def bump_catalog_version():
+    """Invalidate every cached catalogue response."""
+    try:
+        return cache.incr(CATALOG_VERSION_KEY)
+    except ValueError:
+        version = _initial_version()
+        cache.set(CATALOG_VERSION_KEY, version, timeout=None)
+        return version
+
+
+def schedule_catalog_bump():
+    """
+    Bump now and again once the surrounding transaction commits, so a request
+    that read the old rows mid-transaction cannot pin them under the new version.
+    """
+    bump_catalog_version()
+    transaction.on_commit(bump_catalog_version)
+
+
+def catalog_cache_key(namespace, request, version=None):
+    """Cache key for a catalogue response, scoped by version, path, query and host."""
+    if version is None:
+        version = get_catalog_version()
+    query = '&'.join(f'{k}={v}' for k, v in sorted(request.query_params.lists()))
+    digest = hashlib.sha1(f'{request.get_host()}|{request.path}|{query}'.encode()).hexdigest()
+    return f'menu:{namespace}:{version}:{digest}'
+
+
+def cached_catalog_response(request, namespace, render, timeout=CATALOG_CACHE_TIMEOUT):
+    """
+    Serve ``render()`` (a view returning a Response) from the catalogue cache
+    with a strong ETag. A matching If-None-Match short-circuits to 304 before
+    any database work; otherwise the data is rendered once per version.
+    """
+    if not catalog_cache_enabled():
+        return render()
+    key = catalog_cache_key(namespace, request)
+    etag = '"%s"' % hashlib.md5(key.encode()).hexdigest()
+    headers = {'ETag': etag, 'Cache-Control': 'public, max-age=0, must-revalidate'}
+
+    if etag in parse_etags(request.META.get('HTTP_IF_NONE_MATCH', '')):
+        return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    data = cache.get(key)
+    if data is None:
+        response = render()
+        if response.status_code != status.HTTP_200_OK:
+            return response
+        data = response.data
+        cache.set(key, data, timeout)
+    return Response(data, headers=headers)
+
+
+class CatalogCacheMixin:
+    """Serve anonymous list requests through cached_catalog_response."""
+    catalog_cache_namespace = None
+    catalog_cache_timeout = CATALOG_CACHE_TIMEOUT
+
+    def list(self, request, *args, **kwargs):
+        if request.user.is_authenticated:
+            return super().list(request, *args, **kwargs)
+        return cached_catalog_response(
+            request,
+            self.catalog_cache_namespace or self.basename,
+            lambda: super(CatalogCacheMixin, self).list(request, *args, **kwargs),
+            self.catalog_cache_timeout,
+        )
@@ -0,0 +1,414 @@
+"""
+Bulk catalogue import/export for menu items.
+
+Rows are streamed from CSV or JSONL and written in fixed-size batches with
+``bulk_create(update_conflicts=True)`` keyed on ``slug``, so each batch costs
+a handful of queries however many rows it holds. Only the columns present in
+a row are updated; a file with just ``slug,price`` reprices existing items
+and leaves everything else alone.
+
+Bulk writes bypass ``post_save``, so the importer reindexes full-text search
+and ingredient/allergen tags for every batch and bumps the catalogue cache
+version itself. Image columns
+hold storage names only; run ``build_image_derivatives`` after importing new
+images.
+"""
+import csv
+import json
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+
+from django.db import transaction
+from django.utils.text import slugify
+from heddiekitchen.menu.cache import schedule_catalog_bump
+from heddiekitchen.menu.models import MenuCategory, MenuItem
+from heddiekitchen.menu.search import get_search_backend
+from heddiekitchen.menu.tags import sync_menu_item_tags
+
+FORMATS = ('csv', 'jsonl')
+CATEGORY_SEPARATOR = '|'
+TRUE_VALUES = {'1', 'true', 'yes', 'y', 'on'}
+FALSE_VALUES = {'0', 'false', 'no', 'n', 'off', ''}
+
+
+class CatalogImportError(Exception):
+    """An input row could not be imported."""
+
+    def __init__(self, line, message):
+        self.line = line
+        super().__init__(f'Line {line}: {message}')
+
+
+def _parse_text(value):
+    return '' if value is None else str(value).strip()
+
+
+def _parse_bool(value):
+    if isinstance(value, bool):
+        return value
+    text = _parse_text(value).lower()
+    if text in TRUE_VALUES:
+        return True
+    if text in FALSE_VALUES:
+        return False
+    raise ValueError(f'{value!r} is not a boolean')
+
+
+def _parse_int(value):
+    return int(_parse_text(value) or 0)
+
+
+def _parse_optional_int(value):
+    text = _parse_text(value)
+    return int(text) if text else None
+
+
+def _parse_price(value):
+    try:
+        price = Decimal(_parse_text(value)).quantize(Decimal('0.01'))
+    except InvalidOperation:
+        raise ValueError(f'{value!r} is not a price')
+    if price < 0:
+        raise ValueError('price cannot be negative')
+    return price
+
+
+def _parse_json(value):
+    if value is None or isinstance(value, (dict, list)):
+        return value
+    text = _parse_text(value)
+    return json.loads(text) if text else None
+
+
+# Column -> parser for the plain MenuItem fields, in export order
+ITEM_FIELDS = {
+    'name': _parse_text,
+    'description': _parse_text,
+    'price': _parse_price,
+    'image': _parse_text,
+    'prep_time_minutes': _parse_int,
+    'servings': _parse_int,
+    'is_available': _parse_bool,
+    'is_featured': _parse_bool,
+    'track_stock': _parse_bool,
+    'stock_quantity': _parse_int,
+    'calories': _parse_optional_int,
+    'ingredients': _parse_text,
+    'allergens': _parse_text,
+    'nutritional_info': _parse_json,
+}
+EXPORT_COLUMNS = ['slug', *ITEM_FIELDS, 'category', 'categories']
+REQUIRED_FOR_NEW = ('name', 'price')
+
+
+# --- Reading and writing -----------------------------------------------------
+
+def read_rows(stream, fmt):
+    """Yield (line number, row dict) from a CSV or JSONL text stream."""
+    if fmt == 'csv':
+        reader = csv.DictReader(stream)
+        for row in reader:
+            yield reader.line_num, {key.strip(): value for key, value in row.items() if key}
+    elif fmt == 'jsonl':
+        for line_num, line in enumerate(stream, start=1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError as e:
+                raise CatalogImportError(line_num, f'invalid JSON ({e})')
+            if not isinstance(row, dict):
+                raise CatalogImportError(line_num, 'expected a JSON object')
+            yield line_num, row
+    else:
+        raise ValueError(f'Unknown format {fmt!r}')
+
+
+def _export_row(item, fmt):
+    row = {'slug': item.slug}
+    for field in ITEM_FIELDS:
+        row[field] = getattr(item, field)
+    row['image'] = item.image.name if item.image else ''
+    row['price'] = str(item.price)
+    row['category'] = item.category.slug if item.category else ''
+    row['categories'] = [category.slug for category in item.categories.all()]
+    if fmt == 'csv':
+        row['categories'] = CATEGORY_SEPARATOR.join(row['categories'])
+        row['nutritional_info'] = json.dumps(row['nutritional_info']) if row['nutritional_info'] is not None else ''
+        row['calories'] = '' if row['calories'] is None else row['calories']
+        for field, parser in ITEM_FIELDS.items():
+            if parser is _parse_bool:
+                row[field] = 'true' if row[field] else 'false'
+    return row
+
+
+def export_catalog(stream, fmt, queryset=None, chunk_size=500):
+    """Write the catalogue to ``stream`` one chunk at a time. Returns the row count."""
+    if queryset is None:
+        queryset = MenuItem.objects.all()
+    queryset = queryset.select_related('category').prefetch_related('categories').order_by('pk')
+
+    writer = None
+    if fmt == 'csv':
+        writer = csv.DictWriter(stream, fieldnames=EXPORT_COLUMNS)
+        writer.writeheader()
+
+    count = 0
+    for item in queryset.iterator(chunk_size=chunk_size):
+        row = _export_row(item, fmt)
+        if writer:
+            writer.writerow(row)
+        else:
+            stream.write(json.dumps(row, ensure_ascii=False) + '\n')
+        count += 1
+    return count
+
+
+# --- Importing ---------------------------------------------------------------
+
+class SlugAllocator:
+    """
+    Resolve the slug of every imported row from an in-memory map of existing
+    slugs, so collisions never cost a query.
+
+    An explicit ``slug`` column is the upsert key. Without one the slug is
+    derived from the name; if that slug already belongs to an item with a
+    different name, a numeric suffix is added instead of overwriting it.
+    """
+    max_length = MenuItem._meta.get_field('slug').max_length
+
+    def __init__(self, existing):
+        self.existing = existing  # slug -> name
+        self.claimed = set()
+
+    def resolve(self, row):
+        slug = slugify(_parse_text(row.get('slug')))
+        if slug:
+            if slug in self.claimed:
+                raise ValueError(f'slug {slug!r} appears more than once')
+        else:
+            name = _parse_text(row.get('name'))
+            base = slugify(name)[:self.max_length]
+            if not base:
+                raise ValueError('a slug or a name is required')
+            slug = base
+            suffix = 1
+            while slug in self.claimed or self.existing.get(slug, name) != name:
+                suffix += 1
+                tail = f'-{suffix}'
+                slug = base[:self.max_length - len(tail)] + tail
+        self.claimed.add(slug)
+        return slug
+
+    def is_new(self, slug):
+        return slug not in self.existing
+
+
+class CategoryResolver:
+    """Map category slugs or names to ids, creating unknown categories per batch."""
+
+    def __init__(self, dry_run=False):
+        self.dry_run = dry_run
+        self.ids = {}
+        self.slugs = {}
+        for pk, slug, name in MenuCategory.objects.values_list('pk', 'slug', 'name'):
+            self.ids[slug] = self.ids[name.lower()] = pk
+            self.slugs[pk] = slug
+        self.created = 0
+
+    @staticmethod
+    def _key(value):
+        return _parse_text(value)
+
+    def lookup(self, value):
+        value = self._key(value)
+        return self.ids.get(value) or self.ids.get(value.lower()) or self.ids.get(slugify(value))
+
+    def ensure(self, values):
+        """Create any categories in ``values`` that do not exist yet."""
+        missing = {}
+        for value in values:
+            value = self._key(value)
+            if value and self.lookup(value) is None:
+                missing.setdefault(slugify(value), value)
+        if not missing:
+            return
+        self.created += len(missing)
+        if self.dry_run:
+            # Negative placeholder ids keep new categories distinguishable in the diff
+            for slug, name in missing.items():
+                placeholder = -len(self.ids) - 1
+                self.ids[slug] = self.ids[name.lower()] = placeholder
+                self.slugs[placeholder] = slug
+            return
+        MenuCategory.objects.bulk_create(
+            [MenuCategory(name=name, slug=slug) for slug, name in missing.items()]
+        )
+        for pk, slug, name in MenuCategory.objects.filter(slug__in=missing).values_list('pk', 'slug', 'name'):
+            self.ids[slug] = self.ids[name.lower()] = pk
+            self.slugs[pk] = slug
+
+    def slug(self, pk):
+        return self.slugs.get(pk, pk)
+
+
+def _split_categories(value):
+    if isinstance(value, list):
+        return [_parse_text(v) for v in value if _parse_text(v)]
+    return [part.strip() for part in _parse_text(value).split(CATEGORY_SEPARATOR) if part.strip()]
+
+
+class CatalogImporter:
+    """
+    Upsert menu items from parsed rows.
+
+    ``log`` receives one human-readable line per change in dry-run mode.
+    Counters are available on the instance after ``run``.
+    """
+
+    def __init__(self, batch_size=500, dry_run=False, log=None, using='default'):
+        self.batch_size = batch_size
+        self.dry_run = dry_run
+        self.log = log or (lambda line: None)
+        self.using = using
+        self.created = 0
+        self.updated = 0
+        self.unchanged = 0
+
+    @property
+    def categories_created(self):
+        return self.categories.created
+
+    def run(self, rows):
+        """Import ``rows`` (iterable of (line, dict)) in one transaction."""
+        self.slugs = SlugAllocator(dict(MenuItem.objects.values_list('slug', 'name').iterator()))
+        self.categories = CategoryResolver(dry_run=self.dry_run)
+        rows = iter(rows)
+        with transaction.atomic(using=self.using):
+            while True:
+                batch = list(islice(rows, self.batch_size))
+                if not batch:
+                    break
+                self._import_batch([self._clean(line, row) for line, row in batch])
+            if self.dry_run:
+                transaction.set_rollback(True, using=self.using)
+            elif self.created or self.updated:
+                schedule_catalog_bump()
+
+    def _clean(self, line, row):
+        """Parse one raw row into (line, slug, field values, category, categories)."""
+        try:
+            values = {field: parser(row[field]) for field, parser in ITEM_FIELDS.items() if field in row}
+            slug = self.slugs.resolve(row)
+            if self.slugs.is_new(slug):
+                missing = [field for field in REQUIRED_FOR_NEW if not values.get(field)]
+                if missing:
+                    raise ValueError(f'new item {slug!r} needs {", ".join(missing)}')
+        except (ValueError, TypeError) as e:
+            raise CatalogImportError(line, e)
+        category = _parse_text(row['category']) if 'category' in row else None
+        categories = _split_categories(row['categories']) if 'categories' in row else None
+        return line, slug, values, category, categories
+
+    def _import_batch(self, rows):
+        self.categories.ensure(
+            [category for _, _, _, category, _ in rows if category]
+            + [value for _, _, _, _, categories in rows if categories for value in categories]
+        )
+        # Rows with the same columns share one upsert statement
+        groups = {}
+        for row in rows:
+            _, _, values, category, categories = row
+            key = (frozenset(values), category is not None, categories is not None)
+            groups.setdefault(key, []).append(row)
+        for (fields, has_category, has_categories), group in groups.items():
+            if self.dry_run:
+                self._diff_group(sorted(fields), has_category, has_categories, group)
+            else:
+                self._write_group(sorted(fields), has_category, has_categories, group)
+
+    def _build_item(self, slug, values, category):
+        # Existing rows only take the update_fields from the conflict clause,
+        # but the INSERT half still needs every NOT NULL column filled in
+        item = MenuItem(slug=slug, **{'price': Decimal('0.00'), **values})
+        if category is not None:
+            item.category_id = self.categories.lookup(category) if category else None
+        return item
+
+    def _write_group(self, fields, has_category, has_categories, group):
+        update_fields = list(fields) + ['updated_at']
+        if has_category:
+            update_fields.append('category')
+        for _, slug, _, _, _ in group:
+            if self.slugs.is_new(slug):
+                self.created += 1
+            else:
+                self.updated += 1
+
+        MenuItem.objects.bulk_create(
+            [self._build_item(slug, values, category) for _, slug, values, category, _ in group],
+            update_conflicts=True,
+            unique_fields=['slug'],
+            update_fields=update_fields,
+        )
+        ids = dict(MenuItem.objects.filter(slug__in=[row[1] for row in group]).values_list('slug', 'pk'))
+
+        if has_categories:
+            through = MenuItem.categories.through
+            through.objects.filter(menuitem_id__in=ids.values()).delete()
+            through.objects.bulk_create([
+                through(menuitem_id=ids[slug], menucategory_id=category_id)
+                for _, slug, _, _, categories in group
+                for category_id in {self.categories.lookup(value) for value in categories}
+            ])
+
+        has_new = any(self.slugs.is_new(row[1]) for row in group)
+        if {'name', 'ingredients', 'description'} & set(fields) or has_new:
+            get_search_backend(self.using).index(list(ids.values()), using=self.using)
+        if {'ingredients', 'allergens'} & set(fields) or has_new:
+            sync_menu_item_tags(ids.values(), using=self.using)
+
+    def _diff_group(self, fields, has_category, has_categories, group):
+        columns = list(fields) + (['category_id'] if has_category else [])
+        current = {
+            row['slug']: row
+            for row in MenuItem.objects.filter(slug__in=[row[1] for row in group]).values('pk', 'slug', *columns)
+        }
+        memberships = {}
+        if has_categories:
+            through = MenuItem.categories.through
+            for item_id, category_id in through.objects.filter(
+                menuitem_id__in=[row['pk'] for row in current.values()]
+            ).values_list('menuitem_id', 'menucategory_id'):
+                memberships.setdefault(item_id, set()).add(category_id)
+
+        for _, slug, values, category, categories in group:
+            if slug not in current:
+                self.created += 1
+                self.log(f'+ {slug}')
+                continue
+            existing = current[slug]
+            changes = [
+                f'{field}: {existing[field]!r} -> {value!r}'
+                for field, value in sorted(values.items())
+                if existing[field] != value
+            ]
+            if has_category:
+                category_id = self.categories.lookup(category) if category else None
+                if existing['category_id'] != category_id:
+                    changes.append(
+                        f'category: {self.categories.slug(existing["category_id"])!r} -> {self.categories.slug(category_id)!r}'
+                    )
+            if has_categories:
+                before = memberships.get(existing['pk'], set())
+                after = {self.categories.lookup(value) for value in categories}
+                if before != after:
+                    changes.append('categories: {} -> {}'.format(
+                        sorted(self.categories.slug(pk) for pk in before),
+                        sorted(self.categories.slug(pk) for pk in after),
+                    ))
+            if changes:
+                self.updated += 1
+                self.log(f'~ {slug}: ' + '; '.join(changes))
+            else:
+                self.unchanged += 1
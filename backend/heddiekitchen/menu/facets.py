@@ -0,0 +1,97 @@
+"""
+Facet counts for menu browsing.
+
+All counts for a filtered queryset come from one aggregate query: every facet
+value is a ``Count(..., filter=Q(...), distinct=True)`` over the same rows, so
+the M2M join cannot inflate the numbers. The category list the aggregates are
+built from is cached per catalogue version when CATALOG_CACHE_ENABLED is set.
+"""
+from django.core.cache import cache
+from django.db.models import Count, Q
+from heddiekitchen.menu.cache import CATALOG_CACHE_TIMEOUT, catalog_cache_enabled, get_catalog_version
+from heddiekitchen.menu.models import MenuCategory
+
+# (key, min, max) with half-open bounds; they map onto MenuItemFilter params
+PRICE_BUCKETS = [
+    ('under_2000', None, 2000),
+    ('2000_5000', 2000, 5000),
+    ('5000_10000', 5000, 10000),
+    ('10000_plus', 10000, None),
+]
+PREP_TIME_BUCKETS = [
+    ('under_15', None, 15),
+    ('15_30', 15, 30),
+    ('30_60', 30, 60),
+    ('60_plus', 60, None),
+]
+
+
+def _active_categories():
+    return list(
+        MenuCategory.objects.filter(is_active=True)
+        .order_by('display_order', 'name')
+        .values('id', 'name', 'slug')
+    )
+
+
+def get_facet_categories():
+    """Active categories as dicts, cached until the catalogue changes."""
+    if not catalog_cache_enabled():
+        return _active_categories()
+    key = f'menu:facet_categories:{get_catalog_version()}'
+    categories = cache.get(key)
+    if categories is None:
+        categories = _active_categories()
+        cache.set(key, categories, CATALOG_CACHE_TIMEOUT)
+    return categories
+
+
+def _range_q(field, low, high):
+    condition = Q()
+    if low is not None:
+        condition &= Q(**{f'{field}__gte': low})
+    if high is not None:
+        condition &= Q(**{f'{field}__lt': high})
+    return condition
+
+
+def _count(condition=None):
+    return Count('pk', filter=condition, distinct=True)
+
+
+def compute_facets(queryset, categories=None):
+    """Return facet counts for ``queryset`` using a single aggregate query."""
+    if categories is None:
+        categories = get_facet_categories()
+
+    aggregates = {'total': _count(), 'featured': _count(Q(is_featured=True))}
+    for category in categories:
+        aggregates[f'category_{category["id"]}'] = _count(Q(category_id=category['id']))
+        aggregates[f'categories_{category["id"]}'] = _count(Q(categories__id=category['id']))
+    for key, low, high in PRICE_BUCKETS:
+        aggregates[f'price_{key}'] = _count(_range_q('price', low, high))
+    for key, low, high in PREP_TIME_BUCKETS:
+        aggregates[f'prep_{key}'] = _count(_range_q('prep_time_minutes', low, high))
+
+    counts = queryset.order_by().aggregate(**aggregates)
+
+    def category_counts(prefix):
+        return [
+            {**category, 'count': counts[f'{prefix}_{category["id"]}']}
+            for category in categories
+        ]
+
+    return {
+        'total': counts['total'],
+        'category': category_counts('category'),
+        'categories': category_counts('categories'),
+        'is_featured': {'true': counts['featured'], 'false': counts['total'] - counts['featured']},
+        'price': [
+            {'key': key, 'min': low, 'max': high, 'count': counts[f'price_{key}']}
+            for key, low, high in PRICE_BUCKETS
+        ],
+        'prep_time': [
+            {'key': key, 'min': low, 'max': high, 'count': counts[f'prep_{key}']}
+            for key, low, high in PREP_TIME_BUCKETS
+        ],
+    }
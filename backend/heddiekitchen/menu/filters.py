@@ -0,0 +1,45 @@
+"""
+Filters for menu app.
+"""
+import django_filters
+from django.db.models import Exists, OuterRef
+from heddiekitchen.menu.models import MenuItem
+from heddiekitchen.menu.tags import parse_tag_slugs
+
+
+class MenuItemFilter(django_filters.FilterSet):
+    """
+    Menu item filters. Range bounds are half-open (min <= value < max) to
+    match the facet buckets in menu/facets.py.
+
+    ``exclude_allergens`` and ``contains_ingredient`` take comma-separated
+    names or slugs and match whole tags through the indexed M2M tables.
+    """
+    categories = django_filters.NumberFilter(field_name='categories', distinct=True)
+    min_price = django_filters.NumberFilter(field_name='price', lookup_expr='gte')
+    max_price = django_filters.NumberFilter(field_name='price', lookup_expr='lt')
+    min_prep_time = django_filters.NumberFilter(field_name='prep_time_minutes', lookup_expr='gte')
+    max_prep_time = django_filters.NumberFilter(field_name='prep_time_minutes', lookup_expr='lt')
+    exclude_allergens = django_filters.CharFilter(method='filter_exclude_allergens')
+    contains_ingredient = django_filters.CharFilter(method='filter_contains_ingredient')
+
+    class Meta:
+        model = MenuItem
+        fields = ['category', 'is_featured', 'is_available']
+
+    def filter_exclude_allergens(self, queryset, name, value):
+        slugs = parse_tag_slugs(value)
+        if not slugs:
+            return queryset
+        tagged = MenuItem.allergen_tags.through.objects.filter(
+            menuitem_id=OuterRef('pk'), allergen__slug__in=slugs
+        )
+        return queryset.filter(~Exists(tagged))
+
+    def filter_contains_ingredient(self, queryset, name, value):
+        # Every listed ingredient must be present
+        for slug in parse_tag_slugs(value):
+            queryset = queryset.filter(Exists(
+                MenuItem.ingredient_tags.through.objects.filter(menuitem_id=OuterRef('pk'), ingredient__slug=slug)
+            ))
+        return queryset
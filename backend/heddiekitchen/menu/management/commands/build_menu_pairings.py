@@ -0,0 +1,22 @@
+"""
+Management command to rebuild "frequently bought together" recommendations.
+Usage: python manage.py build_menu_pairings [--top-n 10] [--min-support 2] [--chunk-size 5000]
+"""
+from django.core.management.base import BaseCommand
+from heddiekitchen.menu.pairings import DEFAULT_MIN_SUPPORT, DEFAULT_TOP_N, build_pairings
+
+
+class Command(BaseCommand):
+    help = 'Compute item co-occurrence lift from paid orders and store the top neighbours per item'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top-n', type=int, default=DEFAULT_TOP_N, help='Neighbours kept per item')
+        parser.add_argument('--min-support', type=int, default=DEFAULT_MIN_SUPPORT,
+                            help='Minimum paid orders containing a pair')
+        parser.add_argument('--chunk-size', type=int, default=5000, help='Order items fetched per query')
+
+    def handle(self, *args, **options):
+        orders, rows = build_pairings(
+            top_n=options['top_n'], min_support=options['min_support'], chunk_size=options['chunk_size']
+        )
+        self.stdout.write(self.style.SUCCESS(f'Read {orders} paid order(s); stored {rows} pairing(s)'))
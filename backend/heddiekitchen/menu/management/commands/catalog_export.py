@@ -0,0 +1,34 @@
+"""
+Management command to export the menu catalogue as CSV or JSONL.
+Usage: python manage.py catalog_export [--output items.csv] [--format csv|jsonl] [--batch-size 500]
+
+Writes to stdout unless --output is given. The output can be edited and fed
+back to catalog_import.
+"""
+from django.core.management.base import BaseCommand, CommandError
+from heddiekitchen.menu.catalog import FORMATS, export_catalog
+from heddiekitchen.menu.management.commands.catalog_import import guess_format
+
+
+class Command(BaseCommand):
+    help = 'Stream every menu item to a CSV or JSONL file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('-o', '--output', default='-', help='File to write, or - for stdout')
+        parser.add_argument('--format', choices=FORMATS, help='Output format (default: from the file extension, csv for stdout)')
+        parser.add_argument('--batch-size', type=int, default=500, help='Rows fetched per query')
+
+    def handle(self, *args, **options):
+        path = options['output']
+        if path == '-':
+            fmt = options['format'] or 'csv'
+            export_catalog(self.stdout, fmt, chunk_size=options['batch_size'])
+            return
+
+        fmt = guess_format(path, options['format'])
+        try:
+            with open(path, 'w', newline='', encoding='utf-8') as stream:
+                count = export_catalog(stream, fmt, chunk_size=options['batch_size'])
+        except OSError as e:
+            raise CommandError(f'Could not write {path}: {e}')
+        self.stdout.write(self.style.SUCCESS(f'Exported {count} menu item(s) to {path}'))
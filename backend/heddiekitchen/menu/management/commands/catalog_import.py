@@ -0,0 +1,61 @@
+"""
+Management command to bulk import or reprice menu items from CSV or JSONL.
+Usage: python manage.py catalog_import items.csv [--format csv|jsonl] [--batch-size 500] [--dry-run]
+
+Use "-" to read from stdin. Columns match catalog_export; only the columns
+present are updated.
+"""
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+from heddiekitchen.menu.catalog import FORMATS, CatalogImportError, CatalogImporter, read_rows
+
+
+def guess_format(path, fmt):
+    if fmt:
+        return fmt
+    if path.endswith('.csv'):
+        return 'csv'
+    if path.endswith('.jsonl') or path.endswith('.ndjson'):
+        return 'jsonl'
+    raise CommandError('Cannot tell the file format from its name; pass --format')
+
+
+class Command(BaseCommand):
+    help = 'Upsert menu items, categories and category memberships from a CSV or JSONL file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='File to import, or - for stdin')
+        parser.add_argument('--format', choices=FORMATS, help='Input format (default: from the file extension)')
+        parser.add_argument('--batch-size', type=int, default=500, help='Rows written per batch')
+        parser.add_argument('--dry-run', action='store_true', help='Print the changes without writing them')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        fmt = guess_format(path, options['format'])
+        importer = CatalogImporter(
+            batch_size=options['batch_size'],
+            dry_run=options['dry_run'],
+            log=self.stdout.write,
+        )
+
+        stream = None
+        try:
+            stream = sys.stdin if path == '-' else open(path, newline='', encoding='utf-8-sig')
+            importer.run(read_rows(stream, fmt))
+        except CatalogImportError as e:
+            raise CommandError(str(e))
+        except OSError as e:
+            raise CommandError(f'Could not read {path}: {e}')
+        finally:
+            if stream is not None and stream is not sys.stdin:
+                stream.close()
+
+        summary = (
+            f'{importer.created} created, {importer.updated} updated, '
+            f'{importer.categories_created} new categories'
+        )
+        if options['dry_run']:
+            self.stdout.write(self.style.WARNING(f'Dry run: {summary}, {importer.unchanged} unchanged'))
+        else:
+            self.stdout.write(self.style.SUCCESS(f'Imported catalogue: {summary}'))
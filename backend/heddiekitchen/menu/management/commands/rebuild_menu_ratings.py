@@ -0,0 +1,57 @@
+"""
+Management command to rebuild the denormalized rating aggregates on menu items.
+Usage: python manage.py rebuild_menu_ratings [--batch-size 500]
+"""
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count
+from heddiekitchen.menu.models import HISTOGRAM_FIELDS, RATING_VALUES, MenuItem, MenuItemReview
+
+FIELDS = ['rating_sum', 'rating_count', 'average_rating', *HISTOGRAM_FIELDS]
+
+
+class Command(BaseCommand):
+    help = 'Recompute rating_sum, rating_count, average_rating and the star histogram for all menu items'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Number of menu items written per UPDATE batch',
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+
+        # One grouped query for every (item, stars) pair that has reviews
+        histograms = {}
+        for row in MenuItemReview.objects.values('menu_item', 'rating').annotate(count=Count('id')).order_by():
+            histograms.setdefault(row['menu_item'], {})[f"rating_{row['rating']}_count"] = row['count']
+
+        updated = 0
+        batch = []
+        items = MenuItem.objects.only('id', *FIELDS).order_by('id')
+        with transaction.atomic():
+            for item in items.iterator(chunk_size=batch_size):
+                histogram = histograms.get(item.id, {})
+                values = {field: histogram.get(field, 0) for field in HISTOGRAM_FIELDS}
+                values['rating_count'] = sum(histogram.values())
+                values['rating_sum'] = sum(
+                    stars * histogram.get(f'rating_{stars}_count', 0) for stars in RATING_VALUES
+                )
+                values['average_rating'] = MenuItem.compute_average_rating(values['rating_sum'], values['rating_count'])
+                if all(getattr(item, field) == value for field, value in values.items()):
+                    continue
+                for field, value in values.items():
+                    setattr(item, field, value)
+                batch.append(item)
+                if len(batch) >= batch_size:
+                    MenuItem.objects.bulk_update(batch, FIELDS)
+                    updated += len(batch)
+                    batch = []
+            if batch:
+                MenuItem.objects.bulk_update(batch, FIELDS)
+                updated += len(batch)
+
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt rating aggregates for {updated} menu item(s)'))
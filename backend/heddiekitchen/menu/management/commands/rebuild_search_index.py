@@ -0,0 +1,19 @@
+"""
+Management command to (re)build the menu full-text search index.
+Usage: python manage.py rebuild_search_index
+"""
+from django.core.management.base import BaseCommand
+from heddiekitchen.menu.search import get_search_backend
+
+
+class Command(BaseCommand):
+    help = 'Reindex every menu item in the full-text search index (created by migrate)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default='default', help='Database alias to index')
+
+    def handle(self, *args, **options):
+        using = options['database']
+        backend = get_search_backend(using)
+        backend.reindex_all(using=using)
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt menu search index using {backend.__class__.__name__}'))
@@ -0,0 +1,23 @@
+"""
+Management command to refresh the materialized bestseller rankings.
+Usage: python manage.py refresh_menu_popularity [--full] [--batch-size 1000]
+
+Only orders paid since the last run are read; schedule it from cron
+(e.g. every 15 minutes). --full rebuilds the sales history from scratch.
+"""
+from django.core.management.base import BaseCommand
+from heddiekitchen.menu.popularity import refresh_popularity
+
+
+class Command(BaseCommand):
+    help = 'Fold newly paid orders into menu sales and re-rank the popularity windows'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true', help='Discard stored daily sales and rebuild from orders')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Orders read per batch')
+
+    def handle(self, *args, **options):
+        folded, ranked = refresh_popularity(full=options['full'], batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Folded {folded} paid order(s); wrote {ranked} popularity row(s)'
+        ))
@@ -0,0 +1,45 @@
+# Generated by Django 4.2.11 on 2026-10-17 17:23
+
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def backfill_rating_aggregates(apps, schema_editor):
+    """Populate the new aggregate columns from existing reviews."""
+    MenuItem = apps.get_model('menu', 'MenuItem')
+    MenuItemReview = apps.get_model('menu', 'MenuItemReview')
+    totals = MenuItemReview.objects.values('menu_item').annotate(
+        rating_sum=Sum('rating'), rating_count=Count('id')
+    ).order_by()
+    for row in totals:
+        MenuItem.objects.filter(pk=row['menu_item']).update(
+            rating_sum=row['rating_sum'],
+            rating_count=row['rating_count'],
+            average_rating=round(row['rating_sum'] / row['rating_count'], 1),
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('menu', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='menuitem',
+            name='average_rating',
+            field=models.FloatField(blank=True, editable=False, help_text='Average review rating (1 decimal)', null=True),
+        ),
+        migrations.AddField(
+            model_name='menuitem',
+            name='rating_count',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text='Number of reviews'),
+        ),
+        migrations.AddField(
+            model_name='menuitem',
+            name='rating_sum',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text='Sum of all review ratings'),
+        ),
+        migrations.RunPython(backfill_rating_aggregates, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 4.2.11 on 2026-10-17 17:33
+
+from django.db import migrations, models
+
+
+def enable_tracking_for_limited_items(apps, schema_editor):
+    """Items with a positive stock_quantity were meant to be limited (0 used to mean unlimited)."""
+    MenuItem = apps.get_model('menu', 'MenuItem')
+    MenuItem.objects.filter(stock_quantity__gt=0).update(track_stock=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('menu', '0002_menuitem_rating_aggregates'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='menuitem',
+            name='track_stock',
+            field=models.BooleanField(default=False, help_text='Enforce stock_quantity at checkout and hide the item when it sells out'),
+        ),
+        migrations.AlterField(
+            model_name='menuitem',
+            name='stock_quantity',
+            field=models.IntegerField(default=0, help_text='Available quantity (ignored unless track_stock is on)'),
+        ),
+        migrations.RunPython(enable_tracking_for_limited_items, migrations.RunPython.noop),
+    ]
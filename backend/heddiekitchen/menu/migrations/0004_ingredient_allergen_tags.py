@@ -0,0 +1,79 @@
+# Generated by Django 4.2.11 on 2026-10-17 17:38
+
+import re
+
+from django.db import migrations, models
+from django.utils.text import slugify
+
+
+def parse_tags(text):
+    # Frozen copy of heddiekitchen.menu.tags.parse_tags
+    tags = {}
+    for part in re.split(r'[,;\n]', text or ''):
+        name = re.sub(r'\s+', ' ', part).strip()[:100]
+        slug = slugify(name)[:100]
+        if slug:
+            tags.setdefault(slug, name)
+    return tags
+
+
+def backfill_tags(apps, schema_editor):
+    """Parse the existing ingredient and allergen text of every menu item."""
+    MenuItem = apps.get_model('menu', 'MenuItem')
+    for field, model_name, m2m, column in [
+        ('ingredients', 'Ingredient', 'ingredient_tags', 'ingredient_id'),
+        ('allergens', 'Allergen', 'allergen_tags', 'allergen_id'),
+    ]:
+        model = apps.get_model('menu', model_name)
+        parsed = {pk: parse_tags(text) for pk, text in MenuItem.objects.values_list('pk', field)}
+        names = {slug: name for tags in parsed.values() for slug, name in tags.items()}
+        model.objects.bulk_create([model(slug=slug, name=name) for slug, name in names.items()], ignore_conflicts=True)
+        ids = dict(model.objects.values_list('slug', 'pk'))
+        through = getattr(MenuItem, m2m).through
+        through.objects.bulk_create(
+            [through(menuitem_id=pk, **{column: ids[slug]}) for pk, tags in parsed.items() for slug in tags],
+            batch_size=1000,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('menu', '0003_menuitem_track_stock'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Allergen',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100)),
+                ('slug', models.SlugField(max_length=100, unique=True)),
+            ],
+            options={
+                'ordering': ['name'],
+            },
+        ),
+        migrations.CreateModel(
+            name='Ingredient',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100)),
+                ('slug', models.SlugField(max_length=100, unique=True)),
+            ],
+            options={
+                'ordering': ['name'],
+            },
+        ),
+        migrations.AddField(
+            model_name='menuitem',
+            name='allergen_tags',
+            field=models.ManyToManyField(blank=True, editable=False, help_text='Parsed from allergens on save', related_name='menu_items', to='menu.allergen'),
+        ),
+        migrations.AddField(
+            model_name='menuitem',
+            name='ingredient_tags',
+            field=models.ManyToManyField(blank=True, editable=False, help_text='Parsed from ingredients on save', related_name='menu_items', to='menu.ingredient'),
+        ),
+        migrations.RunPython(backfill_tags, migrations.RunPython.noop),
+    ]
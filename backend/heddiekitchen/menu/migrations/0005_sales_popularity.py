@@ -0,0 +1,69 @@
+# Generated by Django 4.2.11 on 2026-10-17 17:40
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('menu', '0004_ingredient_allergen_tags'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PopularityWatermark',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('last_paid_at', models.DateTimeField(blank=True, null=True)),
+                ('last_order_id', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='MenuItemPopularity',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('window_days', models.PositiveSmallIntegerField(choices=[(7, '7 days'), (30, '30 days'), (90, '90 days')])),
+                ('quantity', models.PositiveIntegerField(default=0)),
+                ('order_count', models.PositiveIntegerField(default=0)),
+                ('rank', models.PositiveIntegerField(help_text='Rank across the whole menu')),
+                ('category_rank', models.PositiveIntegerField(help_text='Rank within the category')),
+                ('refreshed_at', models.DateTimeField()),
+                ('category', models.ForeignKey(blank=True, help_text="The item's category at refresh time", null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='menu.menucategory')),
+                ('menu_item', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='popularity', to='menu.menuitem')),
+            ],
+            options={
+                'verbose_name_plural': 'Menu item popularity',
+            },
+        ),
+        migrations.CreateModel(
+            name='MenuItemSalesDay',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('quantity', models.PositiveIntegerField(default=0)),
+                ('order_count', models.PositiveIntegerField(default=0)),
+                ('menu_item', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='sales_days', to='menu.menuitem')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['date'], name='menu_menuit_date_11cd08_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='menuitemsalesday',
+            constraint=models.UniqueConstraint(fields=('menu_item', 'date'), name='menu_sales_day_unique'),
+        ),
+        migrations.AddIndex(
+            model_name='menuitempopularity',
+            index=models.Index(fields=['window_days', 'rank'], name='menu_menuit_window__58e9b4_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='menuitempopularity',
+            index=models.Index(fields=['window_days', 'category', 'category_rank'], name='menu_menuit_window__a1e620_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='menuitempopularity',
+            constraint=models.UniqueConstraint(fields=('menu_item', 'window_days'), name='menu_popularity_unique'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 4.2.11 on 2026-10-17 17:41
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('menu', '0005_sales_popularity'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MenuItemPairing',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('co_occurrences', models.PositiveIntegerField(help_text='Paid orders containing both items')),
+                ('lift', models.FloatField(help_text='How much more often the pair is bought together than by chance')),
+                ('rank', models.PositiveSmallIntegerField()),
+                ('menu_item', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='pairings', to='menu.menuitem')),
+                ('paired_item', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='menu.menuitem')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['menu_item', 'rank'], name='menu_menuit_menu_it_4912ff_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='menuitempairing',
+            constraint=models.UniqueConstraint(fields=('menu_item', 'paired_item'), name='menu_pairing_unique'),
+        ),
+    ]
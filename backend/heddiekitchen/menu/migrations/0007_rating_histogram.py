@@ -0,0 +1,59 @@
+# Generated by Django 4.2.11 on 2026-10-17 17:48
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def backfill_rating_histogram(apps, schema_editor):
+    """Populate the per-star counts from existing reviews."""
+    MenuItem = apps.get_model('menu', 'MenuItem')
+    MenuItemReview = apps.get_model('menu', 'MenuItemReview')
+    histograms = {}
+    for row in MenuItemReview.objects.values('menu_item', 'rating').annotate(count=Count('id')).order_by():
+        histograms.setdefault(row['menu_item'], {})[f"rating_{row['rating']}_count"] = row['count']
+    for pk, counts in histograms.items():
+        MenuItem.objects.filter(pk=pk).update(**counts)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('menu', '0006_menuitempairing'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='menuitem',
+            name='rating_1_count',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text='Number of 1-star reviews'),
+        ),
+        migrations.AddField(
+            model_name='menuitem',
+            name='rating_2_count',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text='Number of 2-star reviews'),
+        ),
+        migrations.AddField(
+            model_name='menuitem',
+            name='rating_3_count',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text='Number of 3-star reviews'),
+        ),
+        migrations.AddField(
+            model_name='menuitem',
+            name='rating_4_count',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text='Number of 4-star reviews'),
+        ),
+        migrations.AddField(
+            model_name='menuitem',
+            name='rating_5_count',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text='Number of 5-star reviews'),
+        ),
+        migrations.AddIndex(
+            model_name='menuitemreview',
+            index=models.Index(fields=['menu_item', '-created_at', '-id'], name='menu_menuit_menu_it_352fdc_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='menuitemreview',
+            index=models.Index(fields=['menu_item', '-rating', '-created_at', '-id'], name='menu_menuit_menu_it_b8b0ef_idx'),
+        ),
+        migrations.RunPython(backfill_rating_histogram, migrations.RunPython.noop),
+    ]
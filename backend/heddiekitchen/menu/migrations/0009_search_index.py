@@ -0,0 +1,56 @@
+# Generated by Django 4.2.11 on 2026-10-17 18:40
+
+from django.db import migrations
+
+TABLE = 'menu_menuitem'
+FTS_TABLE = 'menu_menuitem_fts'
+GIN_INDEX = 'menu_menuitem_search_gin'
+
+
+def create_search_index(apps, schema_editor):
+    """
+    Full-text structures for menu/search.py: a weighted tsvector column with a
+    GIN index on PostgreSQL, an FTS5 shadow table on SQLite, nothing elsewhere.
+    IF NOT EXISTS tolerates structures made by the old post_migrate hook, and
+    existing rows are indexed once.
+    """
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute(f'ALTER TABLE {TABLE} ADD COLUMN IF NOT EXISTS search_vector tsvector')
+        schema_editor.execute(f'CREATE INDEX IF NOT EXISTS {GIN_INDEX} ON {TABLE} USING gin (search_vector)')
+        schema_editor.execute(
+            f"UPDATE {TABLE} SET search_vector = "
+            f"setweight(to_tsvector('english', coalesce(name, '')), 'A') || "
+            f"setweight(to_tsvector('english', coalesce(ingredients, '')), 'B') || "
+            f"setweight(to_tsvector('english', coalesce(description, '')), 'C')"
+        )
+    elif vendor == 'sqlite':
+        schema_editor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+            f"name, ingredients, description, tokenize='porter unicode61')"
+        )
+        schema_editor.execute(f'DELETE FROM {FTS_TABLE}')
+        schema_editor.execute(
+            f'INSERT INTO {FTS_TABLE} (rowid, name, ingredients, description) '
+            f'SELECT id, name, ingredients, description FROM {TABLE}'
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute(f'DROP INDEX IF EXISTS {GIN_INDEX}')
+        schema_editor.execute(f'ALTER TABLE {TABLE} DROP COLUMN IF EXISTS search_vector')
+    elif vendor == 'sqlite':
+        schema_editor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('menu', '0008_image_derivatives'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 4.2.11 on 2026-10-17 18:42
+
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def backfill_sold_out(apps, schema_editor):
+    """Treat tracked items already hidden at zero stock as sold out, as restocking did until now."""
+    MenuItem = apps.get_model('menu', 'MenuItem')
+    MenuItem.objects.filter(track_stock=True, stock_quantity__lte=0, is_available=False).update(
+        sold_out_at=timezone.now()
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('menu', '0009_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='menuitem',
+            name='sold_out_at',
+            field=models.DateTimeField(blank=True, editable=False, help_text='Set when the item sold out; only these are re-listed on restock', null=True),
+        ),
+        migrations.RunPython(backfill_sold_out, migrations.RunPython.noop),
+    ]
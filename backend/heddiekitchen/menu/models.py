@@ -1,9 +1,12 @@
 """
 Models for menu app.
 """
-from django.db import models
+from django.db import models, transaction
 from django.utils.text import slugify
 
+RATING_VALUES = range(1, 6)
+HISTOGRAM_FIELDS = [f'rating_{stars}_count' for stars in RATING_VALUES]
+
 
 class MenuCategory(models.Model):
     """Menu item categories (Soups, Proteins, Rice meals, etc.)."""
@@ -28,6 +31,30 @@ class MenuCategory(models.Model):
         super().save(*args, **kwargs)
 
 
+class Allergen(models.Model):
+    """Normalized allergen parsed from MenuItem.allergens."""
+    name = models.CharField(max_length=100)
+    slug = models.SlugField(max_length=100, unique=True)
+
+    class Meta:
+        ordering = ['name']
+
+    def __str__(self):
+        return self.name
+
+
+class Ingredient(models.Model):
+    """Normalized ingredient parsed from MenuItem.ingredients."""
+    name = models.CharField(max_length=100)
+    slug = models.SlugField(max_length=100, unique=True)
+
+    class Meta:
+        ordering = ['name']
+
+    def __str__(self):
+        return self.name
+
+
 class MenuItem(models.Model):
     """Menu items available for purchase."""
     name = models.CharField(max_length=200)
@@ -37,15 +64,30 @@ class MenuItem(models.Model):
     category = models.ForeignKey(MenuCategory, on_delete=models.SET_NULL, null=True, blank=True, related_name='items')
     categories = models.ManyToManyField(MenuCategory, related_name='menu_items', blank=True)
     image = models.ImageField(upload_to='menu_items/')
+    image_derivatives = models.JSONField(default=dict, blank=True, editable=False)
     prep_time_minutes = models.IntegerField(default=30, help_text='Preparation time in minutes')
     servings = models.IntegerField(default=1, help_text='Number of servings')
     is_available = models.BooleanField(default=True)
     is_featured = models.BooleanField(default=False)
-    stock_quantity = models.IntegerField(default=0, help_text='Available quantity (0 = unlimited)')
+    track_stock = models.BooleanField(default=False, help_text='Enforce stock_quantity at checkout and hide the item when it sells out')
+    stock_quantity = models.IntegerField(default=0, help_text='Available quantity (ignored unless track_stock is on)')
+    sold_out_at = models.DateTimeField(null=True, blank=True, editable=False, help_text='Set when the item sold out; only these are re-listed on restock')
     calories = models.IntegerField(null=True, blank=True)
     ingredients = models.TextField(blank=True, help_text='Comma-separated ingredients')
     allergens = models.TextField(blank=True, help_text='Comma-separated allergens')
+    ingredient_tags = models.ManyToManyField(Ingredient, related_name='menu_items', blank=True, editable=False,
+                                             help_text='Parsed from ingredients on save')
+    allergen_tags = models.ManyToManyField(Allergen, related_name='menu_items', blank=True, editable=False,
+                                           help_text='Parsed from allergens on save')
     nutritional_info = models.JSONField(null=True, blank=True, help_text='Nutritional info as JSON')
+    rating_sum = models.PositiveIntegerField(default=0, editable=False, help_text='Sum of all review ratings')
+    rating_count = models.PositiveIntegerField(default=0, editable=False, help_text='Number of reviews')
+    average_rating = models.FloatField(null=True, blank=True, editable=False, help_text='Average review rating (1 decimal)')
+    rating_1_count = models.PositiveIntegerField(default=0, editable=False, help_text='Number of 1-star reviews')
+    rating_2_count = models.PositiveIntegerField(default=0, editable=False, help_text='Number of 2-star reviews')
+    rating_3_count = models.PositiveIntegerField(default=0, editable=False, help_text='Number of 3-star reviews')
+    rating_4_count = models.PositiveIntegerField(default=0, editable=False, help_text='Number of 4-star reviews')
+    rating_5_count = models.PositiveIntegerField(default=0, editable=False, help_text='Number of 5-star reviews')
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -60,11 +102,46 @@ class MenuItem(models.Model):
             self.slug = slugify(self.name)
         super().save(*args, **kwargs)
 
+    @staticmethod
+    def compute_average_rating(rating_sum, rating_count):
+        """Average rating rounded to one decimal, or None without reviews."""
+        if not rating_count:
+            return None
+        return round(rating_sum / rating_count, 1)
+
+    @property
+    def rating_histogram(self):
+        """Review counts per star, {1: n, ..., 5: n}."""
+        return {stars: getattr(self, f'rating_{stars}_count') for stars in RATING_VALUES}
+
+    @classmethod
+    def apply_rating_change(cls, pk, rating=None, previous_rating=None):
+        """
+        Apply a review rating change to the stored aggregates: ``rating``
+        alone adds a review, ``previous_rating`` alone removes one, both
+        move an existing review between stars.
+        Locks the menu item row so concurrent reviews cannot lose updates.
+        """
+        fields = ['rating_sum', 'rating_count', 'average_rating']
+        with transaction.atomic():
+            item = cls.objects.select_for_update().only('slug', 'rating_sum', 'rating_count', *HISTOGRAM_FIELDS).get(pk=pk)
+            for stars, delta in ((rating, 1), (previous_rating, -1)):
+                if stars is None:
+                    continue
+                field = f'rating_{stars}_count'
+                setattr(item, field, max(getattr(item, field) + delta, 0))
+                item.rating_sum = max(item.rating_sum + stars * delta, 0)
+                item.rating_count = max(item.rating_count + delta, 0)
+                fields.append(field)
+            item.average_rating = cls.compute_average_rating(item.rating_sum, item.rating_count)
+            item.save(update_fields=fields)
+
 
 class MenuItemImage(models.Model):
     """Gallery of images for menu items."""
     menu_item = models.ForeignKey(MenuItem, on_delete=models.CASCADE, related_name='images')
     image = models.ImageField(upload_to='menu_items/gallery/')
+    image_derivatives = models.JSONField(default=dict, blank=True, editable=False)
     alt_text = models.CharField(max_length=200, blank=True)
     display_order = models.IntegerField(default=0)
     created_at = models.DateTimeField(auto_now_add=True)
@@ -80,7 +157,7 @@ class MenuItemReview(models.Model):
     """Customer reviews for menu items."""
     menu_item = models.ForeignKey(MenuItem, on_delete=models.CASCADE, related_name='reviews')
     user = models.ForeignKey('auth.User', on_delete=models.CASCADE)
-    rating = models.IntegerField(choices=[(i, i) for i in range(1, 6)])  # 1-5 stars
+    rating = models.IntegerField(choices=[(i, i) for i in RATING_VALUES])  # 1-5 stars
     title = models.CharField(max_length=200)
     comment = models.TextField()
     is_verified_purchase = models.BooleanField(default=False)
@@ -90,6 +167,93 @@ class MenuItemReview(models.Model):
     class Meta:
         ordering = ['-created_at']
         unique_together = ['menu_item', 'user']
+        indexes = [
+            models.Index(fields=['menu_item', '-created_at', '-id']),
+            models.Index(fields=['menu_item', '-rating', '-created_at', '-id']),
+        ]
 
     def __str__(self):
         return f"{self.menu_item.name} - {self.rating} stars by {self.user.username}"
+
+
+class MenuItemSalesDay(models.Model):
+    """Paid quantity of a menu item per calendar day, fed incrementally from orders."""
+    menu_item = models.ForeignKey(MenuItem, on_delete=models.CASCADE, related_name='sales_days')
+    date = models.DateField()
+    quantity = models.PositiveIntegerField(default=0)
+    order_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['menu_item', 'date'], name='menu_sales_day_unique'),
+        ]
+        indexes = [
+            models.Index(fields=['date']),
+        ]
+
+    def __str__(self):
+        return f"{self.menu_item_id} on {self.date}: {self.quantity}"
+
+
+class MenuItemPopularity(models.Model):
+    """
+    Materialized bestseller ranking for a rolling window of days.
+    Rebuilt by ``manage.py refresh_menu_popularity``; read by the popular action.
+    """
+    WINDOW_CHOICES = [(7, '7 days'), (30, '30 days'), (90, '90 days')]
+
+    menu_item = models.ForeignKey(MenuItem, on_delete=models.CASCADE, related_name='popularity')
+    window_days = models.PositiveSmallIntegerField(choices=WINDOW_CHOICES)
+    category = models.ForeignKey(MenuCategory, on_delete=models.CASCADE, null=True, blank=True,
+                                 related_name='+', help_text="The item's category at refresh time")
+    quantity = models.PositiveIntegerField(default=0)
+    order_count = models.PositiveIntegerField(default=0)
+    rank = models.PositiveIntegerField(help_text='Rank across the whole menu')
+    category_rank = models.PositiveIntegerField(help_text='Rank within the category')
+    refreshed_at = models.DateTimeField()
+
+    class Meta:
+        verbose_name_plural = 'Menu item popularity'
+        constraints = [
+            models.UniqueConstraint(fields=['menu_item', 'window_days'], name='menu_popularity_unique'),
+        ]
+        indexes = [
+            models.Index(fields=['window_days', 'rank']),
+            models.Index(fields=['window_days', 'category', 'category_rank']),
+        ]
+
+    def __str__(self):
+        return f"#{self.rank} {self.menu_item_id} ({self.window_days}d)"
+
+
+class PopularityWatermark(models.Model):
+    """Single row recording the last paid order folded into MenuItemSalesDay."""
+    last_paid_at = models.DateTimeField(null=True, blank=True)
+    last_order_id = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Paid orders up to {self.last_paid_at} (#{self.last_order_id})"
+
+
+class MenuItemPairing(models.Model):
+    """
+    Precomputed "frequently bought together" neighbour of a menu item.
+    Rebuilt by ``manage.py build_menu_pairings``.
+    """
+    menu_item = models.ForeignKey(MenuItem, on_delete=models.CASCADE, related_name='pairings')
+    paired_item = models.ForeignKey(MenuItem, on_delete=models.CASCADE, related_name='+')
+    co_occurrences = models.PositiveIntegerField(help_text='Paid orders containing both items')
+    lift = models.FloatField(help_text='How much more often the pair is bought together than by chance')
+    rank = models.PositiveSmallIntegerField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['menu_item', 'paired_item'], name='menu_pairing_unique'),
+        ]
+        indexes = [
+            models.Index(fields=['menu_item', 'rank']),
+        ]
+
+    def __str__(self):
+        return f"{self.menu_item_id} -> {self.paired_item_id} (lift {self.lift:.2f})"
@@ -0,0 +1,117 @@
+"""
+"Frequently bought together" recommendations from paid order history.
+
+The builder streams (order_id, menu_item_id) tuples ordered by order, so no
+ORM objects are created and only one basket is held at a time. Item counts
+live in a flat ``array`` indexed by a dense item number and pair counts in a
+sparse Counter keyed by ``i * n + j`` (i < j), so memory grows with the
+number of distinct pairs rather than items squared.
+
+Pairs are scored by lift, ``P(a and b) / (P(a) * P(b))``. The top N
+neighbours of every item are stored in MenuItemPairing for the read paths.
+"""
+import heapq
+from array import array
+from collections import Counter
+from itertools import combinations, groupby
+
+from django.db import transaction
+from django.db.models import Sum
+from heddiekitchen.menu.models import MenuItem, MenuItemPairing
+from heddiekitchen.orders.models import OrderItem
+
+DEFAULT_TOP_N = 10
+DEFAULT_MIN_SUPPORT = 2  # pairs seen in fewer paid orders are noise
+
+
+def _baskets(chunk_size):
+    rows = (
+        OrderItem.objects.filter(order__payment_status='paid', menu_item__isnull=False)
+        .order_by('order_id')
+        .values_list('order_id', 'menu_item_id')
+        .iterator(chunk_size=chunk_size)
+    )
+    for _, basket in groupby(rows, key=lambda row: row[0]):
+        yield {menu_item_id for _, menu_item_id in basket}
+
+
+def count_cooccurrences(baskets, item_ids):
+    """
+    Count single items and unordered pairs over ``baskets`` (iterables of
+    menu item ids). Returns (order count, item counts, pair counts, ids).
+    """
+    ids = sorted(item_ids)
+    index = {item_id: i for i, item_id in enumerate(ids)}
+    n = len(ids)
+    item_counts = array('L', bytes(array('L').itemsize * n))
+    pair_counts = Counter()
+    orders = 0
+    for basket in baskets:
+        positions = sorted(index[item_id] for item_id in basket if item_id in index)
+        if not positions:
+            continue
+        orders += 1
+        for i in positions:
+            item_counts[i] += 1
+        pair_counts.update(i * n + j for i, j in combinations(positions, 2))
+    return orders, item_counts, pair_counts, ids
+
+
+def top_neighbours(orders, item_counts, pair_counts, ids, top_n=DEFAULT_TOP_N, min_support=DEFAULT_MIN_SUPPORT):
+    """Yield (menu_item_id, [(paired_id, co_occurrences, lift), ...]) best first."""
+    n = len(ids)
+    neighbours = {}
+    for key, together in pair_counts.items():
+        if together < min_support:
+            continue
+        i, j = divmod(key, n)
+        lift = together * orders / (item_counts[i] * item_counts[j])
+        neighbours.setdefault(i, []).append((lift, together, j))
+        neighbours.setdefault(j, []).append((lift, together, i))
+    for i, candidates in neighbours.items():
+        best = heapq.nlargest(top_n, candidates, key=lambda c: (c[0], c[1], -ids[c[2]]))
+        yield ids[i], [(ids[j], together, lift) for lift, together, j in best]
+
+
+def build_pairings(top_n=DEFAULT_TOP_N, min_support=DEFAULT_MIN_SUPPORT, chunk_size=5000):
+    """Rebuild MenuItemPairing in one pass over paid orders. Returns (orders, rows)."""
+    item_ids = MenuItem.objects.values_list('pk', flat=True)
+    orders, item_counts, pair_counts, ids = count_cooccurrences(_baskets(chunk_size), item_ids)
+    rows = [
+        MenuItemPairing(menu_item_id=item_id, paired_item_id=paired_id,
+                        co_occurrences=together, lift=round(lift, 4), rank=rank)
+        for item_id, best in top_neighbours(orders, item_counts, pair_counts, ids, top_n, min_support)
+        for rank, (paired_id, together, lift) in enumerate(best, start=1)
+    ]
+    with transaction.atomic():
+        MenuItemPairing.objects.all().delete()
+        MenuItemPairing.objects.bulk_create(rows, batch_size=1000)
+    return orders, len(rows)
+
+
+def pairs_with(menu_item_id, limit=DEFAULT_TOP_N):
+    """Stored neighbours of one item that are still available, best first."""
+    return list(
+        MenuItemPairing.objects.filter(menu_item_id=menu_item_id, paired_item__is_available=True)
+        .select_related('paired_item__category')
+        .order_by('rank')[:limit]
+    )
+
+
+def complete_meal(menu_item_ids, limit=DEFAULT_TOP_N):
+    """
+    Suggestions for a basket: neighbours of every item in it, excluding what
+    is already there, scored by their summed lift. Returns [(item, score)].
+    """
+    menu_item_ids = list(menu_item_ids)
+    if not menu_item_ids:
+        return []
+    scores = list(
+        MenuItemPairing.objects.filter(menu_item_id__in=menu_item_ids, paired_item__is_available=True)
+        .exclude(paired_item_id__in=menu_item_ids)
+        .values('paired_item_id')
+        .annotate(score=Sum('lift'))
+        .order_by('-score', 'paired_item_id')[:limit]
+    )
+    items = MenuItem.objects.select_related('category').in_bulk([row['paired_item_id'] for row in scores])
+    return [(items[row['paired_item_id']], row['score']) for row in scores]
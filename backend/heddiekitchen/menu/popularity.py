@@ -0,0 +1,141 @@
+"""
+Bestseller materialization from paid order history.
+
+Refreshing happens in two steps. First, orders paid since the watermark are
+folded into per-day sales rows (MenuItemSalesDay), so each run reads only
+new orders. Then the rolling 7/30/90-day windows are re-ranked from those
+day rows, which hold at most ``items x 90`` rows, into MenuItemPopularity.
+The homepage rails read that table directly.
+"""
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+from heddiekitchen.menu.models import MenuItem, MenuItemPopularity, MenuItemSalesDay, PopularityWatermark
+from heddiekitchen.orders.models import Order, OrderItem
+
+WINDOWS = [7, 30, 90]
+DEFAULT_WINDOW = 7
+# Orders paid in the last minute may still be committing out of order;
+# leave them for the next run so the watermark never skips one
+SETTLE_SECONDS = 60
+
+
+def fold_paid_orders(now=None, batch_size=1000):
+    """
+    Add orders paid since the watermark to the per-day sales rows.
+    Returns the number of orders folded in.
+    """
+    now = now or timezone.now()
+    cutoff = now - timedelta(seconds=SETTLE_SECONDS)
+    horizon = now - timedelta(days=max(WINDOWS))
+    watermark, _ = PopularityWatermark.objects.get_or_create(pk=1)
+    folded = 0
+
+    while True:
+        orders = Order.objects.filter(payment_status='paid', paid_at__lte=cutoff, paid_at__gte=horizon)
+        if watermark.last_paid_at:
+            orders = orders.filter(
+                Q(paid_at__gt=watermark.last_paid_at)
+                | Q(paid_at=watermark.last_paid_at, id__gt=watermark.last_order_id)
+            )
+        batch = list(orders.order_by('paid_at', 'id').values_list('id', 'paid_at')[:batch_size])
+        if not batch:
+            return folded
+
+        sales = (
+            OrderItem.objects.filter(order_id__in=[order_id for order_id, _ in batch], menu_item__isnull=False)
+            .annotate(date=TruncDate('order__paid_at'))
+            .values('menu_item_id', 'date')
+            .annotate(quantity=Sum('quantity'), order_count=Count('order_id', distinct=True))
+            .order_by()
+        )
+        with transaction.atomic():
+            _add_sales(list(sales))
+            watermark.last_order_id, watermark.last_paid_at = batch[-1]
+            watermark.save()
+        folded += len(batch)
+
+
+def _add_sales(sales):
+    """Add (menu_item_id, date, quantity, order_count) rows onto the stored day totals."""
+    if not sales:
+        return
+    existing = {
+        (row.menu_item_id, row.date): row
+        for row in MenuItemSalesDay.objects.select_for_update().filter(
+            menu_item_id__in={sale['menu_item_id'] for sale in sales},
+            date__in={sale['date'] for sale in sales},
+        )
+    }
+    rows = []
+    for sale in sales:
+        row = existing.get((sale['menu_item_id'], sale['date']))
+        rows.append(MenuItemSalesDay(
+            menu_item_id=sale['menu_item_id'],
+            date=sale['date'],
+            quantity=sale['quantity'] + (row.quantity if row else 0),
+            order_count=sale['order_count'] + (row.order_count if row else 0),
+        ))
+    MenuItemSalesDay.objects.bulk_create(
+        rows, update_conflicts=True, unique_fields=['menu_item', 'date'], update_fields=['quantity', 'order_count']
+    )
+
+
+def rebuild_popularity(now=None):
+    """
+    Re-rank every window from the day rows and replace MenuItemPopularity.
+    Returns the number of rows written.
+    """
+    now = now or timezone.now()
+    today = timezone.localdate(now)
+    MenuItemSalesDay.objects.filter(date__lte=today - timedelta(days=max(WINDOWS))).delete()
+
+    aggregates = {}
+    for window in WINDOWS:
+        in_window = Q(date__gt=today - timedelta(days=window))
+        aggregates[f'quantity_{window}'] = Sum('quantity', filter=in_window)
+        aggregates[f'orders_{window}'] = Sum('order_count', filter=in_window)
+    totals = list(MenuItemSalesDay.objects.values('menu_item_id').annotate(**aggregates).order_by())
+    categories = dict(
+        MenuItem.objects.filter(pk__in=[row['menu_item_id'] for row in totals]).values_list('pk', 'category_id')
+    )
+
+    rows = []
+    for window in WINDOWS:
+        ranked = sorted(
+            (row for row in totals if row[f'quantity_{window}']),
+            key=lambda row: (-row[f'quantity_{window}'], -row[f'orders_{window}'], row['menu_item_id']),
+        )
+        category_ranks = defaultdict(int)
+        for rank, row in enumerate(ranked, start=1):
+            category_id = categories.get(row['menu_item_id'])
+            category_ranks[category_id] += 1
+            rows.append(MenuItemPopularity(
+                menu_item_id=row['menu_item_id'],
+                window_days=window,
+                category_id=category_id,
+                quantity=row[f'quantity_{window}'],
+                order_count=row[f'orders_{window}'],
+                rank=rank,
+                category_rank=category_ranks[category_id],
+                refreshed_at=now,
+            ))
+
+    with transaction.atomic():
+        MenuItemPopularity.objects.all().delete()
+        MenuItemPopularity.objects.bulk_create(rows, batch_size=1000)
+    return len(rows)
+
+
+def refresh_popularity(now=None, full=False, batch_size=1000):
+    """Fold new paid orders and re-rank. ``full`` discards the day rows and starts over."""
+    if full:
+        with transaction.atomic():
+            MenuItemSalesDay.objects.all().delete()
+            PopularityWatermark.objects.filter(pk=1).delete()
+    folded = fold_paid_orders(now=now, batch_size=batch_size)
+    return folded, rebuild_popularity(now=now)
@@ -0,0 +1,150 @@
+"""
+Full-text search for the menu catalogue.
+
+Fields are weighted name > ingredients > description. On PostgreSQL the index
+is a ``tsvector`` column on ``menu_menuitem`` with a GIN index; on SQLite it is
+an FTS5 shadow table keyed by menu item id. Both are created by migration
+menu.0009_search_index; the backends here only keep their rows up to date.
+Other databases fall back to unranked ``icontains`` matching.
+"""
+import re
+
+from django.db import connections
+from django.db.models import BooleanField, FloatField, Q
+from django.db.models.expressions import RawSQL
+from rest_framework import filters
+
+MENU_ITEM_TABLE = 'menu_menuitem'
+FTS_TABLE = 'menu_menuitem_fts'
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+class BaseSearchBackend:
+    """Interface shared by all search backends."""
+
+    def index(self, pks, using='default'):
+        """(Re)index the given menu item ids."""
+
+    def remove(self, pks, using='default'):
+        """Drop the given menu item ids from the index."""
+
+    def reindex_all(self, using='default'):
+        """Rebuild the whole index."""
+        from heddiekitchen.menu.models import MenuItem
+        self.index(list(MenuItem.objects.using(using).values_list('pk', flat=True)), using=using)
+
+    def search(self, queryset, query):
+        """Filter ``queryset`` to matches and annotate ``search_rank`` (higher is better)."""
+        raise NotImplementedError
+
+
+class PostgresSearchBackend(BaseSearchBackend):
+    """tsvector column + GIN index, ranked with ts_rank."""
+    config = 'english'
+
+    def index(self, pks, using='default'):
+        if not pks:
+            return
+        with connections[using].cursor() as cursor:
+            cursor.execute(
+                f"UPDATE {MENU_ITEM_TABLE} SET search_vector = "
+                f"setweight(to_tsvector(%s, coalesce(name, '')), 'A') || "
+                f"setweight(to_tsvector(%s, coalesce(ingredients, '')), 'B') || "
+                f"setweight(to_tsvector(%s, coalesce(description, '')), 'C') "
+                f"WHERE id = ANY(%s)",
+                [self.config, self.config, self.config, list(pks)],
+            )
+
+    def search(self, queryset, query):
+        tsquery = f"websearch_to_tsquery('{self.config}', %s)"
+        return queryset.filter(
+            RawSQL(f'{MENU_ITEM_TABLE}.search_vector @@ {tsquery}', [query], output_field=BooleanField())
+        ).annotate(
+            search_rank=RawSQL(f'ts_rank({MENU_ITEM_TABLE}.search_vector, {tsquery})', [query], output_field=FloatField())
+        )
+
+
+class SQLiteSearchBackend(BaseSearchBackend):
+    """FTS5 shadow table ranked with bm25 column weights."""
+    weights = (10.0, 5.0, 1.0)  # name, ingredients, description
+
+    def index(self, pks, using='default'):
+        from heddiekitchen.menu.models import MenuItem
+        pks = list(pks)
+        if not pks:
+            return
+        rows = MenuItem.objects.using(using).filter(pk__in=pks).values_list('pk', 'name', 'ingredients', 'description')
+        with connections[using].cursor() as cursor:
+            self._delete(cursor, pks)
+            cursor.executemany(
+                f'INSERT INTO {FTS_TABLE} (rowid, name, ingredients, description) VALUES (%s, %s, %s, %s)',
+                list(rows),
+            )
+
+    def remove(self, pks, using='default'):
+        pks = list(pks)
+        if pks:
+            with connections[using].cursor() as cursor:
+                self._delete(cursor, pks)
+
+    def _delete(self, cursor, pks):
+        placeholders = ', '.join(['%s'] * len(pks))
+        cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid IN ({placeholders})', pks)
+
+    def search(self, queryset, query):
+        # Quote every token so user input can never be parsed as FTS syntax;
+        # the trailing * makes the last token a prefix match.
+        tokens = TOKEN_RE.findall(query)
+        if not tokens:
+            return queryset.none()
+        match = ' '.join(f'"{token}"' for token in tokens) + '*'
+        weights = ', '.join(str(w) for w in self.weights)
+        return queryset.filter(
+            pk__in=RawSQL(f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s', [match])
+        ).annotate(
+            search_rank=RawSQL(
+                f'SELECT -bm25({FTS_TABLE}, {weights}) FROM {FTS_TABLE} '
+                f'WHERE {FTS_TABLE} MATCH %s AND rowid = {MENU_ITEM_TABLE}.id',
+                [match],
+                output_field=FloatField(),
+            )
+        )
+
+
+class SimpleSearchBackend(BaseSearchBackend):
+    """Unranked fallback for databases without a full-text engine."""
+
+    def search(self, queryset, query):
+        condition = Q()
+        for token in query.split():
+            condition &= Q(name__icontains=token) | Q(ingredients__icontains=token) | Q(description__icontains=token)
+        return queryset.filter(condition).annotate(search_rank=RawSQL('0', [], output_field=FloatField()))
+
+
+_BACKENDS = {
+    'postgresql': PostgresSearchBackend(),
+    'sqlite': SQLiteSearchBackend(),
+}
+_FALLBACK_BACKEND = SimpleSearchBackend()
+
+
+def get_search_backend(using='default'):
+    """Return the search backend matching the database vendor."""
+    return _BACKENDS.get(connections[using].vendor, _FALLBACK_BACKEND)
+
+
+class MenuSearchFilter(filters.SearchFilter):
+    """
+    Drop-in replacement for DRF's SearchFilter backed by the full-text index.
+    Results are ordered by relevance unless the client asks for ?ordering=.
+    Place it after OrderingFilter in ``filter_backends``.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        query = ' '.join(self.get_search_terms(request))
+        if not query:
+            return queryset
+        queryset = get_search_backend(queryset.db).search(queryset, query)
+        if not request.query_params.get('ordering'):
+            queryset = queryset.order_by('-search_rank', *queryset.query.order_by)
+        return queryset
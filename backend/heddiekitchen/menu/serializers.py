@@ -2,10 +2,20 @@
 Serializers for menu app.
 """
 from rest_framework import serializers
+from heddiekitchen.core.images import build_srcset
+from heddiekitchen.core.media import media_url
 from heddiekitchen.menu.models import MenuCategory, MenuItem, MenuItemImage, MenuItemReview
+from heddiekitchen.serializers import DynamicFieldsMixin
 
+REVIEW_ORDERINGS = {
+    'recent': ('-created_at', '-id'),
+    'top': ('-rating', '-created_at', '-id'),
+}
+# Reviews embedded in the detail response; the reviews action pages the rest
+EMBEDDED_REVIEWS = 10
 
-class MenuCategorySerializer(serializers.ModelSerializer):
+
+class MenuCategorySerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     """Serializer for menu categories."""
     class Meta:
         model = MenuCategory
@@ -15,16 +25,17 @@ class MenuCategorySerializer(serializers.ModelSerializer):
 class MenuItemImageSerializer(serializers.ModelSerializer):
     """Serializer for menu item images."""
     image_url = serializers.SerializerMethodField()
+    image_srcset = serializers.SerializerMethodField()
 
     class Meta:
         model = MenuItemImage
-        fields = ['id', 'image', 'image_url', 'alt_text', 'display_order']
+        fields = ['id', 'image', 'image_url', 'image_srcset', 'alt_text', 'display_order']
 
     def get_image_url(self, obj):
-        request = self.context.get('request')
-        if obj.image and request:
-            return request.build_absolute_uri(obj.image.url)
-        return None
+        return media_url(obj.image, self.context.get('request'))
+
+    def get_image_srcset(self, obj):
+        return build_srcset(obj.image, self.context.get('request'))
 
 
 class MenuItemReviewSerializer(serializers.ModelSerializer):
@@ -37,61 +48,63 @@ class MenuItemReviewSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'created_at', 'username']
 
 
-class MenuItemDetailSerializer(serializers.ModelSerializer):
-    """Detailed serializer for menu items."""
+class MenuItemDetailSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
+    """
+    Detailed serializer for menu items. ``categories`` are ids unless
+    ?expand=categories; ``images`` and ``reviews`` only appear when expanded,
+    and ``reviews`` holds only the latest few (see the reviews action).
+    """
     category_name = serializers.CharField(source='category.name', read_only=True)
-    categories = MenuCategorySerializer(many=True, read_only=True)
-    images = MenuItemImageSerializer(many=True, read_only=True)
-    reviews = MenuItemReviewSerializer(many=True, read_only=True)
-    average_rating = serializers.SerializerMethodField()
     image_url = serializers.SerializerMethodField()
+    image_srcset = serializers.SerializerMethodField()
+    rating_histogram = serializers.DictField(child=serializers.IntegerField(), read_only=True)
 
     class Meta:
         model = MenuItem
         fields = [
             'id', 'name', 'slug', 'description', 'price', 'category', 'category_name',
-            'categories', 'image', 'image_url', 'prep_time_minutes', 'servings',
-            'is_available', 'is_featured', 'stock_quantity', 'calories',
-            'ingredients', 'allergens', 'nutritional_info', 'images', 'reviews',
-            'average_rating', 'created_at', 'updated_at'
+            'categories', 'image', 'image_url', 'image_srcset', 'prep_time_minutes', 'servings',
+            'is_available', 'is_featured', 'track_stock', 'stock_quantity', 'calories',
+            'ingredients', 'allergens', 'nutritional_info',
+            'average_rating', 'rating_count', 'rating_histogram', 'created_at', 'updated_at'
         ]
-        read_only_fields = ['id', 'slug', 'created_at', 'updated_at']
+        read_only_fields = ['id', 'slug', 'categories', 'average_rating', 'rating_count', 'created_at', 'updated_at']
+        expandable_fields = {
+            'categories': (MenuCategorySerializer, {'many': True, 'read_only': True}),
+            'images': (MenuItemImageSerializer, {'many': True, 'read_only': True}),
+            'reviews': (serializers.SerializerMethodField, {}),
+        }
+
+    def get_reviews(self, obj):
+        reviews = getattr(obj, 'latest_reviews', None)
+        if reviews is None:
+            latest = obj.reviews.select_related('user').order_by(*REVIEW_ORDERINGS['recent'])
+            reviews = latest[:EMBEDDED_REVIEWS]
+        return MenuItemReviewSerializer(reviews, many=True, context=self.context).data
 
     def get_image_url(self, obj):
-        request = self.context.get('request')
-        if obj.image and request:
-            return request.build_absolute_uri(obj.image.url)
-        return None
+        return media_url(obj.image, self.context.get('request'))
 
-    def get_average_rating(self, obj):
-        reviews = obj.reviews.all()
-        if reviews:
-            return round(sum(r.rating for r in reviews) / len(reviews), 1)
-        return None
+    def get_image_srcset(self, obj):
+        return build_srcset(obj.image, self.context.get('request'))
 
 
-class MenuItemListSerializer(serializers.ModelSerializer):
+class MenuItemListSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     """List serializer for menu items (lightweight)."""
     category_name = serializers.CharField(source='category.name', read_only=True)
     image_url = serializers.SerializerMethodField()
-    average_rating = serializers.SerializerMethodField()
+    image_srcset = serializers.SerializerMethodField()
 
     class Meta:
         model = MenuItem
         fields = [
             'id', 'name', 'slug', 'description', 'price', 'category', 'category_name',
-            'image', 'image_url', 'prep_time_minutes', 'is_available', 'is_featured',
-            'average_rating', 'created_at'
+            'image', 'image_url', 'image_srcset', 'prep_time_minutes', 'is_available', 'is_featured',
+            'average_rating', 'rating_count', 'created_at'
         ]
 
     def get_image_url(self, obj):
-        request = self.context.get('request')
-        if obj.image and request:
-            return request.build_absolute_uri(obj.image.url)
-        return None
-
-    def get_average_rating(self, obj):
-        reviews = obj.reviews.all()
-        if reviews:
-            return round(sum(r.rating for r in reviews) / len(reviews), 1)
-        return None
+        return media_url(obj.image, self.context.get('request'))
+
+    def get_image_srcset(self, obj):
+        return build_srcset(obj.image, self.context.get('request'))
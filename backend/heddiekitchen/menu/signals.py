@@ -0,0 +1,61 @@
+"""
+Signals for menu app.
+"""
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+from heddiekitchen.menu.cache import schedule_catalog_bump
+from heddiekitchen.menu.models import MenuCategory, MenuItem, MenuItemImage, MenuItemReview
+from heddiekitchen.menu.search import get_search_backend
+from heddiekitchen.menu.tags import sync_menu_item_tags
+
+CATALOG_MODELS = (MenuItem, MenuCategory, MenuItemImage, MenuItemReview)
+
+
+@receiver(post_save, sender=MenuItem)
+def index_menu_item(sender, instance, raw=False, update_fields=None, using='default', **kwargs):
+    """
+    Keep the full-text index in sync when a menu item's searchable text may have changed.
+    """
+    if raw or (update_fields is not None and not {'name', 'description', 'ingredients'} & set(update_fields)):
+        return
+    get_search_backend(using).index([instance.pk], using=using)
+
+
+@receiver(post_save, sender=MenuItem)
+def sync_menu_item_tags_on_save(sender, instance, raw=False, update_fields=None, using='default', **kwargs):
+    """
+    Re-parse ingredient and allergen tags when their text may have changed.
+    """
+    if raw or (update_fields is not None and not {'ingredients', 'allergens'} & set(update_fields)):
+        return
+    sync_menu_item_tags([instance.pk], using=using)
+
+
+@receiver(post_delete, sender=MenuItem)
+def unindex_menu_item(sender, instance, using='default', **kwargs):
+    """
+    Drop deleted menu items from the full-text index.
+    """
+    get_search_backend(using).remove([instance.pk], using=using)
+
+
+def bump_catalog_on_change(sender, raw=False, **kwargs):
+    """
+    Invalidate cached catalogue pages whenever a catalogue row changes.
+    """
+    if not raw:
+        schedule_catalog_bump()
+
+
+for _model in CATALOG_MODELS:
+    post_save.connect(bump_catalog_on_change, sender=_model, dispatch_uid=f'catalog_save_{_model.__name__}')
+    post_delete.connect(bump_catalog_on_change, sender=_model, dispatch_uid=f'catalog_delete_{_model.__name__}')
+
+
+@receiver(m2m_changed, sender=MenuItem.categories.through)
+def bump_catalog_on_categories_change(sender, action, **kwargs):
+    """
+    Category membership changes do not fire post_save on MenuItem.
+    """
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        schedule_catalog_bump()
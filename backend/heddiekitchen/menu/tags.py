@@ -0,0 +1,71 @@
+"""
+Normalized ingredient and allergen tags for menu items.
+
+``MenuItem.ingredients`` and ``MenuItem.allergens`` stay the editable source
+of truth; every save parses them into Ingredient/Allergen rows linked through
+indexed M2M tables, so "exclude peanuts" becomes an indexed join on a slug
+instead of ``NOT ICONTAINS`` scans that also match partial words.
+"""
+import re
+
+from django.db import transaction
+from django.utils.text import slugify
+from heddiekitchen.menu.models import Allergen, Ingredient, MenuItem
+
+SEPARATOR_RE = re.compile(r'[,;\n]')
+WHITESPACE_RE = re.compile(r'\s+')
+
+# (text field, tag model, M2M field, through column for the tag)
+TAG_FIELDS = [
+    ('ingredients', Ingredient, 'ingredient_tags', 'ingredient_id'),
+    ('allergens', Allergen, 'allergen_tags', 'allergen_id'),
+]
+
+
+def parse_tags(text):
+    """Split a comma-separated list into {slug: display name}, first spelling wins."""
+    tags = {}
+    for part in SEPARATOR_RE.split(text or ''):
+        name = WHITESPACE_RE.sub(' ', part).strip()[:100]
+        slug = slugify(name)[:100]
+        if slug:
+            tags.setdefault(slug, name)
+    return tags
+
+
+def parse_tag_slugs(value):
+    """Slugs from a filter parameter such as ``peanuts,Shellfish``."""
+    return list(parse_tags(value))
+
+
+def _ensure_tags(model, tags, using):
+    """Create missing tag rows and return {slug: id} for ``tags``."""
+    if not tags:
+        return {}
+    model.objects.using(using).bulk_create(
+        [model(slug=slug, name=name) for slug, name in tags.items()], ignore_conflicts=True
+    )
+    return dict(model.objects.using(using).filter(slug__in=tags).values_list('slug', 'pk'))
+
+
+def sync_menu_item_tags(pks, using='default'):
+    """
+    Rebuild the ingredient and allergen links of the given menu items from
+    their text fields. Costs a fixed number of queries however many items.
+    """
+    pks = list(pks)
+    if not pks:
+        return
+    rows = list(MenuItem.objects.using(using).filter(pk__in=pks).values_list('pk', 'ingredients', 'allergens'))
+    with transaction.atomic(using=using):
+        for index, (field, model, m2m, column) in enumerate(TAG_FIELDS, start=1):
+            parsed = {row[0]: parse_tags(row[index]) for row in rows}
+            ids = _ensure_tags(model, {slug: name for tags in parsed.values() for slug, name in tags.items()}, using)
+            through = getattr(MenuItem, m2m).through
+            through.objects.using(using).filter(menuitem_id__in=parsed).delete()
+            through.objects.using(using).bulk_create([
+                through(menuitem_id=pk, **{column: ids[slug]})
+                for pk, tags in parsed.items()
+                for slug in tags
+            ])
+
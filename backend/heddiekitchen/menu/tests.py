@@ -0,0 +1,605 @@
+"""
+Tests for menu app.
+"""
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+
+import pytest
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.utils import timezone
+from rest_framework.test import APIClient
+from heddiekitchen.menu import autocomplete, pairings, popularity
+from heddiekitchen.menu.models import MenuCategory, MenuItem, MenuItemPopularity, MenuItemReview
+from heddiekitchen.menu.views import AutocompleteRateThrottle
+from heddiekitchen.orders.models import Order, OrderItem
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.clear()
+
+
+@pytest.fixture
+def catalog_cache(settings):
+    # Off by default without Redis; LocMem is shared within the test process
+    settings.CATALOG_CACHE_ENABLED = True
+
+
+@pytest.fixture
+def api_client():
+    return APIClient()
+
+
+@pytest.fixture
+def test_user(db):
+    return User.objects.create_user(
+        username='testuser',
+        email='test@example.com',
+        password='testpass123'
+    )
+
+
+@pytest.fixture
+def category(db):
+    return MenuCategory.objects.create(name='Soups')
+
+
+@pytest.fixture
+def menu_item(category):
+    return MenuItem.objects.create(
+        name='Egusi Soup',
+        description='Melon seed soup',
+        price=Decimal('4500.00'),
+        category=category,
+        image='menu_items/egusi.jpg',
+        ingredients='Melon seeds, Spinach, Palm oil',
+        allergens='Fish',
+    )
+
+
+def make_paid_order(user, lines, paid_at=None):
+    """Paid order for [(menu_item, quantity), ...]."""
+    total = sum(item.price * quantity for item, quantity in lines)
+    order = Order.objects.create(
+        user=user, subtotal=total, total=total,
+        shipping_name='Test', shipping_email='test@example.com', shipping_phone='0800',
+        shipping_address='1 Test Street', shipping_city='Abuja', shipping_state='FCT',
+        payment_status='paid', paid_at=paid_at or timezone.now(),
+    )
+    for item, quantity in lines:
+        OrderItem.objects.create(order=order, menu_item=item, quantity=quantity, unit_price=item.price)
+    return order
+
+
+class TestRatingAggregates:
+    """Test denormalized rating aggregates on menu items."""
+
+    def test_add_review_updates_aggregates(self, api_client, test_user, menu_item):
+        """Creating then editing a review keeps the stored average in sync."""
+        api_client.force_authenticate(user=test_user)
+        url = f'/api/menu/items/{menu_item.id}/add_review/'
+
+        response = api_client.post(url, {'rating': 4, 'title': 'Nice', 'comment': 'Tasty'})
+        assert response.status_code == 201
+        menu_item.refresh_from_db()
+        assert (menu_item.rating_sum, menu_item.rating_count, menu_item.average_rating) == (4, 1, 4.0)
+
+        response = api_client.post(url, {'rating': 2, 'title': 'Meh', 'comment': 'Cold'})
+        assert response.status_code == 200
+        menu_item.refresh_from_db()
+        assert (menu_item.rating_sum, menu_item.rating_count, menu_item.average_rating) == (2, 1, 2.0)
+        assert menu_item.rating_histogram == {1: 0, 2: 1, 3: 0, 4: 0, 5: 0}
+
+    def test_invalid_rating_rejected(self, api_client, test_user, menu_item):
+        api_client.force_authenticate(user=test_user)
+        response = api_client.post(
+            f'/api/menu/items/{menu_item.id}/add_review/',
+            {'rating': 9, 'title': 'Nice', 'comment': 'Tasty'}
+        )
+        assert response.status_code == 400
+
+    def test_rebuild_command(self, test_user, menu_item):
+        """The rebuild command recomputes aggregates from review rows."""
+        other = User.objects.create_user(username='other', password='testpass123')
+        MenuItemReview.objects.create(menu_item=menu_item, user=test_user, rating=5, title='a', comment='a')
+        MenuItemReview.objects.create(menu_item=menu_item, user=other, rating=4, title='b', comment='b')
+
+        call_command('rebuild_menu_ratings', stdout=StringIO())
+
+        menu_item.refresh_from_db()
+        assert (menu_item.rating_sum, menu_item.rating_count, menu_item.average_rating) == (9, 2, 4.5)
+        assert menu_item.rating_histogram == {1: 0, 2: 0, 3: 0, 4: 1, 5: 1}
+
+    def test_list_uses_stored_average(self, api_client, menu_item, django_assert_max_num_queries):
+        MenuItem.objects.filter(pk=menu_item.pk).update(rating_sum=9, rating_count=2, average_rating=4.5)
+        with django_assert_max_num_queries(2):
+            response = api_client.get('/api/menu/items/')
+        assert response.status_code == 200
+        assert response.data['results'][0]['average_rating'] == 4.5
+
+
+class TestReviewListing:
+    """Test keyset-paginated review listing."""
+
+    @pytest.fixture
+    def reviews(self, menu_item):
+        ratings = [5, 3, 5, 1, 4, 5, 2]
+        for i, rating in enumerate(ratings):
+            user = User.objects.create_user(username=f'reviewer{i}', password='testpass123')
+            MenuItemReview.objects.create(menu_item=menu_item, user=user, rating=rating, title='t', comment='c')
+            MenuItem.apply_rating_change(menu_item.pk, rating)
+        return ratings
+
+    def _pages(self, api_client, url, params):
+        results = []
+        while url:
+            response = api_client.get(url, params)
+            assert response.status_code == 200
+            results.extend(response.data['results'])
+            url, params = response.data['next'], None
+        return response, results
+
+    def test_top_sort_pages_through_ties(self, api_client, menu_item, reviews):
+        url = f'/api/menu/items/{menu_item.id}/reviews/'
+        response, results = self._pages(api_client, url, {'sort': 'top', 'page_size': 2})
+
+        assert [review['rating'] for review in results] == sorted(reviews, reverse=True)
+        assert len({review['id'] for review in results}) == len(reviews)
+        assert response.data['histogram'] == {1: 1, 2: 1, 3: 1, 4: 1, 5: 3}
+        assert response.data['rating_count'] == 7
+
+    def test_recent_sort_is_newest_first(self, api_client, menu_item, reviews):
+        url = f'/api/menu/items/{menu_item.id}/reviews/'
+        _, results = self._pages(api_client, url, {'page_size': 3})
+        assert [review['rating'] for review in results] == list(reversed(reviews))
+
+    def test_invalid_sort_and_cursor(self, api_client, menu_item):
+        url = f'/api/menu/items/{menu_item.id}/reviews/'
+        assert api_client.get(url, {'sort': 'worst'}).status_code == 400
+        assert api_client.get(url, {'cursor': 'not-a-cursor'}).status_code == 404
+
+    def test_detail_embeds_latest_reviews_only(self, api_client, menu_item, reviews, monkeypatch):
+        monkeypatch.setattr('heddiekitchen.menu.views.EMBEDDED_REVIEWS', 3)
+        response = api_client.get(f'/api/menu/items/{menu_item.id}/', {'expand': 'reviews'})
+        assert [review['rating'] for review in response.data['reviews']] == [2, 5, 4]
+        assert response.data['rating_histogram']['5'] == 3
+
+
+class TestAutocomplete:
+    """Test the in-process prefix index behind /api/menu/autocomplete/."""
+
+    def test_prefix_and_mid_name_matches(self, api_client, menu_item, category):
+        MenuItem.objects.create(name='Jollof Rice', price=Decimal('3000.00'), category=category, image='menu_items/j.jpg')
+        response = api_client.get('/api/menu/autocomplete/', {'q': 'Egu'})
+        assert response.status_code == 200
+        assert [(r['type'], r['label']) for r in response.data['results']] == [('item', 'Egusi Soup')]
+
+        results = autocomplete.autocomplete('ric')
+        assert [r['label'] for r in results] == ['Jollof Rice']
+        assert [(r['type'], r['label']) for r in autocomplete.autocomplete('sou')] == [
+            ('item', 'Egusi Soup'), ('category', 'Soups')
+        ]
+        assert ('ingredient', 'Palm oil') in [(r['type'], r['label']) for r in autocomplete.autocomplete('palm')]
+
+    def test_typo_within_one_edit(self, menu_item):
+        for typo in ['egsui', 'egisi', 'eggusi', 'egus']:
+            results = autocomplete.autocomplete(typo)
+            assert 'Egusi Soup' in [r['label'] for r in results], typo
+        assert autocomplete.autocomplete('egisi')[0]['fuzzy'] is True
+        assert autocomplete.autocomplete('xyzzy') == []
+
+    def test_has_its_own_per_minute_throttle(self, api_client, menu_item, monkeypatch):
+        # Past the general anon rate of 100/hour
+        for _ in range(101):
+            assert api_client.get('/api/menu/autocomplete/', {'q': 'eg'}).status_code == 200
+        assert api_client.get('/api/menu/categories/').status_code == 200
+
+        cache.clear()
+        monkeypatch.setitem(AutocompleteRateThrottle.THROTTLE_RATES, 'autocomplete', '2/minute')
+        assert [api_client.get('/api/menu/autocomplete/', {'q': 'eg'}).status_code for _ in range(3)] == [200, 200, 429]
+
+    def test_rebuilt_after_catalogue_change_without_queries_between(
+            self, menu_item, category, django_assert_num_queries):
+        autocomplete.autocomplete('ab')
+        with django_assert_num_queries(0):
+            assert autocomplete.autocomplete('abacha') == []
+        MenuItem.objects.create(name='Abacha', price=Decimal('2000.00'), category=category, image='menu_items/a.jpg')
+        assert [r['label'] for r in autocomplete.autocomplete('abacha')] == ['Abacha']
+
+    def test_rebuilt_on_ttl_without_shared_cache(self, menu_item, settings):
+        settings.IN_PROCESS_TABLE_TTL = 60
+        autocomplete.autocomplete('egusi')
+        # No signal, like a rename made in another worker
+        MenuItem.objects.filter(pk=menu_item.pk).update(name='Ofada Stew')
+        assert autocomplete.autocomplete('ofada') == []
+
+        settings.IN_PROCESS_TABLE_TTL = 0
+        assert [r['label'] for r in autocomplete.autocomplete('ofada')] == ['Ofada Stew']
+
+
+class TestBulkFetch:
+    """Test /api/menu/items/bulk/."""
+
+    def test_preserves_order_and_reports_gaps(self, api_client, menu_item, category, django_assert_num_queries):
+        other = MenuItem.objects.create(name='Jollof Rice', price=Decimal('3000.00'), category=category, image='menu_items/j.jpg')
+        hidden = MenuItem.objects.create(name='Ofada', price=Decimal('3500.00'), is_available=False, image='menu_items/o.jpg')
+        ids = f'{other.id},999,{hidden.id},{menu_item.id},{other.id}'
+
+        with django_assert_num_queries(1):
+            response = api_client.get('/api/menu/items/bulk/', {'ids': ids})
+        assert response.status_code == 200
+        assert [item['id'] for item in response.data['results']] == [other.id, menu_item.id]
+        assert response.data['missing'] == [999]
+        assert response.data['unavailable'] == [hidden.id]
+
+    def test_rejects_bad_ids(self, api_client, db):
+        assert api_client.get('/api/menu/items/bulk/', {'ids': '1,x'}).status_code == 400
+        too_many = ','.join(str(i) for i in range(1, 300))
+        assert api_client.get('/api/menu/items/bulk/', {'ids': too_many}).status_code == 400
+
+
+class TestMenuSearch:
+    """Test ranked full-text search over the menu."""
+
+    def test_name_match_ranks_above_description_match(self, api_client, category):
+        MenuItem.objects.create(
+            name='Jollof Rice', description='Party rice', price=Decimal('3000.00'),
+            category=category, image='menu_items/jollof.jpg', ingredients='Rice, Tomato'
+        )
+        MenuItem.objects.create(
+            name='Fried Plantain', description='Great with jollof', price=Decimal('1500.00'),
+            category=category, image='menu_items/dodo.jpg', ingredients='Plantain'
+        )
+        response = api_client.get('/api/menu/items/', {'search': 'jollof'})
+        assert response.status_code == 200
+        assert [item['name'] for item in response.data['results']] == ['Jollof Rice', 'Fried Plantain']
+
+    def test_index_follows_updates(self, api_client, menu_item):
+        menu_item.name = 'Ofada Stew'
+        menu_item.save()
+        assert api_client.get('/api/menu/items/', {'search': 'egusi'}).data['count'] == 0
+        assert api_client.get('/api/menu/items/', {'search': 'ofada'}).data['count'] == 1
+
+    def test_saves_of_other_fields_skip_indexing(self, menu_item, monkeypatch):
+        monkeypatch.setattr('heddiekitchen.menu.signals.get_search_backend', pytest.fail)
+        menu_item.is_available = False
+        menu_item.save(update_fields=['is_available'])
+
+    def test_search_input_is_not_fts_syntax(self, api_client, menu_item):
+        response = api_client.get('/api/menu/items/', {'search': 'egusi" OR (*'})
+        assert response.status_code == 200
+
+
+@pytest.mark.usefixtures('catalog_cache')
+class TestCatalogCache:
+    """Test versioned catalogue pages and conditional requests."""
+
+    def test_etag_revalidation_skips_database(self, api_client, menu_item, django_assert_num_queries):
+        response = api_client.get('/api/menu/items/')
+        etag = response['ETag']
+        assert response.status_code == 200
+
+        with django_assert_num_queries(0):
+            response = api_client.get('/api/menu/items/', HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 304
+
+        with django_assert_num_queries(0):
+            response = api_client.get('/api/menu/items/')
+        assert response.data['count'] == 1
+
+    def test_catalog_write_invalidates_pages(self, api_client, menu_item, category):
+        etag = api_client.get('/api/menu/categories/')['ETag']
+        category.description = 'Hearty soups'
+        category.save()
+
+        response = api_client.get('/api/menu/categories/', HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 200
+        assert response['ETag'] != etag
+        assert response.data['results'][0]['description'] == 'Hearty soups'
+
+    def test_filters_are_cached_separately(self, api_client, menu_item):
+        assert api_client.get('/api/menu/items/', {'is_featured': 'true'}).data['count'] == 0
+        assert api_client.get('/api/menu/items/').data['count'] == 1
+
+    def test_uncached_without_shared_cache(self, api_client, menu_item, settings):
+        settings.CATALOG_CACHE_ENABLED = False
+        response = api_client.get('/api/menu/items/')
+        assert 'ETag' not in response
+        # A bump made in another process is never seen here, so nothing may be cached
+        MenuItem.objects.filter(pk=menu_item.pk).update(name='Efo Riro')
+        assert api_client.get('/api/menu/items/').data['results'][0]['name'] == 'Efo Riro'
+
+
+class TestCatalogImportExport:
+    """Test the streaming catalog_import / catalog_export commands."""
+
+    def write(self, tmp_path, name, content):
+        path = tmp_path / name
+        path.write_text(content)
+        return str(path)
+
+    def test_import_creates_items_and_categories(self, api_client, tmp_path, category):
+        path = self.write(tmp_path, 'items.jsonl', '\n'.join([
+            '{"name": "Jollof Rice", "price": "3000", "category": "Rice Meals", "categories": ["rice-meals", "Soups"]}',
+            '{"name": "Pounded Yam", "price": 2500, "description": "Smooth", "is_featured": true}',
+        ]))
+        out = StringIO()
+        call_command('catalog_import', path, batch_size=1, stdout=out)
+
+        assert '2 created, 0 updated, 1 new categories' in out.getvalue()
+        jollof = MenuItem.objects.get(slug='jollof-rice')
+        assert jollof.price == Decimal('3000.00')
+        assert jollof.category.slug == 'rice-meals'
+        assert set(jollof.categories.values_list('slug', flat=True)) == {'rice-meals', 'soups'}
+        assert MenuItem.objects.get(slug='pounded-yam').is_featured
+        # Bulk writes are still searchable
+        assert api_client.get('/api/menu/items/', {'search': 'jollof'}).data['count'] == 1
+
+    def test_reprice_only_touches_given_columns(self, tmp_path, menu_item):
+        MenuItem.objects.filter(pk=menu_item.pk).update(rating_sum=9, rating_count=2, average_rating=4.5)
+        path = self.write(tmp_path, 'prices.csv', f'slug,price\n{menu_item.slug},5000\n')
+        call_command('catalog_import', path, stdout=StringIO())
+
+        menu_item.refresh_from_db()
+        assert menu_item.price == Decimal('5000.00')
+        assert menu_item.name == 'Egusi Soup'
+        assert menu_item.category is not None
+        assert menu_item.average_rating == 4.5
+
+    def test_import_without_price_column_keeps_price(self, tmp_path, menu_item):
+        path = self.write(tmp_path, 'featured.csv', f'slug,is_featured\n{menu_item.slug},true\n')
+        call_command('catalog_import', path, stdout=StringIO())
+
+        menu_item.refresh_from_db()
+        assert menu_item.is_featured
+        assert menu_item.price == Decimal('4500.00')
+
+    def test_missing_file_is_a_command_error(self, tmp_path):
+        with pytest.raises(CommandError, match='Could not read'):
+            call_command('catalog_import', str(tmp_path / 'missing.csv'), stdout=StringIO())
+
+    def test_name_collision_gets_suffixed_slug(self, tmp_path, menu_item):
+        MenuItem.objects.filter(pk=menu_item.pk).update(name='Egusi soup (old)')
+        path = self.write(tmp_path, 'items.csv', 'name,price\nEgusi Soup,4000\nEgusi Soup!,4200\n')
+        call_command('catalog_import', path, stdout=StringIO())
+
+        assert set(MenuItem.objects.values_list('slug', flat=True)) == {'egusi-soup', 'egusi-soup-2', 'egusi-soup-3'}
+        assert MenuItem.objects.get(slug='egusi-soup').price == Decimal('4500.00')
+
+    def test_dry_run_prints_diff_without_writing(self, tmp_path, menu_item):
+        path = self.write(tmp_path, 'items.csv', f'slug,price,name\n{menu_item.slug},5000,Egusi Soup\nnew-item,100,New\n')
+        out = StringIO()
+        call_command('catalog_import', path, dry_run=True, stdout=out)
+
+        output = out.getvalue()
+        assert f"~ {menu_item.slug}: price: Decimal('4500.00') -> Decimal('5000.00')" in output
+        assert '+ new-item' in output
+        assert MenuItem.objects.count() == 1
+        menu_item.refresh_from_db()
+        assert menu_item.price == Decimal('4500.00')
+
+    def test_export_round_trips_without_changes(self, tmp_path, menu_item, category):
+        menu_item.categories.add(category)
+        for name in ('items.csv', 'items.jsonl'):
+            path = str(tmp_path / name)
+            call_command('catalog_export', output=path, stdout=StringIO())
+            out = StringIO()
+            call_command('catalog_import', path, dry_run=True, stdout=out)
+            assert '0 created, 0 updated, 0 new categories, 1 unchanged' in out.getvalue()
+
+    def test_bad_row_aborts_import(self, tmp_path, menu_item):
+        path = self.write(tmp_path, 'items.csv', 'name,price\nJollof Rice,3000\nPlantain,cheap\n')
+        with pytest.raises(CommandError, match='Line 3'):
+            call_command('catalog_import', path, stdout=StringIO())
+        assert MenuItem.objects.count() == 1
+
+
+class TestMenuFacets:
+    """Test facet counts for menu browsing."""
+
+    @pytest.fixture
+    def catalogue(self, category):
+        rice = MenuCategory.objects.create(name='Rice Meals', display_order=1)
+        items = [
+            MenuItem.objects.create(name='Egusi Soup', description='x', price=Decimal('4500.00'),
+                                    category=category, image='a.jpg', prep_time_minutes=45, is_featured=True),
+            MenuItem.objects.create(name='Jollof Rice', description='x', price=Decimal('3000.00'),
+                                    category=rice, image='b.jpg', prep_time_minutes=20),
+            MenuItem.objects.create(name='Fried Rice', description='x', price=Decimal('12000.00'),
+                                    category=rice, image='c.jpg', prep_time_minutes=10),
+        ]
+        items[0].categories.add(category, rice)
+        items[1].categories.add(rice)
+        return category, rice
+
+    def test_counts_come_from_one_query(self, api_client, catalogue, catalog_cache, django_assert_num_queries):
+        soups, rice = catalogue
+        # Warm the per-version category list so only the aggregate remains
+        api_client.get('/api/menu/items/facets/', {'is_featured': 'true'})
+
+        with django_assert_num_queries(1):
+            response = api_client.get('/api/menu/items/facets/')
+        assert response.status_code == 200
+        data = response.data
+
+        assert data['total'] == 3
+        assert {c['slug']: c['count'] for c in data['category']} == {'soups': 1, 'rice-meals': 2}
+        assert {c['slug']: c['count'] for c in data['categories']} == {'soups': 1, 'rice-meals': 2}
+        assert data['is_featured'] == {'true': 1, 'false': 2}
+        assert [b['count'] for b in data['price']] == [0, 2, 0, 1]
+        assert [b['count'] for b in data['prep_time']] == [1, 1, 1, 0]
+
+    def test_counts_follow_filters_and_cache(self, api_client, catalogue, catalog_cache,
+                                            django_assert_num_queries):
+        soups, rice = catalogue
+        params = {'categories': rice.id, 'max_price': 5000}
+        data = api_client.get('/api/menu/items/facets/', params).data
+        assert data['total'] == 2
+        assert {c['slug']: c['count'] for c in data['category']} == {'soups': 1, 'rice-meals': 1}
+
+        with django_assert_num_queries(0):
+            assert api_client.get('/api/menu/items/facets/', params).data == data
+
+        jollof = MenuItem.objects.get(name='Jollof Rice')
+        jollof.price = Decimal('6000.00')
+        jollof.save()
+        assert api_client.get('/api/menu/items/facets/', params).data['total'] == 1
+
+
+class TestIngredientAllergenTags:
+    """Test normalized ingredient/allergen tags and their filters."""
+
+    def test_tags_follow_text_fields(self, menu_item):
+        assert set(menu_item.ingredient_tags.values_list('slug', flat=True)) == {'melon-seeds', 'spinach', 'palm-oil'}
+        assert list(menu_item.allergen_tags.values_list('name', flat=True)) == ['Fish']
+
+        menu_item.allergens = 'Shellfish;  Peanuts'
+        menu_item.save()
+        assert set(menu_item.allergen_tags.values_list('slug', flat=True)) == {'shellfish', 'peanuts'}
+
+    def test_exclude_allergens_matches_whole_tags(self, api_client, menu_item, category):
+        MenuItem.objects.create(name='Groundnut Soup', description='x', price=Decimal('3500.00'),
+                                category=category, image='g.jpg', allergens='Peanuts, Shellfish')
+        MenuItem.objects.create(name='Fish Pie', description='x', price=Decimal('3500.00'),
+                                category=category, image='f.jpg', allergens='Shellfish-free')
+
+        response = api_client.get('/api/menu/items/', {'exclude_allergens': 'peanuts,Shellfish'})
+        assert sorted(item['name'] for item in response.data['results']) == ['Egusi Soup', 'Fish Pie']
+
+    def test_contains_ingredient_requires_all(self, api_client, menu_item, category):
+        MenuItem.objects.create(name='Efo Riro', description='x', price=Decimal('3500.00'),
+                                category=category, image='e.jpg', ingredients='Spinach, Peppers')
+
+        assert api_client.get('/api/menu/items/', {'contains_ingredient': 'spinach'}).data['count'] == 2
+        response = api_client.get('/api/menu/items/', {'contains_ingredient': 'Spinach,palm oil'})
+        assert [item['name'] for item in response.data['results']] == ['Egusi Soup']
+
+    def test_import_syncs_tags(self, tmp_path, menu_item):
+        path = tmp_path / 'allergens.csv'
+        path.write_text(f'slug,allergens\n{menu_item.slug},Crustaceans\n')
+        call_command('catalog_import', str(path), stdout=StringIO())
+        assert list(menu_item.allergen_tags.values_list('slug', flat=True)) == ['crustaceans']
+
+
+class TestMenuPopularity:
+    """Test the materialized bestseller rankings."""
+
+    def sell(self, user, item, quantity, paid_at):
+        return make_paid_order(user, [(item, quantity)], paid_at)
+
+    def test_refresh_ranks_windows_incrementally(self, api_client, test_user, menu_item, category):
+        now = timezone.now()
+        rice = MenuCategory.objects.create(name='Rice Meals')
+        jollof = MenuItem.objects.create(name='Jollof Rice', description='x', price=Decimal('3000.00'),
+                                         category=rice, image='j.jpg')
+        self.sell(test_user, menu_item, 2, now - timedelta(days=1))
+        self.sell(test_user, jollof, 5, now - timedelta(days=20))
+        self.sell(test_user, jollof, 1, now - timedelta(days=2))
+        self.sell(test_user, menu_item, 9, now - timedelta(days=200))  # outside every window
+
+        assert popularity.refresh_popularity(now=now) == (3, 6)
+        response = api_client.get('/api/menu/items/popular/')
+        assert [(item['name'], item['quantity_sold']) for item in response.data['results']] == [
+            ('Egusi Soup', 2), ('Jollof Rice', 1)
+        ]
+        response = api_client.get('/api/menu/items/popular/', {'window': 30})
+        assert [item['name'] for item in response.data['results']] == ['Jollof Rice', 'Egusi Soup']
+
+        # Only the order paid since the watermark is read on the next run
+        self.sell(test_user, jollof, 4, now)
+        later = now + timedelta(minutes=5)
+        assert popularity.fold_paid_orders(now=later) == 1
+        popularity.rebuild_popularity(now=later)
+        response = api_client.get('/api/menu/items/popular/', {'category': 'rice-meals'})
+        assert [(item['name'], item['quantity_sold']) for item in response.data['results']] == [('Jollof Rice', 5)]
+
+    def test_full_refresh_matches_incremental(self, test_user, menu_item):
+        now = timezone.now()
+        for days in (1, 3, 3, 40):
+            self.sell(test_user, menu_item, 1, now - timedelta(days=days))
+        popularity.refresh_popularity(now=now)
+        incremental = list(MenuItemPopularity.objects.order_by('window_days').values_list('window_days', 'quantity'))
+
+        call_command('refresh_menu_popularity', full=True, stdout=StringIO())
+        assert list(MenuItemPopularity.objects.order_by('window_days').values_list('window_days', 'quantity')) == incremental
+        assert incremental == [(7, 3), (30, 3), (90, 4)]
+
+    def test_invalid_window_rejected(self, api_client, db):
+        assert api_client.get('/api/menu/items/popular/', {'window': 14}).status_code == 400
+
+
+class TestMenuPairings:
+    """Test the frequently-bought-together builder and its read paths."""
+
+    def test_lift_from_counts(self):
+        baskets = [{1, 2}, {1, 2}, {1, 3}, {3}, {2, 3, 4}]
+        orders, item_counts, pair_counts, ids = pairings.count_cooccurrences(baskets, [1, 2, 3, 4])
+        assert orders == 5
+        assert list(item_counts) == [3, 3, 3, 1]
+
+        neighbours = dict(pairings.top_neighbours(orders, item_counts, pair_counts, ids, min_support=1))
+        # P(1,2) = 2/5, P(1) = P(2) = 3/5 -> lift 10/9
+        assert neighbours[1][0] == (2, 2, pytest.approx(10 / 9))
+        # 4 only appears with 2 and 3, so it is their strongest complement
+        assert [paired for paired, _, _ in neighbours[2]][0] == 4
+
+    def test_build_and_read_pairings(self, api_client, test_user, menu_item, category):
+        rice, plantain, water = [
+            MenuItem.objects.create(name=name, description='x', price=Decimal('1000.00'),
+                                    category=category, image=f'{name}.jpg')
+            for name in ('Rice', 'Plantain', 'Water')
+        ]
+        for _ in range(3):
+            make_paid_order(test_user, [(menu_item, 1), (rice, 1)])
+        make_paid_order(test_user, [(rice, 1), (plantain, 2)])
+        make_paid_order(test_user, [(rice, 1), (plantain, 1), (water, 1)])
+        make_paid_order(test_user, [(water, 1)])
+        make_paid_order(test_user, [(menu_item, 1)])
+
+        call_command('build_menu_pairings', stdout=StringIO())
+
+        response = api_client.get(f'/api/menu/items/{rice.id}/pairs_with/')
+        assert response.status_code == 200
+        assert [item['name'] for item in response.data] == ['Plantain', 'Egusi Soup']
+        assert response.data[0]['lift'] == pytest.approx(1.4)
+
+        # Pairs below the support threshold are not stored
+        assert api_client.get(f'/api/menu/items/{water.id}/pairs_with/').data == []
+
+        api_client.force_authenticate(user=test_user)
+        api_client.post('/api/orders/cart/add_item/', {'menu_item_id': menu_item.id, 'quantity': 1})
+        response = api_client.get('/api/orders/cart/complete_meal/')
+        assert [item['name'] for item in response.data] == ['Rice']
+
+
+class TestSparseFieldsets:
+    """Test ?fields= and ?expand= on menu serializers."""
+
+    def test_detail_relations_are_opt_in(self, api_client, test_user, menu_item, category,
+                                         django_assert_num_queries):
+        menu_item.categories.add(category)
+        MenuItemReview.objects.create(menu_item=menu_item, user=test_user, rating=5, title='a', comment='a')
+        url = f'/api/menu/items/{menu_item.id}/'
+
+        with django_assert_num_queries(2):
+            data = api_client.get(url).data
+        assert data['categories'] == [category.id]
+        assert 'reviews' not in data and 'images' not in data
+
+        with django_assert_num_queries(4):
+            data = api_client.get(url, {'expand': 'categories,reviews,images'}).data
+        assert data['categories'][0]['slug'] == 'soups'
+        assert data['reviews'][0]['rating'] == 5
+        assert data['images'] == []
+
+    def test_fields_limits_output_and_prefetching(self, api_client, menu_item, django_assert_num_queries):
+        with django_assert_num_queries(1):
+            data = api_client.get(f'/api/menu/items/{menu_item.id}/', {'fields': 'id,name,price'}).data
+        assert set(data) == {'id', 'name', 'price'}
+
+        data = api_client.get('/api/menu/items/', {'fields': 'id,slug'}).data
+        assert data['results'] == [{'id': menu_item.id, 'slug': 'egusi-soup'}]
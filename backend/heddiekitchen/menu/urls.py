@@ -3,12 +3,13 @@ URL routing for menu app.
 """
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from heddiekitchen.menu.views import MenuCategoryViewSet, MenuItemViewSet
+from heddiekitchen.menu.views import MenuCategoryViewSet, MenuItemViewSet, menu_autocomplete
 
 router = DefaultRouter()
 router.register(r'categories', MenuCategoryViewSet, basename='category')
 router.register(r'items', MenuItemViewSet, basename='menuitem')
 
 urlpatterns = [
+    path('autocomplete/', menu_autocomplete, name='menu-autocomplete'),
     path('', include(router.urls)),
 ]
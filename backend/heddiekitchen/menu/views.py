@@ -2,17 +2,30 @@
 Views for menu app.
 """
 from rest_framework import viewsets, permissions, filters, status
-from rest_framework.decorators import action
+from rest_framework.decorators import action, api_view, permission_classes, throttle_classes
 from rest_framework.response import Response
+from rest_framework.throttling import UserRateThrottle
+from django.db import transaction
+from django.db.models import Prefetch
 from django_filters.rest_framework import DjangoFilterBackend
-from heddiekitchen.menu.models import MenuCategory, MenuItem, MenuItemReview
+from heddiekitchen.menu.cache import CatalogCacheMixin, cached_catalog_response
+from heddiekitchen.menu.facets import compute_facets
+from heddiekitchen.menu.filters import MenuItemFilter
+from heddiekitchen.menu.models import MenuCategory, MenuItem, MenuItemPopularity, MenuItemReview
+from heddiekitchen.menu import autocomplete, pairings
+from heddiekitchen.menu.popularity import DEFAULT_WINDOW, WINDOWS
+from heddiekitchen.menu.search import MenuSearchFilter
+from heddiekitchen.pagination import KeysetPagination
+from heddiekitchen.serializers import is_expanded, wants_field
 from heddiekitchen.menu.serializers import (
-    MenuCategorySerializer, MenuItemDetailSerializer,
+    EMBEDDED_REVIEWS, REVIEW_ORDERINGS, MenuCategorySerializer, MenuItemDetailSerializer,
     MenuItemListSerializer, MenuItemReviewSerializer
 )
 
+MAX_BULK_IDS = 250
 
-class MenuCategoryViewSet(viewsets.ReadOnlyModelViewSet):
+
+class MenuCategoryViewSet(CatalogCacheMixin, viewsets.ReadOnlyModelViewSet):
     """ViewSet for menu categories."""
     queryset = MenuCategory.objects.filter(is_active=True).order_by('display_order')
     serializer_class = MenuCategorySerializer
@@ -20,29 +33,155 @@ class MenuCategoryViewSet(viewsets.ReadOnlyModelViewSet):
     filterset_fields = ['is_active']
 
 
-class MenuItemViewSet(viewsets.ModelViewSet):
+class MenuItemViewSet(CatalogCacheMixin, viewsets.ModelViewSet):
     """ViewSet for menu items with filtering and search."""
-    queryset = MenuItem.objects.filter(is_available=True).select_related('category').prefetch_related('categories', 'images', 'reviews')
+    queryset = MenuItem.objects.filter(is_available=True).select_related('category')
     permission_classes = [permissions.AllowAny]
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
-    filterset_fields = ['category', 'is_featured', 'is_available']
-    search_fields = ['name', 'description', 'ingredients']
+    filter_backends = [DjangoFilterBackend, filters.OrderingFilter, MenuSearchFilter]
+    filterset_class = MenuItemFilter
+    search_fields = ['name', 'ingredients', 'description']  # ranked by the full-text index, see menu/search.py
     ordering_fields = ['price', 'created_at', 'name']
     ordering = ['-is_featured', '-created_at']
 
+    def get_queryset(self):
+        """
+        Prefetch only the relations the detail response will render
+        (?fields=, ?expand=); ratings come from stored aggregates.
+        """
+        queryset = super().get_queryset()
+        if self.action == 'retrieve':
+            if wants_field(self.request, 'categories'):
+                queryset = queryset.prefetch_related('categories')
+            if is_expanded(self.request, 'images'):
+                queryset = queryset.prefetch_related('images')
+            if is_expanded(self.request, 'reviews'):
+                # Only the latest few are embedded; the reviews action pages the rest
+                latest = MenuItemReview.objects.select_related('user').order_by(*REVIEW_ORDERINGS['recent'])
+                queryset = queryset.prefetch_related(
+                    Prefetch('reviews', queryset=latest[:EMBEDDED_REVIEWS], to_attr='latest_reviews')
+                )
+        return queryset
+
     def get_serializer_class(self):
         """Use lightweight serializer for list, detailed for retrieve."""
         if self.action == 'retrieve':
             return MenuItemDetailSerializer
         return MenuItemListSerializer
 
+    @action(detail=False, methods=['get'])
+    def facets(self, request):
+        """
+        Facet counts (category, categories, is_featured, price and prep-time
+        buckets) for the current filters and search. GET /api/menu/items/facets/
+        """
+        return cached_catalog_response(
+            request,
+            'item-facets',
+            lambda: Response(compute_facets(self.filter_queryset(self.get_queryset()))),
+        )
+
+    @action(detail=False, methods=['get'])
+    def popular(self, request):
+        """
+        Bestsellers from the materialized popularity table.
+        GET /api/menu/items/popular/?window=7|30|90&category=<id or slug>&limit=10
+        """
+        try:
+            window = int(request.query_params.get('window', DEFAULT_WINDOW))
+            limit = min(max(int(request.query_params.get('limit', 10)), 1), 50)
+        except ValueError:
+            return Response({'error': 'window and limit must be integers'}, status=status.HTTP_400_BAD_REQUEST)
+        if window not in WINDOWS:
+            return Response({'error': f'window must be one of {WINDOWS}'}, status=status.HTTP_400_BAD_REQUEST)
+
+        rows = MenuItemPopularity.objects.filter(
+            window_days=window, menu_item__is_available=True
+        ).select_related('menu_item__category')
+        category = request.query_params.get('category')
+        if category:
+            rows = rows.filter(**{'category_id' if category.isdigit() else 'category__slug': category})
+            rows = rows.order_by('category_rank')
+        else:
+            rows = rows.order_by('rank')
+        rows = list(rows[:limit])
+
+        items = MenuItemListSerializer([row.menu_item for row in rows], many=True, context={'request': request}).data
+        for item, row in zip(items, rows):
+            item['quantity_sold'] = row.quantity
+        return Response({'window': window, 'results': items})
+
+    @action(detail=False, methods=['get'])
+    def bulk(self, request):
+        """
+        Several items in one round trip, in the requested order, with the ids
+        that do not exist or are not available listed separately.
+        GET /api/menu/items/bulk/?ids=12,4,31
+        """
+        raw_ids = request.query_params.get('ids', '')
+        try:
+            ids = list(dict.fromkeys(int(value) for value in raw_ids.split(',') if value.strip()))
+        except ValueError:
+            return Response({'error': 'ids must be a comma-separated list of integers'}, status=status.HTTP_400_BAD_REQUEST)
+        if len(ids) > MAX_BULK_IDS:
+            return Response({'error': f'at most {MAX_BULK_IDS} ids per request'}, status=status.HTTP_400_BAD_REQUEST)
+
+        def render():
+            found = MenuItem.objects.filter(pk__in=ids).select_related('category').in_bulk()
+            items = [found[pk] for pk in ids if pk in found and found[pk].is_available]
+            return Response({
+                'results': MenuItemListSerializer(items, many=True, context={'request': request}).data,
+                'missing': [pk for pk in ids if pk not in found],
+                'unavailable': [pk for pk in ids if pk in found and not found[pk].is_available],
+            })
+        return cached_catalog_response(request, 'item-bulk', render)
+
+    @action(detail=True, methods=['get'])
+    def pairs_with(self, request, pk=None):
+        """
+        Items frequently bought together with this one, from precomputed lift scores.
+        GET /api/menu/items/{id}/pairs_with/?limit=10
+        """
+        menu_item = self.get_object()
+        try:
+            limit = min(max(int(request.query_params.get('limit', 10)), 1), 50)
+        except ValueError:
+            return Response({'error': 'limit must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+
+        neighbours = pairings.pairs_with(menu_item.pk, limit)
+        items = MenuItemListSerializer(
+            [pairing.paired_item for pairing in neighbours], many=True, context={'request': request}
+        ).data
+        for item, pairing in zip(items, neighbours):
+            item['lift'] = pairing.lift
+        return Response(items)
+
     @action(detail=True, methods=['get'])
     def reviews(self, request, pk=None):
-        """Get reviews for a menu item."""
+        """
+        Keyset-paginated reviews with the stored star histogram.
+        GET /api/menu/items/{id}/reviews/?sort=recent|top&page_size=20&cursor=...
+        """
         menu_item = self.get_object()
-        reviews = menu_item.reviews.all()
-        serializer = MenuItemReviewSerializer(reviews, many=True, context={'request': request})
-        return Response(serializer.data)
+        sort = request.query_params.get('sort', 'recent')
+        if sort not in REVIEW_ORDERINGS:
+            return Response(
+                {'error': f'sort must be one of {list(REVIEW_ORDERINGS)}'}, status=status.HTTP_400_BAD_REQUEST
+            )
+
+        paginator = KeysetPagination()
+        paginator.ordering = REVIEW_ORDERINGS[sort]
+        page = paginator.paginate_queryset(
+            MenuItemReview.objects.filter(menu_item=menu_item).select_related('user'), request, view=self
+        )
+        response = paginator.get_paginated_response(
+            MenuItemReviewSerializer(page, many=True, context={'request': request}).data
+        )
+        response.data.update({
+            'rating_count': menu_item.rating_count,
+            'average_rating': menu_item.average_rating,
+            'histogram': menu_item.rating_histogram,
+        })
+        return response
 
     @action(detail=True, methods=['post'], permission_classes=[permissions.IsAuthenticated])
     def add_review(self, request, pk=None):
@@ -59,21 +198,59 @@ class MenuItemViewSet(viewsets.ModelViewSet):
             )
 
         try:
-            review, created = MenuItemReview.objects.get_or_create(
+            rating = int(rating)
+        except (TypeError, ValueError):
+            return Response(
+                {'error': 'Invalid rating value'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if rating < 1 or rating > 5:
+            return Response(
+                {'error': 'rating must be between 1 and 5'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        with transaction.atomic():
+            review, created = MenuItemReview.objects.select_for_update().get_or_create(
                 menu_item=menu_item,
                 user=request.user,
-                defaults={'rating': int(rating), 'title': title, 'comment': comment}
+                defaults={'rating': rating, 'title': title, 'comment': comment}
             )
-            if not created:
-                review.rating = int(rating)
+            if created:
+                MenuItem.apply_rating_change(menu_item.pk, rating)
+            else:
+                previous_rating = review.rating
+                review.rating = rating
                 review.title = title
                 review.comment = comment
                 review.save()
+                if rating != previous_rating:
+                    MenuItem.apply_rating_change(menu_item.pk, rating, previous_rating)
 
-            serializer = MenuItemReviewSerializer(review, context={'request': request})
-            return Response(serializer.data, status=status.HTTP_201_CREATED if created else status.HTTP_200_OK)
-        except ValueError:
-            return Response(
-                {'error': 'Invalid rating value'},
-                status=status.HTTP_400_BAD_REQUEST
-            )
+        serializer = MenuItemReviewSerializer(review, context={'request': request})
+        return Response(serializer.data, status=status.HTTP_201_CREATED if created else status.HTTP_200_OK)
+
+
+class AutocompleteRateThrottle(UserRateThrottle):
+    """
+    Per-client bucket for search-as-you-type. A typing customer sends a request
+    every few keystrokes, which would exhaust the general anon rate in minutes.
+    """
+    scope = 'autocomplete'
+
+
+@api_view(['GET'])
+@permission_classes([permissions.AllowAny])
+@throttle_classes([AutocompleteRateThrottle])
+def menu_autocomplete(request):
+    """
+    Search-as-you-type suggestions (items, categories, ingredients) from the
+    in-process prefix index; no database query per keystroke.
+    GET /api/menu/autocomplete/?q=jol&limit=8
+    """
+    try:
+        limit = int(request.query_params.get('limit', 8))
+    except ValueError:
+        return Response({'error': 'limit must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+    query = request.query_params.get('q', '')
+    return Response({'query': query, 'results': autocomplete.autocomplete(query, limit=limit)})
@@ -1,8 +1,11 @@
 """
 Admin configuration for orders app.
 """
-from django.contrib import admin
-from heddiekitchen.orders.models import Cart, CartItem, Order, OrderItem
+from django.contrib import admin, messages
+from heddiekitchen.orders.models import (
+    AbandonedCart, Cart, CartItem, Coupon, Order, OrderItem, OrderStatusEvent, StockReservation, TaxRule
+)
+from heddiekitchen.orders.status import STATUS_LABELS, bulk_transition
 
 
 class CartItemInline(admin.TabularInline):
@@ -22,6 +25,18 @@ class CartAdmin(admin.ModelAdmin):
     readonly_fields = ['created_at', 'updated_at']
 
 
+class OrderStatusEventInline(admin.TabularInline):
+    """Read-only status timeline of an order."""
+    model = OrderStatusEvent
+    extra = 0
+    can_delete = False
+    fields = ['created_at', 'from_status', 'to_status', 'location', 'note', 'actor']
+    readonly_fields = fields
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
+
 class OrderItemInline(admin.TabularInline):
     """Inline for order items."""
     model = OrderItem
@@ -35,31 +50,53 @@ class OrderAdmin(admin.ModelAdmin):
     list_display = ['order_number', 'user', 'status', 'payment_status', 'total', 'created_at']
     list_filter = ['status', 'payment_status', 'order_type', 'created_at']
     search_fields = ['order_number', 'user__username', 'shipping_email', 'payment_reference']
-    inlines = [OrderItemInline]
+    inlines = [OrderItemInline, OrderStatusEventInline]
     readonly_fields = ['order_number', 'created_at', 'updated_at', 'paid_at']
     fieldsets = (
         ('Order Info', {'fields': ('order_number', 'user', 'guest_email', 'order_type', 'status')}),
-        ('Totals', {'fields': ('subtotal', 'shipping_fee', 'tax', 'discount', 'total')}),
+        ('Totals', {'fields': ('subtotal', 'shipping_fee', 'tax', 'discount', 'coupon_code', 'total')}),
         ('Shipping', {'fields': ('shipping_name', 'shipping_email', 'shipping_phone', 'shipping_address', 'shipping_city', 'shipping_state', 'shipping_country', 'shipping_zip', 'delivery_date')}),
         ('Payment', {'fields': ('payment_method', 'payment_status', 'payment_reference', 'paid_at')}),
         ('Tracking', {'fields': ('tracking_number', 'current_location', 'special_instructions', 'notes')}),
         ('Timestamps', {'fields': ('created_at', 'updated_at'), 'classes': ('collapse',)}),
     )
 
-    actions = ['mark_as_processing', 'mark_as_dispatched', 'mark_as_delivered']
+    actions = ['mark_as_processing', 'mark_as_ready_for_pickup', 'mark_as_dispatched', 'mark_as_delivered', 'mark_as_cancelled']
+
+    def get_readonly_fields(self, request, obj=None):
+        """Status only changes through the actions, so every change is validated and recorded."""
+        return [*self.readonly_fields, 'status']
+
+    def _transition(self, request, queryset, to_status):
+        moved, skipped = bulk_transition(queryset, to_status, actor=request.user)
+        label = STATUS_LABELS[to_status].lower()
+        self.message_user(request, f"{moved} order(s) marked as {label}.")
+        if skipped:
+            self.message_user(
+                request, f"{skipped} order(s) skipped: they cannot move to {label} from their current status.",
+                level=messages.WARNING,
+            )
 
     def mark_as_processing(self, request, queryset):
-        queryset.update(status='processing')
+        self._transition(request, queryset, 'processing')
     mark_as_processing.short_description = "Mark selected as processing"
 
+    def mark_as_ready_for_pickup(self, request, queryset):
+        self._transition(request, queryset, 'ready_for_pickup')
+    mark_as_ready_for_pickup.short_description = "Mark selected as ready for pickup"
+
     def mark_as_dispatched(self, request, queryset):
-        queryset.update(status='dispatched')
+        self._transition(request, queryset, 'dispatched')
     mark_as_dispatched.short_description = "Mark selected as dispatched"
 
     def mark_as_delivered(self, request, queryset):
-        queryset.update(status='delivered')
+        self._transition(request, queryset, 'delivered')
     mark_as_delivered.short_description = "Mark selected as delivered"
 
+    def mark_as_cancelled(self, request, queryset):
+        self._transition(request, queryset, 'cancelled')
+    mark_as_cancelled.short_description = "Mark selected as cancelled"
+
 
 @admin.register(OrderItem)
 class OrderItemAdmin(admin.ModelAdmin):
@@ -72,3 +109,42 @@ class OrderItemAdmin(admin.ModelAdmin):
     def has_add_permission(self, request):
         """OrderItems are created automatically."""
         return False
+
+
+@admin.register(StockReservation)
+class StockReservationAdmin(admin.ModelAdmin):
+    """Admin for stock reservations."""
+    list_display = ['order', 'menu_item', 'quantity', 'status', 'expires_at', 'created_at']
+    list_filter = ['status', 'created_at']
+    search_fields = ['order__order_number', 'menu_item__name']
+    readonly_fields = ['order', 'menu_item', 'quantity', 'status', 'expires_at', 'created_at', 'updated_at']
+
+
+@admin.register(TaxRule)
+class TaxRuleAdmin(admin.ModelAdmin):
+    """Admin for checkout tax rules."""
+    list_display = ['name', 'country', 'state', 'rate', 'applies_to_shipping', 'is_active']
+    list_filter = ['is_active', 'country']
+    search_fields = ['name', 'country', 'state']
+
+
+@admin.register(Coupon)
+class CouponAdmin(admin.ModelAdmin):
+    """Admin for checkout coupons."""
+    list_display = ['code', 'discount_type', 'value', 'times_used', 'usage_limit', 'valid_until', 'is_active']
+    list_filter = ['discount_type', 'is_active']
+    search_fields = ['code', 'description']
+    readonly_fields = ['times_used', 'created_at', 'updated_at']
+
+
+@admin.register(AbandonedCart)
+class AbandonedCartAdmin(admin.ModelAdmin):
+    """Admin for carts snapshotted by sweep_carts."""
+    list_display = ['session_id', 'item_count', 'total', 'last_activity', 'swept_at']
+    list_filter = ['last_activity']
+    search_fields = ['session_id']
+    readonly_fields = ['session_id', 'items', 'item_count', 'total', 'last_activity', 'swept_at']
+
+    def has_add_permission(self, request):
+        """Snapshots are taken by sweep_carts only."""
+        return False
@@ -7,3 +7,9 @@ from django.apps import AppConfig
 class OrdersConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'heddiekitchen.orders'
+
+    def ready(self):
+        """
+        Import signals that keep the pricing table fresh.
+        """
+        import heddiekitchen.orders.signals
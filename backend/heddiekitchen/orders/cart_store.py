@@ -0,0 +1,695 @@
+"""
+Cart storage backends.
+
+Signed-in users keep their cart in Cart/CartItem rows. Anonymous visitors get
+a random cart token (cookie, or the X-Cart-Id header for clients without
+cookies), and the store named by settings.ANONYMOUS_CART_STORE holds their
+cart. The default, CacheCartStore, keeps each line in the cache with an
+atomically incremented quantity, so browsing and quantity tweaks never write
+to the database. It is merged into the user's
+cart rows the first time the same client makes an authenticated cart
+request.
+
+``summary()`` gives just the item count and total for badges. Cache carts
+compute it from their cache entries; database carts keep it under
+``cart:summary:...`` for CART_SUMMARY_TIMEOUT seconds and every store write
+drops it.
+
+Stores hand out CartItem instances (unsaved ones for cache carts) wrapped in
+CartContents, so CartSerializer renders both kinds unchanged. A cache cart
+line uses its menu item id as its line id.
+
+Anonymous Cart rows left behind by DatabaseCartStore are deleted once stale
+by sweep_abandoned_carts() (``manage.py sweep_carts``); cache carts simply
+expire.
+"""
+import re
+import secrets
+from datetime import datetime, timezone as dt_timezone
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import Exists, F, OuterRef
+from django.utils import timezone
+from django.utils.module_loading import import_string
+from heddiekitchen.menu.models import MenuItem
+from heddiekitchen.orders.models import AbandonedCart, Cart, CartItem, line_totals
+
+CART_COOKIE = 'cart_id'
+CART_HEADER = 'X-Cart-Id'
+CART_CACHE_TIMEOUT = getattr(settings, 'CART_CACHE_TIMEOUT', 60 * 60 * 24 * 30)
+CART_SUMMARY_TIMEOUT = getattr(settings, 'CART_SUMMARY_TIMEOUT', 300)
+TOKEN_RE = re.compile(r'^[0-9a-f]{32}$')
+# Databases with INSERT ... ON CONFLICT and UPDATE ... RETURNING
+UPSERT_VENDORS = ('postgresql', 'sqlite')
+LINE_COLUMNS = 'id, cart_id, menu_item_id, quantity, price_at_add, special_instructions, added_at, updated_at'
+
+
+class CartBatchError(Exception):
+    """A batch had operations that cannot be applied; ``errors`` says which."""
+
+    def __init__(self, errors):
+        super().__init__(errors)
+        self.errors = errors
+
+
+def check_quantity(quantity):
+    if quantity < 1:
+        raise ValueError(f'Quantity must be at least 1, got {quantity}')
+
+
+class BaseCartStore:
+    """Interface shared by all cart stores."""
+
+    def get_cart(self, expand_menu_items=False):
+        """Cart (or cart-shaped object) for CartSerializer."""
+        raise NotImplementedError
+
+    def lines(self, with_menu_items=False):
+        """CartItem instances in the cart."""
+        raise NotImplementedError
+
+    def summary(self):
+        """{'item_count', 'total'} of the cart, without loading menu items."""
+        lines = self.lines()
+        return {
+            'item_count': sum(line.quantity for line in lines),
+            'total': sum((line.get_subtotal() for line in lines), Decimal('0.00')),
+        }
+
+    def get_line(self, line_id):
+        """The line with ``line_id``, or None."""
+        return next((line for line in self.lines() if line.id == line_id), None)
+
+    def quantity_of(self, menu_item_id):
+        return sum(line.quantity for line in self.lines() if line.menu_item_id == menu_item_id)
+
+    def add(self, menu_item, quantity, special_instructions=''):
+        """Add ``quantity`` of ``menu_item``. Returns (line, created)."""
+        raise NotImplementedError
+
+    def set_quantity(self, line_id, quantity):
+        """
+        Set a line's quantity. Returns the line, or None if it does not exist.
+        Raises ValueError below 1: removing a line is remove()'s job.
+        """
+        raise NotImplementedError
+
+    def remove(self, line_id):
+        """Remove a line. Returns False if it does not exist."""
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+    def delete(self):
+        """Drop the cart itself. Returns False if it was already gone."""
+        raise NotImplementedError
+
+    def claim(self):
+        """
+        Take the cart's lines (with menu items) and delete it, so a concurrent
+        merge finds nothing. Call inside transaction.atomic(), and hand the
+        lines to restore() if that transaction fails.
+        """
+        lines = self.lines(with_menu_items=True)
+        if not lines or not self.delete():
+            return []
+        return lines
+
+    def restore(self, lines):
+        """Put back ``lines`` taken by claim() after the merge failed."""
+
+    def apply_batch(self, operations):
+        """
+        Apply add/update/remove ``operations`` (validated CartOperationSerializer
+        data) in order, all or nothing. Operations are folded against one
+        snapshot of the cart and written by _write_batch, so the number of
+        statements does not grow with the batch. Raises CartBatchError.
+        """
+        with transaction.atomic():
+            current = {line.menu_item_id: line for line in self._lines_for_update()}
+            menu_item_ids = {line.id: line.menu_item_id for line in current.values()}
+            menu_items = MenuItem.objects.in_bulk(
+                {op['menu_item_id'] for op in operations if op['op'] == 'add'}
+                | {menu_item_ids[op['cart_item_id']] for op in operations if op['cart_item_id'] in menu_item_ids}
+            )
+
+            # menu_item_id -> [quantity, instructions], or None once removed
+            final = {menu_item_id: [line.quantity, line.special_instructions] for menu_item_id, line in current.items()}
+            errors = []
+            for index, op in enumerate(operations):
+                if op['op'] == 'add':
+                    menu_item = menu_items.get(op['menu_item_id'])
+                    if menu_item is None or not menu_item.is_available:
+                        errors.append({'index': index, 'error': 'Menu item not found or not available'})
+                        continue
+                    quantity = (final.get(menu_item.pk) or [0])[0]
+                    final[menu_item.pk] = [quantity + op['quantity'], op['special_instructions']]
+                    continue
+                menu_item_id = menu_item_ids.get(op['cart_item_id'])
+                if final.get(menu_item_id) is None:
+                    errors.append({'index': index, 'error': 'Cart item not found'})
+                elif op['op'] == 'remove':
+                    final[menu_item_id] = None
+                else:
+                    final[menu_item_id][0] = op['quantity']
+
+            for menu_item_id, values in final.items():
+                menu_item = menu_items.get(menu_item_id)
+                if values and menu_item and menu_item.track_stock and values[0] > menu_item.stock_quantity:
+                    errors.append({
+                        'menu_item_id': menu_item_id, 'error': 'Not enough stock', 'available': menu_item.stock_quantity
+                    })
+            if errors:
+                raise CartBatchError(errors)
+            self._write_batch(current, final, menu_items)
+
+    def _lines_for_update(self):
+        return self.lines()
+
+    def _write_batch(self, current, final, menu_items):
+        """Persist ``final`` given the ``current`` lines (both keyed by menu item id)."""
+        raise NotImplementedError
+
+
+class DatabaseCartStore(BaseCartStore):
+    """Cart and CartItem rows, keyed by user or by cart token."""
+
+    def __init__(self, user=None, token=None):
+        self.lookup = {'user': user} if user is not None else {'session_id': token}
+        self.summary_key = f'cart:summary:user:{user.pk}' if user is not None else f'cart:summary:{token}'
+        self._cart = None
+
+    @property
+    def cart(self):
+        if self._cart is None:
+            self._cart, _ = Cart.objects.get_or_create(**self.lookup)
+        return self._cart
+
+    def get_cart(self, expand_menu_items=False):
+        """
+        One query for a non-empty cart: the lines come with their cart row (and
+        menu items when expanded) joined in. Only an empty cart needs a second
+        lookup for the cart itself, which is not created just to be read.
+        """
+        related = ['cart', 'menu_item__category'] if expand_menu_items else ['cart']
+        lookup = {f'cart__{name}': value for name, value in self.lookup.items()}
+        items = list(CartItem.objects.filter(**lookup).select_related(*related).order_by('id'))
+        if items:
+            self._cart = items[0].cart
+            for item in items:
+                item.cart = self._cart
+        cart = self._cart or Cart.objects.filter(**self.lookup).first()
+        if cart is None:
+            return CartContents(None, [], None)
+        return CartContents(cart.pk, items, cart.updated_at)
+
+    def summary(self):
+        summary = cache.get(self.summary_key)
+        if summary is None:
+            lookup = {f'cart__{name}': value for name, value in self.lookup.items()}
+            item_count, total = line_totals(CartItem.objects.filter(**lookup))
+            summary = {'item_count': item_count, 'total': total}
+            cache.set(self.summary_key, summary, CART_SUMMARY_TIMEOUT)
+        return summary
+
+    def invalidate_summary(self):
+        cache.delete(self.summary_key)
+
+    def lines(self, with_menu_items=False):
+        items = CartItem.objects.filter(cart=self.cart)
+        if with_menu_items:
+            items = items.select_related('menu_item')
+        return list(items)
+
+    def get_line(self, line_id):
+        return CartItem.objects.filter(id=line_id, cart=self.cart).first()
+
+    def quantity_of(self, menu_item_id):
+        return CartItem.objects.filter(cart=self.cart, menu_item_id=menu_item_id).values_list(
+            'quantity', flat=True
+        ).first() or 0
+
+    def add(self, menu_item, quantity, special_instructions=''):
+        """
+        One INSERT ... ON CONFLICT DO UPDATE: concurrent adds of the same item
+        all land, with no lost increment and no unique-constraint race.
+        """
+        now = timezone.now()
+        if connection.vendor not in UPSERT_VENDORS:
+            return self._add_fallback(menu_item.pk, quantity, menu_item.price, special_instructions, now)
+        line = self._upsert([(menu_item.pk, quantity, menu_item.price, special_instructions)], now)[0]
+        self.invalidate_summary()
+        # Only a fresh insert carries this request's timestamp as added_at
+        return line, line.added_at == now
+
+    def _upsert(self, rows, now):
+        """Add (menu_item_id, quantity, price, instructions) rows, incrementing existing lines."""
+        table = connection.ops.quote_name(CartItem._meta.db_table)
+        params = []
+        for menu_item_id, quantity, price, instructions in rows:
+            params += [self.cart.pk, menu_item_id, quantity, price, instructions, now, now]
+        return list(CartItem.objects.raw(
+            f'INSERT INTO {table} '
+            f'(cart_id, menu_item_id, quantity, price_at_add, special_instructions, added_at, updated_at) '
+            f'VALUES {", ".join(["(%s, %s, %s, %s, %s, %s, %s)"] * len(rows))} '
+            f'ON CONFLICT (cart_id, menu_item_id) DO UPDATE SET '
+            f'quantity = {table}.quantity + EXCLUDED.quantity, '
+            f'special_instructions = EXCLUDED.special_instructions, updated_at = EXCLUDED.updated_at '
+            f'RETURNING {LINE_COLUMNS}',
+            params,
+        ))
+
+    def _add_fallback(self, menu_item_id, quantity, price, special_instructions, now):
+        line, created = CartItem.objects.get_or_create(
+            cart=self.cart,
+            menu_item_id=menu_item_id,
+            defaults={'quantity': quantity, 'price_at_add': price, 'special_instructions': special_instructions}
+        )
+        if not created:
+            CartItem.objects.filter(pk=line.pk).update(
+                quantity=F('quantity') + quantity, special_instructions=special_instructions, updated_at=now
+            )
+            line.refresh_from_db()
+        self.invalidate_summary()
+        return line, created
+
+    def set_quantity(self, line_id, quantity):
+        check_quantity(quantity)
+        self.invalidate_summary()
+        if connection.vendor not in UPSERT_VENDORS:
+            if not CartItem.objects.filter(id=line_id, cart=self.cart).update(quantity=quantity, updated_at=timezone.now()):
+                return None
+            return self.get_line(line_id)
+        table = connection.ops.quote_name(CartItem._meta.db_table)
+        return next(iter(CartItem.objects.raw(
+            f'UPDATE {table} SET quantity = %s, updated_at = %s WHERE id = %s AND cart_id = %s RETURNING {LINE_COLUMNS}',
+            [quantity, timezone.now(), line_id, self.cart.pk],
+        )), None)
+
+    def remove(self, line_id):
+        self.invalidate_summary()
+        # CartItem has no dependents or delete signals, so this is a single DELETE
+        return CartItem.objects.filter(id=line_id, cart=self.cart).delete()[0] > 0
+
+    def clear(self):
+        self.invalidate_summary()
+        CartItem.objects.filter(cart=self.cart).delete()
+
+    def delete(self):
+        self.invalidate_summary()
+        self._cart = None
+        return Cart.objects.filter(**self.lookup).delete()[0] > 0
+
+    def claim(self):
+        # Lock the row first: a concurrent merge waits here, then finds it deleted.
+        # The delete is rolled back with the merge, so restore() has nothing to do.
+        if not list(Cart.objects.select_for_update().filter(**self.lookup).values_list('pk', flat=True)):
+            return []
+        return super().claim()
+
+    def _lines_for_update(self):
+        return list(CartItem.objects.select_for_update().filter(cart=self.cart))
+
+    def _write_batch(self, current, final, menu_items):
+        now = timezone.now()
+        removed, changed, added = [], [], []
+        for menu_item_id, values in final.items():
+            line = current.get(menu_item_id)
+            if line is None:
+                menu_item = menu_items[menu_item_id]
+                added.append((menu_item_id, values[0], menu_item.price, values[1]))
+            elif values is None:
+                removed.append(line.pk)
+            elif [line.quantity, line.special_instructions] != values:
+                line.quantity, line.special_instructions = values
+                line.updated_at = now
+                changed.append(line)
+
+        if removed:
+            CartItem.objects.filter(pk__in=removed).delete()
+        if changed:
+            CartItem.objects.bulk_update(changed, ['quantity', 'special_instructions', 'updated_at'])
+        if added and connection.vendor in UPSERT_VENDORS:
+            # Upsert rather than insert: a concurrent add_item may have created the line meanwhile
+            self._upsert(added, now)
+        else:
+            for row in added:
+                self._add_fallback(*row, now)
+        self.invalidate_summary()
+
+
+class CartContents:
+    """Cart-shaped view over already loaded lines. ``id`` is None for cache carts, which have no row."""
+
+    def __init__(self, id, items, updated_at):
+        self.id = id
+        self.items = items
+        self.updated_at = updated_at
+
+    def get_total(self):
+        return sum(item.get_subtotal() for item in self.items)
+
+    def get_item_count(self):
+        return sum(item.quantity for item in self.items)
+
+
+class CacheCartStore(BaseCartStore):
+    """
+    Cart lines in the cache, a few entries per line; nothing touches the
+    database until checkout or login.
+
+        cart:{token}:slots        number of slots handed out
+        cart:{token}:updated      timestamp of the last change
+        cart:{token}:line:{id}    slot of the line for menu item ``id``
+        cart:{token}:slot:{n}     [menu_item_id, price, instructions, added_at]
+        cart:{token}:qty:{n}      quantity
+
+    Quantities change with cache.incr and slots are claimed with cache.incr
+    and cache.add, all atomic on Redis, so concurrent adds are never lost.
+    Reading the cart is two round trips: the slot count, then every slot and
+    quantity in one get_many. A removed line gives up its slot; adding the
+    item again claims a new one, so a late increment to the old slot cannot
+    leak into it. Each entry expires CART_CACHE_TIMEOUT after it last changed.
+    """
+
+    def __init__(self, token):
+        self.prefix = f'cart:{token}'
+        self._state = None
+
+    def _key(self, *parts):
+        return ':'.join([self.prefix, *map(str, parts)])
+
+    def _incr(self, key, delta):
+        try:
+            return cache.incr(key, delta)
+        except ValueError:
+            if cache.add(key, delta, CART_CACHE_TIMEOUT):
+                return delta
+            return cache.incr(key, delta)
+
+    @property
+    def state(self):
+        """(slot -> (meta, quantity) for live lines, updated_at timestamp), read once per store."""
+        if self._state is None:
+            count = cache.get(self._key('slots')) or 0
+            keys = [self._key('updated')]
+            for slot in range(1, count + 1):
+                keys += [self._key('slot', slot), self._key('qty', slot)]
+            found = cache.get_many(keys)
+            slots = {}
+            for slot in range(1, count + 1):
+                meta, quantity = found.get(self._key('slot', slot)), found.get(self._key('qty', slot))
+                if meta is not None and quantity:
+                    slots[slot] = (meta, quantity)
+            self._state = (slots, found.get(self._key('updated')))
+        return self._state
+
+    def _touched(self, *keys):
+        """Record a change and push back the expiry of the cart and of ``keys``."""
+        self._state = None
+        cache.set(self._key('updated'), timezone.now().timestamp(), CART_CACHE_TIMEOUT)
+        for key in (self._key('slots'), *keys):
+            cache.touch(key, CART_CACHE_TIMEOUT)
+
+    def _line(self, meta, quantity):
+        menu_item_id, price, instructions, added_at = meta
+        return CartItem(
+            id=menu_item_id,
+            menu_item_id=menu_item_id,
+            quantity=quantity,
+            price_at_add=Decimal(price),
+            special_instructions=instructions,
+            added_at=datetime.fromtimestamp(added_at, tz=dt_timezone.utc),
+        )
+
+    def lines(self, with_menu_items=False):
+        lines = [self._line(meta, quantity) for meta, quantity in self.state[0].values()]
+        if with_menu_items and lines:
+            menu_items = MenuItem.objects.select_related('category').in_bulk([line.menu_item_id for line in lines])
+            lines = [line for line in lines if line.menu_item_id in menu_items]
+            for line in lines:
+                line.menu_item = menu_items[line.menu_item_id]
+        return lines
+
+    def get_cart(self, expand_menu_items=False):
+        updated_at = self.state[1]
+        return CartContents(
+            None,
+            self.lines(with_menu_items=expand_menu_items),
+            datetime.fromtimestamp(updated_at, tz=dt_timezone.utc) if updated_at else None,
+        )
+
+    def _claim_line(self, menu_item_id, price, special_instructions):
+        """(slot, meta, created) of the line for ``menu_item_id``, claiming a slot if it has none."""
+        line_key = self._key('line', menu_item_id)
+        slot = cache.get(line_key)
+        if slot is None:
+            candidate = self._incr(self._key('slots'), 1)
+            meta = [menu_item_id, str(price), special_instructions, timezone.now().timestamp()]
+            cache.set(self._key('slot', candidate), meta, CART_CACHE_TIMEOUT)
+            if cache.add(line_key, candidate, CART_CACHE_TIMEOUT):
+                return candidate, meta, True
+            # Another request created the line first; give the spare slot back
+            cache.delete(self._key('slot', candidate))
+            slot = cache.get(line_key)
+        meta = cache.get(self._key('slot', slot))
+        if meta is None:
+            # Removed between the two reads: start a new line
+            cache.delete(line_key)
+            return self._claim_line(menu_item_id, price, special_instructions)
+        return slot, meta, False
+
+    def _change(self, menu_item_id, price, delta, special_instructions):
+        """Add ``delta`` to the line's quantity and set its instructions. Returns (line, created)."""
+        slot, meta, created = self._claim_line(menu_item_id, price, special_instructions)
+        if not created and meta[2] != special_instructions:
+            meta = [*meta[:2], special_instructions, meta[3]]
+            cache.set(self._key('slot', slot), meta, CART_CACHE_TIMEOUT)
+        total = self._incr(self._key('qty', slot), delta)
+        self._touched(self._key('line', menu_item_id), self._key('slot', slot), self._key('qty', slot))
+        return self._line(meta, total), created
+
+    def add(self, menu_item, quantity, special_instructions=''):
+        return self._change(menu_item.pk, menu_item.price, quantity, special_instructions)
+
+    def set_quantity(self, line_id, quantity):
+        check_quantity(quantity)
+        slot = cache.get(self._key('line', line_id))
+        meta = cache.get(self._key('slot', slot)) if slot is not None else None
+        if meta is None:
+            return None
+        cache.set(self._key('qty', slot), quantity, CART_CACHE_TIMEOUT)
+        self._touched(self._key('line', line_id), self._key('slot', slot))
+        return self._line(meta, quantity)
+
+    def remove(self, line_id):
+        slot = cache.get(self._key('line', line_id))
+        if slot is None or not cache.delete(self._key('line', line_id)):
+            return False
+        cache.delete_many([self._key('slot', slot), self._key('qty', slot)])
+        self._touched()
+        return True
+
+    def _keys(self):
+        keys = [self._key('updated')]
+        for slot, (meta, _) in self.state[0].items():
+            keys += [self._key('line', meta[0]), self._key('slot', slot), self._key('qty', slot)]
+        return keys
+
+    def clear(self):
+        keys = self._keys()
+        cache.delete_many(keys)
+        self._touched()
+
+    def delete(self):
+        keys = self._keys()
+        # Deleting the slot counter is the atomic step that claims the cart
+        claimed = cache.delete(self._key('slots'))
+        cache.delete_many(keys)
+        self._state = None
+        return claimed
+
+    def restore(self, lines):
+        # The cache is outside the transaction, so put the claimed lines back by hand
+        for line in lines:
+            self._change(line.menu_item_id, line.price_at_add, line.quantity, line.special_instructions)
+
+    def _write_batch(self, current, final, menu_items):
+        for menu_item_id, values in final.items():
+            line = current.get(menu_item_id)
+            if values is None:
+                self.remove(menu_item_id)
+            elif line is None:
+                self.add(menu_items[menu_item_id], values[0], values[1])
+            elif (values[0], values[1]) != (line.quantity, line.special_instructions):
+                # A delta rather than the folded total keeps adds made since the snapshot
+                self._change(menu_item_id, line.price_at_add, values[0] - line.quantity, values[1])
+
+
+def get_anonymous_store_class():
+    return import_string(getattr(
+        settings, 'ANONYMOUS_CART_STORE', 'heddiekitchen.orders.cart_store.CacheCartStore'
+    ))
+
+
+def anonymous_store(token):
+    return get_anonymous_store_class()(token=token)
+
+
+def request_cart_token(request):
+    """The cart token sent by the client, if it is well formed."""
+    token = request.COOKIES.get(CART_COOKIE) or request.headers.get(CART_HEADER) or ''
+    return token if TOKEN_RE.match(token) else None
+
+
+def merge_anonymous_cart(token, user):
+    """
+    Move the anonymous cart ``token`` into ``user``'s cart rows: quantities of
+    items in both are added, the rest are copied. Returns the lines merged.
+    """
+    source = anonymous_store(token)
+    lines = []
+    try:
+        with transaction.atomic():
+            lines = source.claim()
+            if lines:
+                _merge_lines(lines, user)
+    except Exception:
+        source.restore(lines)
+        raise
+    if lines:
+        DatabaseCartStore(user=user).invalidate_summary()
+    return len(lines)
+
+
+def _merge_lines(lines, user):
+    """Add claimed anonymous ``lines`` to ``user``'s cart rows."""
+    cart, _ = Cart.objects.get_or_create(user=user)
+    existing = {
+        line.menu_item_id: line
+        for line in CartItem.objects.select_for_update().filter(
+            cart=cart, menu_item_id__in=[line.menu_item_id for line in lines]
+        )
+    }
+    new_lines = []
+    for line in lines:
+        current = existing.get(line.menu_item_id)
+        if current is None:
+            new_lines.append(CartItem(
+                cart=cart, menu_item_id=line.menu_item_id, quantity=line.quantity,
+                price_at_add=line.price_at_add, special_instructions=line.special_instructions,
+            ))
+        else:
+            current.quantity += line.quantity
+            current.special_instructions = line.special_instructions or current.special_instructions
+    CartItem.objects.bulk_create(new_lines)
+    CartItem.objects.bulk_update(existing.values(), ['quantity', 'special_instructions'])
+
+
+def get_cart_store(request):
+    """
+    Cart store for this request. Sets ``request.cart_token`` to the anonymous
+    cart token the response should hand back (None to drop it): a new one is
+    issued on first use, and it is dropped once merged after sign-in.
+    """
+    token = request_cart_token(request)
+    if request.user.is_authenticated:
+        if token:
+            merge_anonymous_cart(token, request.user)
+        request.cart_token = None
+        return DatabaseCartStore(user=request.user)
+    request.cart_token = token or secrets.token_hex(16)
+    return anonymous_store(request.cart_token)
+
+
+def set_cart_token(request, response):
+    """Hand the anonymous cart token back (cookie and header), or drop the cookie once merged."""
+    token = getattr(request, 'cart_token', None)
+    if token:
+        response.set_cookie(
+            CART_COOKIE, token, max_age=CART_CACHE_TIMEOUT, httponly=True, samesite='Lax',
+            secure=settings.SESSION_COOKIE_SECURE,
+        )
+        response[CART_HEADER] = token
+    elif CART_COOKIE in request.COOKIES:
+        response.delete_cookie(CART_COOKIE, samesite='Lax')
+
+
+def remember_cart_for_order(order, token):
+    """Link a guest order to its cache cart so a successful payment can empty it."""
+    cache.set(f'cart:order:{order.pk}', token, CART_CACHE_TIMEOUT)
+
+
+def clear_cart_for_order(order):
+    """Empty the cart an order was placed from, once it is paid."""
+    if order.user_id:
+        CartItem.objects.filter(cart__user_id=order.user_id).delete()
+        DatabaseCartStore(user=order.user).invalidate_summary()
+        return
+    token = cache.get(f'cart:order:{order.pk}')
+    if token:
+        anonymous_store(token).clear()
+        cache.delete(f'cart:order:{order.pk}')
+
+
+def stale_anonymous_carts(cutoff):
+    """Anonymous carts with no change to the cart or any of its lines since ``cutoff``."""
+    recent_lines = CartItem.objects.filter(cart=OuterRef('pk'), updated_at__gte=cutoff)
+    return Cart.objects.filter(user__isnull=True, updated_at__lt=cutoff).exclude(Exists(recent_lines))
+
+
+def _snapshot(carts):
+    """AbandonedCart rows for the (pk, session_id, updated_at) ``carts`` that still have lines."""
+    lines = {}
+    for line in CartItem.objects.filter(cart_id__in=[pk for pk, _, _ in carts]).values(
+        'cart_id', 'menu_item_id', 'menu_item__name', 'quantity', 'price_at_add', 'updated_at'
+    ):
+        lines.setdefault(line['cart_id'], []).append(line)
+    snapshots = []
+    for pk, session_id, updated_at in carts:
+        if pk not in lines:
+            continue
+        items = lines[pk]
+        snapshots.append(AbandonedCart(
+            session_id=session_id,
+            items=[{
+                'menu_item_id': line['menu_item_id'], 'name': line['menu_item__name'],
+                'quantity': line['quantity'], 'price': str(line['price_at_add']),
+            } for line in items],
+            item_count=sum(line['quantity'] for line in items),
+            total=sum(line['price_at_add'] * line['quantity'] for line in items),
+            last_activity=max([updated_at] + [line['updated_at'] for line in items]),
+        ))
+    return AbandonedCart.objects.bulk_create(snapshots)
+
+
+def sweep_abandoned_carts(cutoff, batch_size=500, snapshot=False, progress=None):
+    """
+    Delete anonymous carts untouched since ``cutoff`` (and their lines), one
+    short transaction per ``batch_size`` carts. With ``snapshot`` the carts
+    that still have lines are copied to AbandonedCart first. ``progress`` is
+    called with the running totals after each batch. Returns the totals:
+    {'carts', 'lines', 'snapshots'}.
+    """
+    totals = {'carts': 0, 'lines': 0, 'snapshots': 0}
+    stale = stale_anonymous_carts(cutoff)
+    while True:
+        batch = list(stale.order_by('updated_at').values_list('pk', flat=True)[:batch_size])
+        if not batch:
+            return totals
+        with transaction.atomic():
+            # Re-checked under the row locks: a cart touched since the scan is kept
+            carts = list(stale.filter(pk__in=batch).select_for_update().values_list('pk', 'session_id', 'updated_at'))
+            if snapshot:
+                totals['snapshots'] += len(_snapshot(carts))
+            _, deleted = Cart.objects.filter(pk__in=[pk for pk, _, _ in carts]).delete()
+        totals['carts'] += deleted.get(Cart._meta.label, 0)
+        totals['lines'] += deleted.get(CartItem._meta.label, 0)
+        if progress:
+            progress(totals)
+        if len(batch) < batch_size:
+            return totals
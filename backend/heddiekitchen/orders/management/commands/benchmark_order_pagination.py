@@ -0,0 +1,97 @@
+"""
+Management command to compare keyset and page-number pagination on orders.
+Usage: python manage.py benchmark_order_pagination [--orders 100000] [--depth 90000] [--repeat 5]
+
+Creates --orders throwaway orders inside a transaction that is rolled back,
+then times fetching one page at the start and one --depth rows in with
+CreatedAtCursorPagination and with PageNumberPagination. Reports the best of
+--repeat runs in milliseconds.
+"""
+import time
+from datetime import timedelta
+from urllib.parse import parse_qs, urlparse
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+from rest_framework.pagination import Cursor, PageNumberPagination
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+from heddiekitchen.orders.models import Order
+from heddiekitchen.pagination import CreatedAtCursorPagination
+
+PAGE_SIZE = CreatedAtCursorPagination.page_size
+
+
+class Command(BaseCommand):
+    help = 'Time order list pages near the start and deep in, keyset versus OFFSET pagination'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--orders', type=int, default=100000, help='Throwaway orders to create')
+        parser.add_argument('--depth', type=int, default=None, help='Rows to skip for the deep page (default: 90%%)')
+        parser.add_argument('--repeat', type=int, default=5, help='Runs to take the best of')
+
+    def handle(self, *args, **options):
+        count = options['orders']
+        depth = options['depth'] if options['depth'] is not None else count * 9 // 10
+        if not 0 <= depth < count:
+            raise CommandError('--depth must be below --orders')
+
+        with transaction.atomic():
+            self._create_orders(count)
+            queryset = Order.objects.order_by(*CreatedAtCursorPagination.ordering)
+            deep = queryset[depth - 1] if depth else None
+            runs = [
+                ('cursor', 'first page', self._cursor_page(queryset, None)),
+                ('cursor', f'position {depth:,}', self._cursor_page(queryset, deep)),
+                ('page number', 'first page', self._numbered_page(queryset, 1)),
+                ('page number', f'page {depth // PAGE_SIZE + 1:,}', self._numbered_page(queryset, depth // PAGE_SIZE + 1)),
+            ]
+            for paginator, page, run in runs:
+                best = min(self._time(run) for _ in range(options['repeat']))
+                self.stdout.write(f'{paginator:<12} {page:<18} {best * 1000:.1f}ms')
+            transaction.set_rollback(True)
+
+    def _create_orders(self, count, batch_size=1000):
+        # created_at is auto_now_add, so spread the rows out after inserting them
+        start = timezone.now() - timedelta(seconds=count)
+        for offset in range(0, count, batch_size):
+            orders = Order.objects.bulk_create([
+                Order(
+                    order_number=f'BENCH-{n}', subtotal=0, total=0, shipping_name='Benchmark',
+                    shipping_email='bench@example.com', shipping_phone='0', shipping_address='-',
+                    shipping_city='Abuja', shipping_state='FCT',
+                )
+                for n in range(offset, min(offset + batch_size, count))
+            ])
+            for n, order in enumerate(orders, start=offset):
+                order.created_at = start + timedelta(seconds=n)
+            Order.objects.bulk_update(orders, ['created_at'])
+
+    def _request(self, **params):
+        return Request(APIRequestFactory(SERVER_NAME='localhost').get('/api/orders/', params))
+
+    def _cursor_page(self, queryset, after):
+        params = {}
+        if after is not None:
+            paginator = CreatedAtCursorPagination()
+            paginator.base_url = 'http://localhost/api/orders/'
+            url = paginator.encode_cursor(Cursor(offset=0, reverse=False, position=str(after.created_at)))
+            params['cursor'] = parse_qs(urlparse(url).query)['cursor'][0]
+
+        def run():
+            return CreatedAtCursorPagination().paginate_queryset(queryset, self._request(**params))
+        return run
+
+    def _numbered_page(self, queryset, number):
+        paginator = PageNumberPagination()
+        paginator.page_size = PAGE_SIZE
+
+        def run():
+            return paginator.paginate_queryset(queryset, self._request(page=number))
+        return run
+
+    def _time(self, run):
+        start = time.perf_counter()
+        run()
+        return time.perf_counter() - start
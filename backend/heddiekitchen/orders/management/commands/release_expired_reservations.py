@@ -0,0 +1,24 @@
+"""
+Management command to release stock held by orders that were never paid.
+Usage: python manage.py release_expired_reservations [--batch-size 500]
+
+Run it from cron every few minutes.
+"""
+from django.core.management.base import BaseCommand
+from heddiekitchen.orders.stock import release_expired_reservations
+
+
+class Command(BaseCommand):
+    help = 'Return stock from expired, unpaid stock reservations'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Reservations released per transaction',
+        )
+
+    def handle(self, *args, **options):
+        released = release_expired_reservations(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Released {released} expired reservation(s)'))
@@ -0,0 +1,57 @@
+"""
+Management command to delete stale anonymous carts.
+Usage: python manage.py sweep_carts [--older-than 30] [--batch-size 500] [--snapshot]
+
+Run it from cron daily. Each batch is its own short transaction, so the
+sweep never holds locks on more than --batch-size carts at a time.
+"""
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from heddiekitchen.orders.cart_store import sweep_abandoned_carts
+
+
+class Command(BaseCommand):
+    help = 'Delete anonymous carts that have not changed for --older-than days'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--older-than',
+            type=int,
+            default=30,
+            help='Days since the cart or any of its lines last changed',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Carts deleted per transaction',
+        )
+        parser.add_argument(
+            '--snapshot',
+            action='store_true',
+            help='Copy carts that still have items to AbandonedCart before deleting them',
+        )
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options['older_than'])
+        started = time.monotonic()
+
+        def progress(totals):
+            if options['verbosity'] > 1:
+                self.stdout.write(f"  {totals['carts']} cart(s) swept, {self._rate(totals, started)} carts/s")
+
+        totals = sweep_abandoned_carts(
+            cutoff, batch_size=options['batch_size'], snapshot=options['snapshot'], progress=progress
+        )
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Swept {totals['carts']} cart(s) and {totals['lines']} line(s), "
+            f"snapshotted {totals['snapshots']}, in {elapsed:.1f}s ({self._rate(totals, started)} carts/s)"
+        ))
+
+    def _rate(self, totals, started):
+        elapsed = time.monotonic() - started
+        return round(totals['carts'] / elapsed) if elapsed else totals['carts']
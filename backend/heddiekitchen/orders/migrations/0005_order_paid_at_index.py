@@ -0,0 +1,17 @@
+# Generated by Django 4.2.11 on 2026-10-17 17:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0004_stockreservation'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['paid_at', 'id'], name='orders_orde_paid_at_9d528b_idx'),
+        ),
+    ]
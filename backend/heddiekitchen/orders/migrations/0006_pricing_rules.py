@@ -0,0 +1,57 @@
+# Generated by Django 4.2.11 on 2026-10-17 18:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0005_order_paid_at_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Coupon',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('code', models.CharField(help_text='Matched case-insensitively', max_length=50, unique=True)),
+                ('description', models.CharField(blank=True, max_length=255)),
+                ('discount_type', models.CharField(choices=[('percent', 'Percentage off subtotal'), ('fixed', 'Fixed amount off subtotal'), ('free_shipping', 'Free delivery')], default='percent', max_length=20)),
+                ('value', models.DecimalField(decimal_places=2, default=0, help_text='Percent (e.g. 10) or NGN amount', max_digits=10)),
+                ('max_discount', models.DecimalField(blank=True, decimal_places=2, help_text='Cap for percentage discounts', max_digits=10, null=True)),
+                ('min_subtotal', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('valid_from', models.DateTimeField(blank=True, null=True)),
+                ('valid_until', models.DateTimeField(blank=True, null=True)),
+                ('usage_limit', models.PositiveIntegerField(blank=True, help_text='Blank for unlimited', null=True)),
+                ('times_used', models.PositiveIntegerField(default=0)),
+                ('is_active', models.BooleanField(default=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'ordering': ['code'],
+            },
+        ),
+        migrations.CreateModel(
+            name='TaxRule',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100)),
+                ('country', models.CharField(blank=True, help_text='Blank applies to every country', max_length=100)),
+                ('state', models.CharField(blank=True, help_text='Blank applies to every state', max_length=100)),
+                ('rate', models.DecimalField(decimal_places=4, help_text='e.g. 0.0750 for 7.5%', max_digits=5)),
+                ('applies_to_shipping', models.BooleanField(default=False, help_text='Charge tax on the delivery fee too')),
+                ('is_active', models.BooleanField(default=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'ordering': ['country', 'state'],
+            },
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='coupon_code',
+            field=models.CharField(blank=True, max_length=50),
+        ),
+    ]
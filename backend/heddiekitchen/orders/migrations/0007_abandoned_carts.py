@@ -0,0 +1,36 @@
+# Generated by Django 4.2.11 on 2026-10-17 18:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0006_pricing_rules'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AbandonedCart',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('session_id', models.CharField(db_index=True, max_length=200)),
+                ('items', models.JSONField(default=list, help_text='[{menu_item_id, name, quantity, price}]')),
+                ('item_count', models.PositiveIntegerField(default=0)),
+                ('total', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('last_activity', models.DateTimeField(help_text='Last change to the cart or its lines')),
+                ('swept_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['-last_activity'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='cart',
+            index=models.Index(condition=models.Q(('user__isnull', True)), fields=['updated_at'], name='cart_anonymous_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='abandonedcart',
+            index=models.Index(fields=['-last_activity'], name='orders_aban_last_ac_b2d415_idx'),
+        ),
+    ]
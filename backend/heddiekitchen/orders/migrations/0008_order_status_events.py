@@ -0,0 +1,54 @@
+# Generated by Django 4.2.11 on 2026-10-17 18:12
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+from django.db.models import OuterRef, Subquery
+
+
+def backfill_status_events(apps, schema_editor):
+    """Give existing orders a one-event timeline at their current status."""
+    Order = apps.get_model('orders', 'Order')
+    OrderStatusEvent = apps.get_model('orders', 'OrderStatusEvent')
+    orders = Order.objects.values_list('pk', 'status', 'current_location').iterator(chunk_size=2000)
+    batch = []
+    for pk, status, location in orders:
+        batch.append(OrderStatusEvent(order_id=pk, to_status=status, location=location))
+        if len(batch) >= 2000:
+            OrderStatusEvent.objects.bulk_create(batch)
+            batch = []
+    OrderStatusEvent.objects.bulk_create(batch)
+    # auto_now_add stamped them with the migration time; use when each order last changed
+    OrderStatusEvent.objects.update(
+        created_at=Subquery(Order.objects.filter(pk=OuterRef('order_id')).values('updated_at')[:1])
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('orders', '0007_abandoned_carts'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OrderStatusEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('from_status', models.CharField(blank=True, help_text='Blank for the order being placed', max_length=20)),
+                ('to_status', models.CharField(choices=[('pending', 'Pending'), ('payment_pending', 'Payment Pending'), ('paid', 'Paid'), ('processing', 'Processing'), ('ready_for_pickup', 'Ready for Pickup'), ('dispatched', 'Dispatched'), ('delivered', 'Delivered'), ('cancelled', 'Cancelled')], max_length=20)),
+                ('location', models.CharField(blank=True, max_length=200)),
+                ('note', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('actor', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('order', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='status_events', to='orders.order')),
+            ],
+            options={
+                'ordering': ['created_at', 'id'],
+                'indexes': [models.Index(fields=['order', 'created_at'], name='orders_orde_order_i_1e3f4d_idx')],
+            },
+        ),
+        migrations.RunPython(backfill_status_events, migrations.RunPython.noop),
+    ]
@@ -1,11 +1,23 @@
 """
 Models for orders app (Cart, CartItem, Order, OrderItem).
 """
+from decimal import Decimal
+
 from django.db import models
+from django.db.models import F, Sum
 from django.contrib.auth.models import User
 from heddiekitchen.menu.models import MenuItem
 
 
+def line_totals(items):
+    """(item_count, total) of a CartItem queryset, computed by the database in one aggregate."""
+    totals = items.aggregate(
+        item_count=Sum('quantity'),
+        total=Sum(F('price_at_add') * F('quantity'), output_field=models.DecimalField(max_digits=12, decimal_places=2)),
+    )
+    return totals['item_count'] or 0, totals['total'] or Decimal('0.00')
+
+
 class Cart(models.Model):
     """Shopping cart for each user."""
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='cart', null=True, blank=True)
@@ -13,18 +25,31 @@ class Cart(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            # sweep_carts scans anonymous carts by age
+            models.Index(fields=['updated_at'], condition=models.Q(user__isnull=True), name='cart_anonymous_updated_idx'),
+        ]
+
     def __str__(self):
         if self.user:
             return f"Cart for {self.user.username}"
         return f"Cart {self.session_id}"
 
+    def get_totals(self):
+        """(item_count, total) in one aggregate query, or from prefetched items."""
+        if 'items' in getattr(self, '_prefetched_objects_cache', {}):
+            items = self.items.all()
+            return sum(item.quantity for item in items), sum(item.get_subtotal() for item in items)
+        return line_totals(self.items.all())
+
     def get_total(self):
         """Calculate total cart value."""
-        return sum(item.get_subtotal() for item in self.items.all())
+        return self.get_totals()[1]
 
     def get_item_count(self):
         """Get total number of items in cart."""
-        return sum(item.quantity for item in self.items.all())
+        return self.get_totals()[0]
 
 
 class CartItem(models.Model):
@@ -80,6 +105,7 @@ class Order(models.Model):
     shipping_fee = models.DecimalField(max_digits=10, decimal_places=2, default=0)
     tax = models.DecimalField(max_digits=10, decimal_places=2, default=0)
     discount = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    coupon_code = models.CharField(max_length=50, blank=True)
     total = models.DecimalField(max_digits=12, decimal_places=2)
 
     # Shipping Info
@@ -121,6 +147,8 @@ class Order(models.Model):
             models.Index(fields=['user', '-created_at']),
             models.Index(fields=['payment_reference']),
             models.Index(fields=['status']),
+            models.Index(fields=['-created_at', '-id']),
+            models.Index(fields=['paid_at', 'id']),
         ]
 
     def __str__(self):
@@ -154,5 +182,133 @@ class OrderItem(models.Model):
         super().save(*args, **kwargs)
 
 
+class OrderStatusEvent(models.Model):
+    """
+    One status change of an order. Append-only: rows are written by
+    orders/status.py and never edited, so they form the tracking timeline.
+    """
+    order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name='status_events')
+    from_status = models.CharField(max_length=20, blank=True, help_text='Blank for the order being placed')
+    to_status = models.CharField(max_length=20, choices=Order.ORDER_STATUS_CHOICES)
+    location = models.CharField(max_length=200, blank=True)
+    note = models.TextField(blank=True)
+    actor = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['created_at', 'id']
+        indexes = [
+            models.Index(fields=['order', 'created_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.order_id}: {self.from_status or 'placed'} -> {self.to_status}"
+
+    def save(self, *args, **kwargs):
+        if self.pk is not None:
+            raise ValueError('Order status events are append-only')
+        super().save(*args, **kwargs)
+
+
+class StockReservation(models.Model):
+    """Stock held for an unpaid order; released by the sweeper if payment never arrives."""
+    STATUS_CHOICES = [
+        ('held', 'Held'),
+        ('converted', 'Converted to sale'),
+        ('released', 'Released'),
+    ]
+
+    order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name='stock_reservations')
+    menu_item = models.ForeignKey(MenuItem, on_delete=models.CASCADE, related_name='stock_reservations')
+    quantity = models.PositiveIntegerField()
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='held')
+    expires_at = models.DateTimeField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'expires_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.quantity} x {self.menu_item_id} for order {self.order_id} ({self.status})"
+
+
+class TaxRule(models.Model):
+    """
+    Tax rate for a destination. Blank country or state means "any"; the most
+    specific active rule wins (state, then country, then the blank default).
+    """
+    name = models.CharField(max_length=100)
+    country = models.CharField(max_length=100, blank=True, help_text='Blank applies to every country')
+    state = models.CharField(max_length=100, blank=True, help_text='Blank applies to every state')
+    rate = models.DecimalField(max_digits=5, decimal_places=4, help_text='e.g. 0.0750 for 7.5%')
+    applies_to_shipping = models.BooleanField(default=False, help_text='Charge tax on the delivery fee too')
+    is_active = models.BooleanField(default=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['country', 'state']
+
+    def __str__(self):
+        return f"{self.name} ({self.rate * 100}%)"
+
+
+class Coupon(models.Model):
+    """Discount code entered at checkout."""
+    DISCOUNT_TYPES = [
+        ('percent', 'Percentage off subtotal'),
+        ('fixed', 'Fixed amount off subtotal'),
+        ('free_shipping', 'Free delivery'),
+    ]
+
+    code = models.CharField(max_length=50, unique=True, help_text='Matched case-insensitively')
+    description = models.CharField(max_length=255, blank=True)
+    discount_type = models.CharField(max_length=20, choices=DISCOUNT_TYPES, default='percent')
+    value = models.DecimalField(max_digits=10, decimal_places=2, default=0, help_text='Percent (e.g. 10) or NGN amount')
+    max_discount = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True,
+                                       help_text='Cap for percentage discounts')
+    min_subtotal = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    valid_from = models.DateTimeField(null=True, blank=True)
+    valid_until = models.DateTimeField(null=True, blank=True)
+    usage_limit = models.PositiveIntegerField(null=True, blank=True, help_text='Blank for unlimited')
+    times_used = models.PositiveIntegerField(default=0)
+    is_active = models.BooleanField(default=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['code']
+
+    def __str__(self):
+        return self.code
+
+    def save(self, *args, **kwargs):
+        self.code = self.code.strip().upper()
+        super().save(*args, **kwargs)
+
+
+class AbandonedCart(models.Model):
+    """Snapshot of an anonymous cart taken by sweep_carts before the cart is deleted."""
+    session_id = models.CharField(max_length=200, db_index=True)
+    items = models.JSONField(default=list, help_text='[{menu_item_id, name, quantity, price}]')
+    item_count = models.PositiveIntegerField(default=0)
+    total = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    last_activity = models.DateTimeField(help_text='Last change to the cart or its lines')
+    swept_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-last_activity']
+        indexes = [
+            models.Index(fields=['-last_activity']),
+        ]
+
+    def __str__(self):
+        return f"Abandoned cart {self.session_id} ({self.item_count} items)"
+
+
 # Import timezone for default order_number generation
 from django.utils import timezone
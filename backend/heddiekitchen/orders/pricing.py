@@ -0,0 +1,225 @@
+"""
+Checkout pricing: delivery fee, tax and coupon discount for a cart subtotal.
+
+Active ShippingDestination, TaxRule and Coupon rows are compiled into one
+in-process PricingTable of dicts keyed by normalized names and codes. Any
+save or delete of those rows bumps a version counter in the cache (see
+orders/signals.py), and the table is rebuilt the first time it is used after
+a bump. Quoting in between costs a single cache read and no queries. A
+LocMem counter is per process, so without Redis the table is also rebuilt
+every IN_PROCESS_TABLE_TTL seconds to pick up edits made in other workers.
+
+Delivery fees are matched on the most specific destination: city, then
+state (both domestic destinations), then country (international). Nigerian
+addresses that match nothing pay DEFAULT_DELIVERY_FEE. Tax comes from the
+most specific TaxRule for (country, state), falling back to DEFAULT_TAX_RATE.
+A coupon's discount comes off the subtotal before tax.
+"""
+import threading
+import time
+from decimal import ROUND_HALF_UP, Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from heddiekitchen.orders.models import Coupon, TaxRule
+from heddiekitchen.shipping.models import ShippingDestination
+
+PRICING_VERSION_KEY = 'orders:pricing_version'
+DEFAULT_COUNTRY = 'nigeria'
+DEFAULT_DELIVERY_FEE = Decimal(str(getattr(settings, 'DEFAULT_DELIVERY_FEE', '4000.00')))
+DEFAULT_TAX_RATE = Decimal(str(getattr(settings, 'DEFAULT_TAX_RATE', '0.075')))
+CENT = Decimal('0.01')
+
+
+class CouponError(Exception):
+    """The coupon code cannot be applied; the message says why."""
+
+
+def _normalize(name):
+    return ' '.join((name or '').lower().split())
+
+
+def _money(amount):
+    return Decimal(amount).quantize(CENT, rounding=ROUND_HALF_UP)
+
+
+def get_pricing_version():
+    version = cache.get(PRICING_VERSION_KEY)
+    if version is None:
+        # Seed from the clock so a flushed cache never reuses an old version number
+        cache.add(PRICING_VERSION_KEY, int(time.time() * 1000), timeout=None)
+        version = cache.get(PRICING_VERSION_KEY)
+    return version
+
+
+def bump_pricing_version():
+    try:
+        return cache.incr(PRICING_VERSION_KEY)
+    except ValueError:
+        version = int(time.time() * 1000)
+        cache.set(PRICING_VERSION_KEY, version, timeout=None)
+        return version
+
+
+def schedule_pricing_bump():
+    """Bump now and again on commit, like schedule_catalog_bump()."""
+    bump_pricing_version()
+    transaction.on_commit(bump_pricing_version)
+
+
+class PricingTable:
+    """Compiled delivery, tax and coupon rules."""
+
+    def __init__(self, destinations, tax_rules, coupons):
+        # (destination_type, name) -> (fee, destination name)
+        self.delivery = {}
+        for destination in destinations:
+            fee = destination.shipping_fee
+            if destination.destination_type == 'international':
+                fee = destination.base_fee or destination.shipping_fee
+            self.delivery[(destination.destination_type, _normalize(destination.name))] = (fee, destination.name)
+        # (country, state) -> (rate, applies_to_shipping); blank means any
+        self.tax = {
+            (_normalize(rule.country), _normalize(rule.state)): (rule.rate, rule.applies_to_shipping)
+            for rule in tax_rules
+        }
+        self.coupons = {coupon.code: coupon for coupon in coupons}
+
+    def delivery_fee(self, city='', state='', country=''):
+        """(fee, matched destination name or None)."""
+        country = _normalize(country) or DEFAULT_COUNTRY
+        if country == DEFAULT_COUNTRY:
+            for name in (_normalize(city), _normalize(state)):
+                if name and ('domestic', name) in self.delivery:
+                    return self.delivery[('domestic', name)]
+            return DEFAULT_DELIVERY_FEE, None
+        if ('international', country) in self.delivery:
+            return self.delivery[('international', country)]
+        return DEFAULT_DELIVERY_FEE, None
+
+    def tax_rate(self, state='', country=''):
+        """(rate, applies_to_shipping) of the most specific rule."""
+        country, state = _normalize(country) or DEFAULT_COUNTRY, _normalize(state)
+        for key in ((country, state), (country, ''), ('', state), ('', '')):
+            if key in self.tax:
+                return self.tax[key]
+        return DEFAULT_TAX_RATE, False
+
+    def coupon(self, code, subtotal, now=None):
+        """The Coupon for ``code`` if it applies to ``subtotal``; raises CouponError otherwise."""
+        coupon = self.coupons.get((code or '').strip().upper())
+        now = now or timezone.now()
+        if coupon is None:
+            raise CouponError('Coupon not found')
+        if (coupon.valid_from and now < coupon.valid_from) or (coupon.valid_until and now > coupon.valid_until):
+            raise CouponError('Coupon is not valid at this time')
+        if coupon.usage_limit is not None and coupon.times_used >= coupon.usage_limit:
+            raise CouponError('Coupon has been fully redeemed')
+        if subtotal < coupon.min_subtotal:
+            raise CouponError(f'Coupon requires a subtotal of at least {coupon.min_subtotal}')
+        return coupon
+
+    def quote(self, subtotal, city='', state='', country='', coupon_code=''):
+        """
+        Totals for a cart ``subtotal`` delivered to the given address. An
+        unusable coupon is reported in ``coupon_error`` and not applied.
+        """
+        subtotal = _money(subtotal)
+        shipping_fee, destination = self.delivery_fee(city, state, country)
+        discount, coupon, coupon_error = Decimal('0.00'), None, None
+        if coupon_code:
+            try:
+                coupon = self.coupon(coupon_code, subtotal)
+            except CouponError as e:
+                coupon_error = str(e)
+        if coupon is not None:
+            if coupon.discount_type == 'free_shipping':
+                shipping_fee = Decimal('0')
+            elif coupon.discount_type == 'percent':
+                discount = subtotal * coupon.value / 100
+                if coupon.max_discount is not None:
+                    discount = min(discount, coupon.max_discount)
+            else:
+                discount = coupon.value
+            discount = min(_money(discount), subtotal)
+
+        rate, taxes_shipping = self.tax_rate(state, country)
+        taxable = subtotal - discount + (shipping_fee if taxes_shipping else 0)
+        tax = _money(taxable * rate)
+        shipping_fee = _money(shipping_fee)
+        return {
+            'subtotal': subtotal,
+            'shipping_fee': shipping_fee,
+            'tax': tax,
+            'tax_rate': rate,
+            'discount': discount,
+            'total': subtotal - discount + shipping_fee + tax,
+            'coupon_code': coupon.code if coupon else '',
+            'coupon_error': coupon_error,
+            'destination': destination,
+        }
+
+
+def build_pricing_table():
+    """Read the active pricing rules into a new PricingTable."""
+    return PricingTable(
+        ShippingDestination.objects.filter(is_active=True),
+        TaxRule.objects.filter(is_active=True),
+        Coupon.objects.filter(is_active=True),
+    )
+
+
+_lock = threading.Lock()
+_table = None
+_version = None
+_built_at = 0.0
+
+
+def _is_current(version):
+    if _table is None or _version != version:
+        return False
+    ttl = getattr(settings, 'IN_PROCESS_TABLE_TTL', None)
+    return ttl is None or time.monotonic() - _built_at < ttl
+
+
+def get_pricing_table():
+    """
+    The table for the current pricing version, rebuilt on first use after a
+    bump or, with IN_PROCESS_TABLE_TTL set, once it is that many seconds old.
+    """
+    global _table, _version, _built_at
+    version = get_pricing_version()
+    if _is_current(version):
+        return _table
+    with _lock:
+        if not _is_current(version):
+            _table, _version, _built_at = build_pricing_table(), version, time.monotonic()
+    return _table
+
+
+def quote(subtotal, city='', state='', country='', coupon_code=''):
+    return get_pricing_table().quote(subtotal, city, state, country, coupon_code)
+
+
+def redeem_coupon(code, now=None):
+    """
+    Count one use of coupon ``code``. The limit, is_active and the validity
+    window are checked in the UPDATE itself, so neither concurrent checkouts
+    nor a table built before the coupon was disabled can redeem it. Returns
+    False if the coupon is no longer usable.
+    """
+    now = now or timezone.now()
+    usable = (
+        (Q(usage_limit__isnull=True) | Q(times_used__lt=F('usage_limit')))
+        & (Q(valid_from__isnull=True) | Q(valid_from__lte=now))
+        & (Q(valid_until__isnull=True) | Q(valid_until__gte=now))
+    )
+    # A queryset update fires no signals, so unlimited coupons never invalidate the table
+    redeemed = Coupon.objects.filter(usable, code=code, is_active=True).update(times_used=F('times_used') + 1) > 0
+    if redeemed and Coupon.objects.filter(code=code, usage_limit__isnull=False).exists():
+        # Limited coupons: refresh times_used so quotes stop offering a used-up code
+        schedule_pricing_bump()
+    return redeemed
@@ -4,24 +4,27 @@ Serializers for orders app.
 from rest_framework import serializers
 from heddiekitchen.orders.models import Cart, CartItem, Order, OrderItem
 from heddiekitchen.menu.serializers import MenuItemListSerializer
+from heddiekitchen.serializers import DynamicFieldsMixin
 
 
-class CartItemSerializer(serializers.ModelSerializer):
-    """Serializer for cart items."""
-    menu_item = MenuItemListSerializer(read_only=True)
+class CartItemSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
+    """Serializer for cart items. ``menu_item`` is an id unless ?expand=menu_item."""
     subtotal = serializers.SerializerMethodField()
 
     class Meta:
         model = CartItem
         fields = ['id', 'menu_item', 'quantity', 'price_at_add', 'subtotal', 'special_instructions', 'added_at']
-        read_only_fields = ['id', 'added_at']
+        read_only_fields = ['id', 'menu_item', 'added_at']
+        expandable_fields = {
+            'menu_item': (MenuItemListSerializer, {'read_only': True}),
+        }
 
     def get_subtotal(self, obj):
         return obj.get_subtotal()
 
 
-class CartSerializer(serializers.ModelSerializer):
-    """Serializer for cart."""
+class CartSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
+    """Serializer for cart. Use ?expand=items.menu_item to embed the menu items."""
     items = CartItemSerializer(many=True, read_only=True)
     total = serializers.SerializerMethodField()
     item_count = serializers.SerializerMethodField()
@@ -37,31 +40,33 @@ class CartSerializer(serializers.ModelSerializer):
         return obj.get_item_count()
 
 
-class OrderItemSerializer(serializers.ModelSerializer):
+class OrderItemSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     """Serializer for order items."""
     class Meta:
         model = OrderItem
         fields = ['id', 'item_name', 'quantity', 'unit_price', 'subtotal', 'special_instructions']
 
 
-class OrderDetailSerializer(serializers.ModelSerializer):
-    """Detailed serializer for orders."""
-    items = OrderItemSerializer(many=True, read_only=True)
+class OrderDetailSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
+    """Detailed serializer for orders. ``items`` only appear with ?expand=items."""
 
     class Meta:
         model = Order
         fields = [
             'id', 'order_number', 'order_type', 'status', 'payment_status',
-            'subtotal', 'shipping_fee', 'tax', 'discount', 'total',
+            'subtotal', 'shipping_fee', 'tax', 'discount', 'coupon_code', 'total',
             'shipping_name', 'shipping_email', 'shipping_phone', 'shipping_address',
             'shipping_city', 'shipping_state', 'shipping_country', 'shipping_zip',
             'delivery_date', 'special_instructions', 'payment_reference', 'tracking_number',
-            'current_location', 'items', 'created_at', 'updated_at'
+            'current_location', 'created_at', 'updated_at'
         ]
         read_only_fields = ['id', 'order_number', 'created_at', 'updated_at']
+        expandable_fields = {
+            'items': (OrderItemSerializer, {'many': True, 'read_only': True}),
+        }
 
 
-class OrderListSerializer(serializers.ModelSerializer):
+class OrderListSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     """List serializer for orders."""
     items_count = serializers.SerializerMethodField()
 
@@ -73,6 +78,8 @@ class OrderListSerializer(serializers.ModelSerializer):
         ]
 
     def get_items_count(self, obj):
+        if hasattr(obj, 'items_total'):
+            return obj.items_total
         return obj.items.count()
 
 
@@ -89,3 +96,35 @@ class CreateOrderSerializer(serializers.Serializer):
     delivery_date = serializers.DateField(required=False, allow_null=True)
     special_instructions = serializers.CharField(required=False, allow_blank=True, default='')
     payment_method = serializers.CharField(max_length=50, default='paystack', required=False)
+    coupon_code = serializers.CharField(max_length=50, required=False, allow_blank=True, default='')
+
+
+class QuoteSerializer(serializers.Serializer):
+    """Query parameters of the checkout quote: where the cart is going and an optional coupon."""
+    shipping_city = serializers.CharField(max_length=100, required=False, allow_blank=True, default='')
+    shipping_state = serializers.CharField(max_length=100, required=False, allow_blank=True, default='')
+    shipping_country = serializers.CharField(max_length=100, required=False, allow_blank=True, default='Nigeria')
+    coupon_code = serializers.CharField(max_length=50, required=False, allow_blank=True, default='')
+
+
+class CartOperationSerializer(serializers.Serializer):
+    """One operation of a cart batch."""
+    op = serializers.ChoiceField(choices=['add', 'update', 'remove'])
+    menu_item_id = serializers.IntegerField(required=False, default=None)
+    cart_item_id = serializers.IntegerField(required=False, default=None)
+    quantity = serializers.IntegerField(min_value=1, required=False, default=None)
+    special_instructions = serializers.CharField(required=False, allow_blank=True, default='')
+
+    def validate(self, attrs):
+        required = {'add': ['menu_item_id'], 'update': ['cart_item_id', 'quantity'], 'remove': ['cart_item_id']}
+        missing = [name for name in required[attrs['op']] if attrs[name] is None]
+        if missing:
+            raise serializers.ValidationError({name: f"required for '{attrs['op']}'" for name in missing})
+        if attrs['op'] == 'add' and attrs['quantity'] is None:
+            attrs['quantity'] = 1
+        return attrs
+
+
+class CartBatchSerializer(serializers.Serializer):
+    """Serializer for POST /api/orders/cart/batch/."""
+    operations = CartOperationSerializer(many=True, allow_empty=False, max_length=100)
@@ -0,0 +1,22 @@
+"""
+Signals for orders app.
+"""
+from django.db.models.signals import post_delete, post_save
+from heddiekitchen.orders.models import Coupon, TaxRule
+from heddiekitchen.orders.pricing import schedule_pricing_bump
+from heddiekitchen.shipping.models import ShippingDestination
+
+PRICING_MODELS = (ShippingDestination, TaxRule, Coupon)
+
+
+def bump_pricing_on_change(sender, raw=False, **kwargs):
+    """
+    Rebuild the pricing table whenever a delivery, tax or coupon rule changes.
+    """
+    if not raw:
+        schedule_pricing_bump()
+
+
+for _model in PRICING_MODELS:
+    post_save.connect(bump_pricing_on_change, sender=_model, dispatch_uid=f'pricing_bump_save_{_model.__name__}')
+    post_delete.connect(bump_pricing_on_change, sender=_model, dispatch_uid=f'pricing_bump_delete_{_model.__name__}')
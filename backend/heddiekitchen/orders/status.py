@@ -0,0 +1,100 @@
+"""
+Order status state machine.
+
+TRANSITIONS lists the statuses each status may move to; anything else is
+refused with InvalidTransition. Every change goes through transition() or
+bulk_transition(), which update Order.status and append OrderStatusEvent
+rows in the same transaction. The events table, indexed on (order,
+created_at), is the order's tracking timeline.
+"""
+from django.db import transaction
+from django.utils import timezone
+from heddiekitchen.orders.models import Order, OrderStatusEvent
+
+TRANSITIONS = {
+    'pending': {'payment_pending', 'paid', 'cancelled'},
+    # A confirmed payment goes straight to the kitchen
+    'payment_pending': {'paid', 'processing', 'cancelled'},
+    'paid': {'processing', 'cancelled'},
+    'processing': {'ready_for_pickup', 'dispatched', 'cancelled'},
+    'ready_for_pickup': {'delivered', 'cancelled'},
+    'dispatched': {'delivered'},
+    'delivered': set(),
+    'cancelled': set(),
+}
+STATUS_LABELS = dict(Order.ORDER_STATUS_CHOICES)
+
+
+class InvalidTransition(Exception):
+    """Raised when an order cannot move from its current status to the requested one."""
+
+    def __init__(self, order, to_status):
+        self.order = order
+        self.from_status = order.status
+        self.to_status = to_status
+        super().__init__(f"Order {order.order_number} cannot go from {order.status} to {to_status}")
+
+
+def can_transition(from_status, to_status):
+    return to_status in TRANSITIONS.get(from_status, ())
+
+
+def record_placed(order, actor=None):
+    """Open the timeline of a newly created order."""
+    return OrderStatusEvent.objects.create(order=order, to_status=order.status, actor=actor)
+
+
+def transition(order, to_status, actor=None, note='', location=''):
+    """
+    Move ``order`` to ``to_status`` and record the event. The UPDATE is
+    conditional on the status we validated against, so a concurrent change
+    raises InvalidTransition rather than being overwritten.
+    """
+    if not can_transition(order.status, to_status):
+        raise InvalidTransition(order, to_status)
+    now = timezone.now()
+    changes = {'status': to_status, 'updated_at': now}
+    if location:
+        changes['current_location'] = location
+    with transaction.atomic():
+        if not Order.objects.filter(pk=order.pk, status=order.status).update(**changes):
+            order.refresh_from_db(fields=['status'])
+            raise InvalidTransition(order, to_status)
+        event = OrderStatusEvent.objects.create(
+            order=order, from_status=order.status, to_status=to_status, location=location, note=note, actor=actor
+        )
+    for field, value in changes.items():
+        setattr(order, field, value)
+    return event
+
+
+def bulk_transition(queryset, to_status, actor=None, note=''):
+    """
+    Move every order in ``queryset`` that may go to ``to_status``: one locked
+    read, one UPDATE and one bulk_create of events, in one transaction.
+    Returns (orders moved, orders skipped because the move is not allowed).
+    """
+    with transaction.atomic():
+        current = dict(queryset.select_for_update().values_list('pk', 'status'))
+        allowed = {pk: status for pk, status in current.items() if can_transition(status, to_status)}
+        if allowed:
+            Order.objects.filter(pk__in=allowed).update(status=to_status, updated_at=timezone.now())
+            OrderStatusEvent.objects.bulk_create([
+                OrderStatusEvent(order_id=pk, from_status=status, to_status=to_status, note=note, actor=actor)
+                for pk, status in allowed.items()
+            ])
+    return len(allowed), len(current) - len(allowed)
+
+
+def timeline(order):
+    """The order's status events, oldest first, from one indexed range read."""
+    return [
+        {
+            'status': event.to_status,
+            'label': STATUS_LABELS.get(event.to_status, event.to_status),
+            'location': event.location,
+            'note': event.note,
+            'at': event.created_at,
+        }
+        for event in OrderStatusEvent.objects.filter(order=order).order_by('created_at', 'id')
+    ]
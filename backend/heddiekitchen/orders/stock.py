@@ -0,0 +1,146 @@
+"""
+Stock reservation engine for menu items with ``track_stock`` enabled.
+
+Stock is taken when an order is created, using a conditional
+``UPDATE ... SET stock_quantity = stock_quantity - n WHERE stock_quantity >= n``
+so concurrent checkouts can never drive it below zero. The hold is recorded as
+a StockReservation that either becomes a sale when Paystack confirms payment
+or is released by ``manage.py release_expired_reservations``.
+"""
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Value
+from django.db.models.functions import Greatest
+from django.utils import timezone
+from heddiekitchen.menu.cache import schedule_catalog_bump
+from heddiekitchen.menu.models import MenuItem
+from heddiekitchen.orders.models import StockReservation
+
+RESERVATION_MINUTES = getattr(settings, 'STOCK_RESERVATION_MINUTES', 30)
+
+
+class InsufficientStock(Exception):
+    """Raised when one or more items cannot cover the requested quantity."""
+
+    def __init__(self, menu_item_ids):
+        self.menu_item_ids = sorted(menu_item_ids)
+        super().__init__(f"Insufficient stock for menu items {self.menu_item_ids}")
+
+
+def _sum_quantities(lines):
+    quantities = defaultdict(int)
+    for menu_item_id, quantity in lines:
+        quantities[menu_item_id] += quantity
+    return quantities
+
+
+def _mark_sold_out(menu_item_ids):
+    # sold_out_at tells items hidden here apart from ones an admin withdrew
+    flipped = MenuItem.objects.filter(
+        pk__in=menu_item_ids, track_stock=True, stock_quantity__lte=0, is_available=True
+    ).update(is_available=False, sold_out_at=timezone.now())
+    if flipped:
+        schedule_catalog_bump()
+
+
+def reserve_stock(order, lines):
+    """
+    Take stock for ``lines`` (iterable of (menu_item_id, quantity)) and record
+    the hold against ``order``. Untracked items are ignored.
+
+    Raises InsufficientStock without changing anything if any item is short.
+    """
+    quantities = _sum_quantities(lines)
+    tracked = MenuItem.objects.filter(pk__in=quantities, track_stock=True).values_list('pk', flat=True)
+    # Lock rows in a stable order so two checkouts cannot deadlock on each other
+    tracked = sorted(tracked)
+    if not tracked:
+        return []
+
+    with transaction.atomic():
+        short = [
+            menu_item_id for menu_item_id in tracked
+            if not MenuItem.objects.filter(
+                pk=menu_item_id, stock_quantity__gte=quantities[menu_item_id]
+            ).update(stock_quantity=F('stock_quantity') - quantities[menu_item_id])
+        ]
+        if short:
+            raise InsufficientStock(short)
+
+        _mark_sold_out(tracked)
+        expires_at = timezone.now() + timedelta(minutes=RESERVATION_MINUTES)
+        return StockReservation.objects.bulk_create([
+            StockReservation(order=order, menu_item_id=menu_item_id,
+                             quantity=quantities[menu_item_id], expires_at=expires_at)
+            for menu_item_id in tracked
+        ])
+
+
+def _restock(reservations):
+    """Give the reserved quantities back and re-list items that sold out and are in stock again."""
+    restocked = _sum_quantities((r.menu_item_id, r.quantity) for r in reservations)
+    for menu_item_id in sorted(restocked):
+        MenuItem.objects.filter(pk=menu_item_id).update(stock_quantity=F('stock_quantity') + restocked[menu_item_id])
+    relisted = MenuItem.objects.filter(
+        pk__in=restocked, track_stock=True, stock_quantity__gt=0, is_available=False, sold_out_at__isnull=False
+    ).update(is_available=True, sold_out_at=None)
+    if relisted:
+        schedule_catalog_bump()
+
+
+def release_reservations(reservations):
+    """
+    Release held reservations (a queryset) and return their stock.
+    Returns the number of reservations released.
+    """
+    with transaction.atomic():
+        held = list(reservations.select_for_update().filter(status='held'))
+        if not held:
+            return 0
+        _restock(held)
+        StockReservation.objects.filter(pk__in=[r.pk for r in held]).update(
+            status='released', updated_at=timezone.now()
+        )
+    return len(held)
+
+
+def release_expired_reservations(now=None, batch_size=500):
+    """Release every held reservation past its expiry, in batches. Returns the count."""
+    now = now or timezone.now()
+    released = 0
+    while True:
+        batch = list(
+            StockReservation.objects.filter(status='held', expires_at__lte=now)
+            .order_by('expires_at').values_list('pk', flat=True)[:batch_size]
+        )
+        if not batch:
+            return released
+        released += release_reservations(StockReservation.objects.filter(pk__in=batch))
+
+
+def convert_reservations(order):
+    """
+    Turn an order's reservations into a sale once payment is confirmed.
+
+    If the sweeper already released them (payment arrived late) the stock is
+    taken again; the customer has paid, so this never fails, but it cannot go
+    below zero.
+    """
+    with transaction.atomic():
+        reservations = list(order.stock_reservations.select_for_update().exclude(status='converted'))
+        if not reservations:
+            return 0
+        released = _sum_quantities((r.menu_item_id, r.quantity) for r in reservations if r.status == 'released')
+        for menu_item_id in sorted(released):
+            MenuItem.objects.filter(pk=menu_item_id).update(
+                stock_quantity=Greatest(F('stock_quantity') - released[menu_item_id], Value(0))
+            )
+        if released:
+            _mark_sold_out(released)
+        StockReservation.objects.filter(pk__in=[r.pk for r in reservations]).update(
+            status='converted', updated_at=timezone.now()
+        )
+    return len(reservations)
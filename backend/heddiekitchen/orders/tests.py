@@ -0,0 +1,788 @@
+"""
+Tests for orders app.
+"""
+import json
+import secrets
+import sys
+import threading
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+
+import pytest
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import OperationalError, connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+from heddiekitchen.menu.models import MenuCategory, MenuItem
+from heddiekitchen.orders.cart_store import CacheCartStore, DatabaseCartStore
+from heddiekitchen.orders.models import (
+    AbandonedCart, Cart, CartItem, Coupon, Order, OrderStatusEvent, StockReservation, TaxRule
+)
+from heddiekitchen.orders.pricing import get_pricing_table, redeem_coupon
+from heddiekitchen.orders.status import InvalidTransition, bulk_transition, transition
+from heddiekitchen.orders.stock import (
+    InsufficientStock, convert_reservations, release_expired_reservations, reserve_stock
+)
+from heddiekitchen.shipping.models import ShippingDestination
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.clear()
+
+
+@pytest.fixture
+def api_client():
+    return APIClient()
+
+
+@pytest.fixture
+def test_user(db):
+    return User.objects.create_user(
+        username='testuser',
+        email='test@example.com',
+        password='testpass123'
+    )
+
+
+@pytest.fixture
+def menu_item(db):
+    category = MenuCategory.objects.create(name='Soups')
+    return MenuItem.objects.create(
+        name='Egusi Soup',
+        description='Melon seed soup',
+        price=Decimal('4500.00'),
+        category=category,
+        image='menu_items/egusi.jpg',
+    )
+
+
+def make_order(user, **kwargs):
+    defaults = {
+        'user': user,
+        'subtotal': Decimal('4500.00'),
+        'total': Decimal('4500.00'),
+        'shipping_name': 'Test User',
+        'shipping_email': 'test@example.com',
+        'shipping_phone': '08000000000',
+        'shipping_address': '1 Test Street',
+        'shipping_city': 'Abuja',
+        'shipping_state': 'FCT',
+    }
+    defaults.update(kwargs)
+    return Order.objects.create(**defaults)
+
+
+class TestOrderPagination:
+    """Test keyset pagination of the order list."""
+
+    def test_cursor_walks_all_orders_without_count(self, api_client, test_user, django_assert_max_num_queries):
+        orders = [make_order(test_user) for _ in range(25)]
+        api_client.force_authenticate(user=test_user)
+
+        seen = []
+        url = '/api/orders/'
+        while url:
+            with django_assert_max_num_queries(3) as captured:
+                response = api_client.get(url)
+            assert response.status_code == 200
+            assert 'count' not in response.data
+            assert not any('COUNT(*)' in q['sql'] for q in captured.captured_queries)
+            seen.extend(row['id'] for row in response.data['results'])
+            url = response.data['next']
+
+        assert seen == [order.id for order in reversed(orders)]
+
+    def test_benchmark_command_leaves_no_orders(self, db):
+        out = StringIO()
+        call_command('benchmark_order_pagination', '--orders', '60', '--depth', '40', '--repeat', '1', stdout=out)
+        lines = out.getvalue().splitlines()
+        assert [line.split('  ')[0] for line in lines] == ['cursor', 'cursor', 'page number', 'page number']
+        assert 'position 40' in lines[1] and 'page 3' in lines[3]
+        assert not Order.objects.exists()
+
+
+class TestStockReservations:
+    """Test stock holds for items with track_stock enabled."""
+
+    @pytest.fixture
+    def tracked_item(self, menu_item):
+        menu_item.track_stock = True
+        menu_item.stock_quantity = 3
+        menu_item.save()
+        return menu_item
+
+    def test_reserve_takes_stock_and_marks_sold_out(self, test_user, tracked_item):
+        order = make_order(test_user)
+        reserve_stock(order, [(tracked_item.pk, 2), (tracked_item.pk, 1)])
+
+        tracked_item.refresh_from_db()
+        assert tracked_item.stock_quantity == 0
+        assert tracked_item.is_available is False
+        reservation = order.stock_reservations.get()
+        assert (reservation.quantity, reservation.status) == (3, 'held')
+
+    def test_oversell_is_rejected_without_side_effects(self, test_user, tracked_item):
+        order = make_order(test_user)
+        with pytest.raises(InsufficientStock) as exc:
+            reserve_stock(order, [(tracked_item.pk, 4)])
+
+        assert exc.value.menu_item_ids == [tracked_item.pk]
+        tracked_item.refresh_from_db()
+        assert tracked_item.stock_quantity == 3
+        assert not StockReservation.objects.exists()
+
+    def test_untracked_items_are_ignored(self, test_user, menu_item):
+        order = make_order(test_user)
+        assert reserve_stock(order, [(menu_item.pk, 50)]) == []
+        menu_item.refresh_from_db()
+        assert menu_item.stock_quantity == 0
+        assert menu_item.is_available is True
+
+    def test_expired_reservations_are_released(self, test_user, tracked_item):
+        order = make_order(test_user)
+        reserve_stock(order, [(tracked_item.pk, 3)])
+
+        assert release_expired_reservations() == 0
+        assert release_expired_reservations(now=timezone.now() + timedelta(hours=1)) == 1
+
+        tracked_item.refresh_from_db()
+        assert tracked_item.stock_quantity == 3
+        assert tracked_item.is_available is True and tracked_item.sold_out_at is None
+        assert order.stock_reservations.get().status == 'released'
+
+    def test_release_keeps_admin_disabled_items_hidden(self, test_user, tracked_item):
+        order = make_order(test_user)
+        reserve_stock(order, [(tracked_item.pk, 1)])
+        tracked_item.refresh_from_db()
+        assert tracked_item.is_available is True and tracked_item.sold_out_at is None
+        # Withdrawn by hand while the reservation is held
+        tracked_item.is_available = False
+        tracked_item.save()
+
+        assert release_expired_reservations(now=timezone.now() + timedelta(hours=1)) == 1
+        tracked_item.refresh_from_db()
+        assert tracked_item.stock_quantity == 3
+        assert tracked_item.is_available is False
+
+    def test_late_payment_takes_released_stock_again(self, test_user, tracked_item):
+        order = make_order(test_user)
+        reserve_stock(order, [(tracked_item.pk, 2)])
+        release_expired_reservations(now=timezone.now() + timedelta(hours=1))
+
+        assert convert_reservations(order) == 1
+        tracked_item.refresh_from_db()
+        assert tracked_item.stock_quantity == 1
+        assert order.stock_reservations.get().status == 'converted'
+        # Converting twice is a no-op
+        assert convert_reservations(order) == 0
+
+    def test_checkout_conflict_rolls_back_order(self, api_client, test_user, tracked_item):
+        cart = Cart.objects.create(user=test_user)
+        CartItem.objects.create(cart=cart, menu_item=tracked_item, quantity=5, price_at_add=tracked_item.price)
+        api_client.force_authenticate(user=test_user)
+
+        response = api_client.post('/api/orders/create_order/', {
+            'shipping_name': 'Test User',
+            'shipping_email': 'test@example.com',
+            'shipping_phone': '08000000000',
+            'shipping_address': '1 Test Street',
+            'shipping_city': 'Abuja',
+            'shipping_state': 'FCT',
+        }, format='json')
+
+        assert response.status_code == 409
+        assert response.data['menu_item_ids'] == [tracked_item.pk]
+        assert not Order.objects.exists()
+
+    def test_add_item_rejects_more_than_stock(self, api_client, test_user, tracked_item):
+        api_client.force_authenticate(user=test_user)
+        response = api_client.post('/api/orders/cart/add_item/', {
+            'menu_item_id': tracked_item.pk, 'quantity': 4
+        }, format='json')
+        assert response.status_code == 400
+        assert response.data['available'] == 3
+
+
+class TestCartExpansion:
+    """Test that cart and order relations are opt-in."""
+
+    def test_cart_menu_items_are_ids_unless_expanded(self, api_client, test_user, menu_item):
+        cart = Cart.objects.create(user=test_user)
+        CartItem.objects.create(cart=cart, menu_item=menu_item, quantity=2, price_at_add=menu_item.price)
+        api_client.force_authenticate(user=test_user)
+
+        data = api_client.get('/api/orders/cart/list_cart/').data
+        assert data['items'][0]['menu_item'] == menu_item.id
+        assert data['item_count'] == 2
+
+        data = api_client.get('/api/orders/cart/list_cart/', {
+            'expand': 'items.menu_item', 'fields': 'total,items.quantity,items.menu_item.name'
+        }).data
+        assert data == {'total': Decimal('9000.00'), 'items': [{'quantity': 2, 'menu_item': {'name': 'Egusi Soup'}}]}
+
+    def test_order_items_are_opt_in(self, api_client, test_user, menu_item):
+        order = make_order(test_user)
+        order.items.create(menu_item=menu_item, quantity=1, unit_price=menu_item.price)
+        api_client.force_authenticate(user=test_user)
+
+        assert 'items' not in api_client.get(f'/api/orders/{order.id}/').data
+        data = api_client.get(f'/api/orders/{order.id}/', {'expand': 'items'}).data
+        assert data['items'][0]['item_name'] == 'Egusi Soup'
+
+
+class TestCacheCartStore:
+    """Test anonymous carts kept in the cache and merged on sign-in."""
+
+    @pytest.fixture(autouse=True)
+    def cache_store(self, settings):
+        settings.ANONYMOUS_CART_STORE = 'heddiekitchen.orders.cart_store.CacheCartStore'
+
+    @pytest.fixture
+    def second_item(self, menu_item):
+        return MenuItem.objects.create(
+            name='Jollof Rice', price=Decimal('3000.00'), category=menu_item.category, image='menu_items/jollof.jpg'
+        )
+
+    def test_anonymous_cart_writes_nothing_to_the_database(self, api_client, menu_item, django_assert_num_queries):
+        response = api_client.post('/api/orders/cart/add_item/', {'menu_item_id': menu_item.pk, 'quantity': 2}, format='json')
+        assert response.status_code == 201
+        token = response['X-Cart-Id']
+        assert api_client.cookies['cart_id'].value == token
+
+        # Only the menu item lookup reads the database
+        with django_assert_num_queries(1):
+            response = api_client.post('/api/orders/cart/add_item/', {'menu_item_id': menu_item.pk}, format='json')
+        assert response.status_code == 200 and response.data['quantity'] == 3
+        with django_assert_num_queries(0):
+            api_client.put('/api/orders/cart/update_item/', {'cart_item_id': menu_item.pk, 'quantity': 4}, format='json')
+            data = api_client.get('/api/orders/cart/list_cart/').data
+
+        assert set(data) == {'id', 'items', 'total', 'item_count', 'updated_at'}
+        assert data['items'][0]['menu_item'] == menu_item.pk
+        assert (data['total'], data['item_count']) == (Decimal('18000.00'), 4)
+        assert not Cart.objects.exists() and not CartItem.objects.exists()
+
+        assert api_client.delete('/api/orders/cart/remove_item/', {'cart_item_id': menu_item.pk}, format='json').status_code == 204
+        assert api_client.delete('/api/orders/cart/remove_item/', {'cart_item_id': menu_item.pk}, format='json').status_code == 404
+
+    def test_header_token_identifies_cart(self, menu_item):
+        first = APIClient()
+        token = first.post('/api/orders/cart/add_item/', {'menu_item_id': menu_item.pk}, format='json')['X-Cart-Id']
+        other = APIClient(HTTP_X_CART_ID=token)
+        assert other.get('/api/orders/cart/list_cart/').data['item_count'] == 1
+
+    def test_merged_into_user_cart_on_sign_in(self, api_client, test_user, menu_item, second_item):
+        cart = Cart.objects.create(user=test_user)
+        CartItem.objects.create(cart=cart, menu_item=menu_item, quantity=1, price_at_add=menu_item.price)
+        api_client.post('/api/orders/cart/add_item/', {'menu_item_id': menu_item.pk, 'quantity': 2}, format='json')
+        api_client.post('/api/orders/cart/add_item/', {'menu_item_id': second_item.pk}, format='json')
+
+        api_client.force_authenticate(user=test_user)
+        data = api_client.get('/api/orders/cart/list_cart/').data
+        assert {item['menu_item']: item['quantity'] for item in data['items']} == {menu_item.pk: 3, second_item.pk: 1}
+        assert data['id'] == cart.id
+        assert api_client.cookies['cart_id'].value == ''
+
+        # Merging is one-off
+        data = api_client.get('/api/orders/cart/list_cart/').data
+        assert data['item_count'] == 4
+
+    def test_guest_checkout_and_payment_clear_cache_cart(self, api_client, menu_item):
+        from heddiekitchen.orders.cart_store import clear_cart_for_order
+
+        api_client.post('/api/orders/cart/add_item/', {'menu_item_id': menu_item.pk, 'quantity': 2}, format='json')
+        response = api_client.post('/api/orders/create_order/', {
+            'shipping_name': 'Guest',
+            'shipping_email': 'guest@example.com',
+            'shipping_phone': '08000000000',
+            'shipping_address': '1 Test Street',
+        }, format='json')
+        assert response.status_code == 201
+        order = Order.objects.get()
+        assert order.items.get().item_name == 'Egusi Soup'
+        assert order.subtotal == Decimal('9000.00')
+
+        clear_cart_for_order(order)
+        assert api_client.get('/api/orders/cart/list_cart/').data['items'] == []
+
+    def test_concurrent_adds_are_not_lost(self, menu_item, second_item):
+        token = secrets.token_hex(16)
+        threads, adds = 8, 10
+        errors = []
+        start = threading.Barrier(threads)
+        # Switch threads as often as possible so read-modify-write races show up
+        interval = sys.getswitchinterval()
+        sys.setswitchinterval(1e-6)
+
+        def hammer(own_item):
+            try:
+                start.wait()
+                for _ in range(adds):
+                    # A new store per add, like separate requests
+                    CacheCartStore(token).add(menu_item, 1)
+                    CacheCartStore(token).add(own_item, 1)
+            except Exception as e:  # surfaced below; a thread cannot fail the test directly
+                errors.append(e)
+
+        # Half the threads also add the second item, so both lines are created concurrently
+        workers = [
+            threading.Thread(target=hammer, args=(second_item if n % 2 else menu_item,)) for n in range(threads)
+        ]
+        try:
+            for worker in workers:
+                worker.start()
+            for worker in workers:
+                worker.join()
+        finally:
+            sys.setswitchinterval(interval)
+
+        assert errors == []
+        quantities = {line.menu_item_id: line.quantity for line in CacheCartStore(token).lines()}
+        assert quantities == {menu_item.pk: threads * adds * 3 // 2, second_item.pk: threads * adds // 2}
+
+
+class TestAtomicCartMutations:
+    """Test that cart writes are single-statement upserts."""
+
+    def test_add_update_remove_are_one_statement_each(self, api_client, test_user, menu_item,
+                                                     django_assert_num_queries):
+        cart = Cart.objects.create(user=test_user)
+        store = DatabaseCartStore(user=test_user)
+        assert store.cart == cart
+
+        with django_assert_num_queries(1):
+            line, created = store.add(menu_item, 2, 'No pepper')
+        assert created and (line.quantity, line.price_at_add) == (2, Decimal('4500.00'))
+        with django_assert_num_queries(1):
+            line, created = store.add(menu_item, 3)
+        assert not created and line.quantity == 5 and line.special_instructions == ''
+        with django_assert_num_queries(1):
+            assert store.set_quantity(line.id, 1).quantity == 1
+        with django_assert_num_queries(1):
+            assert store.set_quantity(line.id + 1, 1) is None
+        with django_assert_num_queries(1):
+            assert store.remove(line.id)
+
+    def test_quantities_below_one_are_rejected(self, api_client, test_user, menu_item):
+        api_client.force_authenticate(user=test_user)
+        line = api_client.post('/api/orders/cart/add_item/', {'menu_item_id': menu_item.pk, 'quantity': 2},
+                               format='json').data
+        for quantity in (0, -3, 'two', None):
+            response = api_client.post('/api/orders/cart/add_item/', {'menu_item_id': menu_item.pk, 'quantity': quantity},
+                                       format='json')
+            assert response.status_code == 400
+            response = api_client.put('/api/orders/cart/update_item/', {'cart_item_id': line['id'], 'quantity': quantity},
+                                      format='json')
+            assert response.status_code == 400
+        assert api_client.put('/api/orders/cart/update_item/', {'cart_item_id': line['id']}, format='json').status_code == 400
+        assert api_client.get('/api/orders/cart/summary/').data['item_count'] == 2
+
+        with pytest.raises(ValueError):
+            DatabaseCartStore(user=test_user).set_quantity(line['id'], 0)
+        with pytest.raises(ValueError):
+            CacheCartStore(secrets.token_hex(16)).set_quantity(menu_item.pk, -1)
+
+    @pytest.mark.django_db(transaction=True)
+    def test_concurrent_adds_are_not_lost(self, menu_item):
+        user = User.objects.create_user(username='hammer', password='testpass123')
+        Cart.objects.create(user=user)
+        threads, adds = 8, 10
+        errors = []
+
+        def add_one(store):
+            while True:
+                try:
+                    return store.add(menu_item, 1)
+                except OperationalError as e:
+                    # SQLite's shared in-memory test database locks whole tables; retry
+                    # those, while PostgreSQL runs the upserts truly concurrently
+                    if connection.vendor != 'sqlite' or 'locked' not in str(e):
+                        raise
+
+        def hammer():
+            try:
+                store = DatabaseCartStore(user=user)
+                for _ in range(adds):
+                    add_one(store)
+            except Exception as e:  # surfaced below; a thread cannot fail the test directly
+                errors.append(e)
+            finally:
+                connection.close()
+
+        workers = [threading.Thread(target=hammer) for _ in range(threads)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+
+        assert errors == []
+        assert CartItem.objects.get(cart__user=user).quantity == threads * adds
+
+    @pytest.mark.parametrize('store_class', [DatabaseCartStore, CacheCartStore])
+    def test_failed_merge_keeps_guest_cart(self, settings, monkeypatch, test_user, menu_item, store_class):
+        from heddiekitchen.orders.cart_store import anonymous_store, merge_anonymous_cart
+
+        settings.ANONYMOUS_CART_STORE = f'{store_class.__module__}.{store_class.__name__}'
+        token = secrets.token_hex(16)
+        anonymous_store(token).add(menu_item, 2, 'No pepper')
+
+        def fail(*args, **kwargs):
+            raise OperationalError('disk full')
+
+        monkeypatch.setattr(CartItem.objects, 'bulk_create', fail)
+        with pytest.raises(OperationalError):
+            merge_anonymous_cart(token, test_user)
+        lines = anonymous_store(token).lines()
+        assert [(line.quantity, line.special_instructions) for line in lines] == [(2, 'No pepper')]
+        assert not CartItem.objects.filter(cart__user=test_user).exists()
+
+        monkeypatch.undo()
+        assert merge_anonymous_cart(token, test_user) == 1
+        assert CartItem.objects.get(cart__user=test_user).quantity == 2
+        assert anonymous_store(token).lines() == []
+
+
+class TestCartBatch:
+    """Test POST /api/orders/cart/batch/."""
+
+    @pytest.fixture
+    def items(self, menu_item):
+        return [menu_item] + [
+            MenuItem.objects.create(name=name, price=Decimal('1000.00'), category=menu_item.category, image='menu_items/x.jpg')
+            for name in ['Jollof Rice', 'Dodo', 'Moi Moi']
+        ]
+
+    def test_operations_apply_in_order_with_constant_queries(self, api_client, test_user, items,
+                                                             django_assert_max_num_queries):
+        soup, rice, dodo, moimoi = items
+        cart = Cart.objects.create(user=test_user)
+        soup_line = CartItem.objects.create(cart=cart, menu_item=soup, quantity=1, price_at_add=soup.price)
+        rice_line = CartItem.objects.create(cart=cart, menu_item=rice, quantity=2, price_at_add=rice.price)
+        api_client.force_authenticate(user=test_user)
+
+        operations = [
+            {'op': 'add', 'menu_item_id': dodo.pk, 'quantity': 2},
+            {'op': 'update', 'cart_item_id': soup_line.pk, 'quantity': 5},
+            {'op': 'remove', 'cart_item_id': rice_line.pk},
+            {'op': 'add', 'menu_item_id': soup.pk, 'special_instructions': 'Extra hot'},
+            {'op': 'add', 'menu_item_id': moimoi.pk},
+        ]
+        with django_assert_max_num_queries(9):
+            response = api_client.post('/api/orders/cart/batch/', {'operations': operations}, format='json')
+        assert response.status_code == 200
+        assert {item['menu_item']: item['quantity'] for item in response.data['items']} == {
+            soup.pk: 6, dodo.pk: 2, moimoi.pk: 1
+        }
+        soup_line.refresh_from_db()
+        assert soup_line.special_instructions == 'Extra hot'
+        assert response.data['item_count'] == 9
+
+    def test_failed_operation_applies_nothing(self, api_client, test_user, items):
+        soup, rice, _, _ = items
+        rice.is_available = False
+        rice.save()
+        cart = Cart.objects.create(user=test_user)
+        line = CartItem.objects.create(cart=cart, menu_item=soup, quantity=1, price_at_add=soup.price)
+        api_client.force_authenticate(user=test_user)
+
+        response = api_client.post('/api/orders/cart/batch/', {'operations': [
+            {'op': 'remove', 'cart_item_id': line.pk},
+            {'op': 'add', 'menu_item_id': rice.pk},
+            {'op': 'update', 'cart_item_id': 999, 'quantity': 1},
+        ]}, format='json')
+        assert response.status_code == 400
+        assert [error['index'] for error in response.data['details']] == [1, 2]
+        assert CartItem.objects.filter(pk=line.pk).exists()
+
+        response = api_client.post('/api/orders/cart/batch/', {'operations': [{'op': 'update', 'cart_item_id': line.pk}]}, format='json')
+        assert response.status_code == 400 and 'quantity' in response.data['details']['operations'][0]
+
+    def test_batch_on_cache_cart(self, api_client, items, settings):
+        settings.ANONYMOUS_CART_STORE = 'heddiekitchen.orders.cart_store.CacheCartStore'
+        soup, rice, _, _ = items
+        api_client.post('/api/orders/cart/add_item/', {'menu_item_id': soup.pk}, format='json')
+
+        response = api_client.post('/api/orders/cart/batch/', {'operations': [
+            {'op': 'add', 'menu_item_id': rice.pk, 'quantity': 3},
+            {'op': 'remove', 'cart_item_id': soup.pk},
+        ]}, format='json')
+        assert response.status_code == 200
+        assert [(item['menu_item'], item['quantity']) for item in response.data['items']] == [(rice.pk, 3)]
+        assert not CartItem.objects.exists()
+
+
+class TestCartReadPath:
+    """Test the single-query cart read and the cached cart summary."""
+
+    @pytest.fixture
+    def cart(self, test_user, menu_item):
+        cart = Cart.objects.create(user=test_user)
+        CartItem.objects.create(cart=cart, menu_item=menu_item, quantity=2, price_at_add=menu_item.price)
+        return cart
+
+    def test_list_cart_is_one_query(self, api_client, test_user, cart, django_assert_num_queries):
+        api_client.force_authenticate(user=test_user)
+        with django_assert_num_queries(1):
+            data = api_client.get('/api/orders/cart/list_cart/', {'expand': 'items.menu_item'}).data
+        assert data['id'] == cart.pk
+        assert (data['total'], data['item_count']) == (Decimal('9000.00'), 2)
+        assert data['items'][0]['menu_item']['name'] == 'Egusi Soup'
+
+    def test_totals_are_one_aggregate(self, cart, django_assert_num_queries):
+        with django_assert_num_queries(1):
+            assert cart.get_totals() == (2, Decimal('9000.00'))
+
+    def test_summary_is_cached_until_the_cart_changes(self, api_client, test_user, cart, menu_item,
+                                                      django_assert_num_queries):
+        api_client.force_authenticate(user=test_user)
+        with django_assert_num_queries(1):
+            data = api_client.get('/api/orders/cart/summary/').data
+        assert data == {'item_count': 2, 'total': Decimal('9000.00')}
+        with django_assert_num_queries(0):
+            api_client.get('/api/orders/cart/summary/')
+
+        api_client.post('/api/orders/cart/add_item/', {'menu_item_id': menu_item.pk}, format='json')
+        assert api_client.get('/api/orders/cart/summary/').data['item_count'] == 3
+        api_client.post('/api/orders/cart/clear_cart/')
+        assert api_client.get('/api/orders/cart/summary/').data == {'item_count': 0, 'total': Decimal('0.00')}
+
+    def test_summary_of_cache_cart_reads_no_database(self, api_client, menu_item, settings, django_assert_num_queries):
+        settings.ANONYMOUS_CART_STORE = 'heddiekitchen.orders.cart_store.CacheCartStore'
+        api_client.post('/api/orders/cart/add_item/', {'menu_item_id': menu_item.pk, 'quantity': 3}, format='json')
+        with django_assert_num_queries(0):
+            data = api_client.get('/api/orders/cart/summary/').data
+        assert data == {'item_count': 3, 'total': Decimal('13500.00')}
+
+
+class TestCreateOrder:
+    """Test that checkout is one transaction with a constant number of queries."""
+
+    SHIPPING = {
+        'shipping_name': 'Test User',
+        'shipping_email': 'test@example.com',
+        'shipping_phone': '08000000000',
+        'shipping_address': '1 Test Street',
+        'shipping_city': 'Abuja',
+        'shipping_state': 'FCT',
+    }
+
+    def checkout_queries(self, api_client, user, menu_items, monkeypatch, django_capture_on_commit_callbacks):
+        sent = []
+        monkeypatch.setattr('heddiekitchen.orders.views.send_order_confirmation_async', sent.append)
+        cart, _ = Cart.objects.get_or_create(user=user)
+        for menu_item in menu_items:
+            CartItem.objects.create(cart=cart, menu_item=menu_item, quantity=2, price_at_add=menu_item.price)
+        api_client.force_authenticate(user=user)
+        # Measure checkout itself, not the one-off pricing table build
+        get_pricing_table()
+
+        with CaptureQueriesContext(connection) as queries, django_capture_on_commit_callbacks(execute=True):
+            response = api_client.post('/api/orders/create_order/', self.SHIPPING, format='json')
+        assert response.status_code == 201
+        order = Order.objects.get(pk=response.data['id'])
+        assert sent == [order]
+        assert [(item.item_name, item.subtotal) for item in order.items.order_by('id')] == [
+            (menu_item.name, menu_item.price * 2) for menu_item in menu_items
+        ]
+        return len(queries)
+
+    def test_query_count_does_not_grow_with_cart(self, api_client, test_user, menu_item, monkeypatch,
+                                                 django_capture_on_commit_callbacks):
+        small = self.checkout_queries(api_client, test_user, [menu_item], monkeypatch,
+                                      django_capture_on_commit_callbacks)
+
+        other_user = User.objects.create_user(username='other', password='testpass123')
+        items = [
+            MenuItem.objects.create(name=f'Dish {n}', price=Decimal('1000.00'), category=menu_item.category)
+            for n in range(5)
+        ]
+        large = self.checkout_queries(api_client, other_user, items, monkeypatch, django_capture_on_commit_callbacks)
+        assert large == small
+
+    def test_empty_cart_writes_nothing(self, api_client, test_user):
+        api_client.force_authenticate(user=test_user)
+        response = api_client.post('/api/orders/create_order/', self.SHIPPING, format='json')
+        assert response.status_code == 400
+        assert not Order.objects.exists()
+
+
+class TestPricing:
+    """Test delivery, tax and coupon rules and the checkout quote."""
+
+    SHIPPING = TestCreateOrder.SHIPPING
+
+    @pytest.fixture
+    def rules(self, db):
+        ShippingDestination.objects.create(name='Lagos', destination_type='domestic', shipping_fee=Decimal('2500.00'),
+                                           estimated_days=2)
+        ShippingDestination.objects.create(name='United Kingdom', destination_type='international',
+                                           shipping_fee=Decimal('0'), base_fee=Decimal('30000.00'), estimated_days=7)
+        TaxRule.objects.create(name='Lagos VAT', country='Nigeria', state='Lagos', rate=Decimal('0.0500'))
+        return Coupon.objects.create(code='welcome10', discount_type='percent', value=Decimal('10'),
+                                     max_discount=Decimal('1000.00'), usage_limit=1)
+
+    def test_defaults_match_previous_checkout_math(self, db):
+        totals = get_pricing_table().quote(Decimal('4500.00'), state='FCT')
+        assert (totals['shipping_fee'], totals['tax'], totals['total']) == (
+            Decimal('4000.00'), Decimal('337.50'), Decimal('8837.50')
+        )
+
+    def test_rules_are_matched_most_specific_first(self, rules):
+        table = get_pricing_table()
+        totals = table.quote(Decimal('20000.00'), city='Ikeja', state='lagos', coupon_code='WELCOME10')
+        assert totals['destination'] == 'Lagos' and totals['shipping_fee'] == Decimal('2500.00')
+        # 10% capped at 1000, then 5% Lagos tax on the discounted subtotal
+        assert (totals['discount'], totals['tax'], totals['total']) == (
+            Decimal('1000.00'), Decimal('950.00'), Decimal('22450.00')
+        )
+        assert table.quote(Decimal('20000.00'), country='United Kingdom')['shipping_fee'] == Decimal('30000.00')
+        assert table.quote(Decimal('500.00'), coupon_code='NOPE')['coupon_error'] == 'Coupon not found'
+
+        TaxRule.objects.create(name='Default', rate=Decimal('0.1000'))
+        assert get_pricing_table() is not table
+        assert get_pricing_table().quote(Decimal('1000.00'), state='Oyo')['tax'] == Decimal('100.00')
+
+    def test_table_expires_without_shared_cache(self, rules, settings):
+        settings.IN_PROCESS_TABLE_TTL = 60
+        table = get_pricing_table()
+        # A queryset update fires no signal, like an edit made in another worker
+        TaxRule.objects.update(rate=Decimal('0.1000'))
+        assert get_pricing_table() is table
+
+        settings.IN_PROCESS_TABLE_TTL = 0
+        assert get_pricing_table() is not table
+        assert get_pricing_table().tax_rate(state='Lagos') == (Decimal('0.1000'), False)
+
+    def test_redeem_checks_coupon_in_the_update(self, rules):
+        now = timezone.now()
+        Coupon.objects.update(is_active=False)
+        assert not redeem_coupon('WELCOME10')
+        Coupon.objects.update(is_active=True, valid_until=now - timedelta(minutes=1))
+        assert not redeem_coupon('WELCOME10')
+        Coupon.objects.update(valid_from=now + timedelta(minutes=1), valid_until=None)
+        assert not redeem_coupon('WELCOME10')
+        assert Coupon.objects.get().times_used == 0
+
+        Coupon.objects.update(valid_from=now - timedelta(minutes=1))
+        assert redeem_coupon('WELCOME10')
+        assert not redeem_coupon('WELCOME10')
+
+    def test_quote_endpoint_reads_only_caches(self, api_client, menu_item, rules, settings, django_assert_num_queries):
+        settings.ANONYMOUS_CART_STORE = 'heddiekitchen.orders.cart_store.CacheCartStore'
+        api_client.post('/api/orders/cart/add_item/', {'menu_item_id': menu_item.pk, 'quantity': 2}, format='json')
+        get_pricing_table()
+
+        with django_assert_num_queries(0):
+            response = api_client.get('/api/orders/quote/', {'shipping_state': 'Lagos', 'coupon_code': 'welcome10'})
+        # Money goes over the wire as JSON numbers, which is how OrderQuote is typed
+        data = json.loads(response.content)
+        assert (data['item_count'], data['subtotal'], data['discount'], data['total'], data['tax_rate']) == (
+            2, 9000, 900, 11005, 0.05
+        )
+
+    def test_checkout_charges_the_quote_and_redeems_coupon(self, api_client, test_user, menu_item, rules):
+        cart = Cart.objects.create(user=test_user)
+        CartItem.objects.create(cart=cart, menu_item=menu_item, quantity=2, price_at_add=menu_item.price)
+        api_client.force_authenticate(user=test_user)
+        params = {'shipping_state': 'Lagos', 'coupon_code': 'welcome10'}
+        quote = api_client.get('/api/orders/quote/', params).data
+
+        response = api_client.post('/api/orders/create_order/', {**self.SHIPPING, **params}, format='json')
+        assert response.status_code == 201
+        order = Order.objects.get(pk=response.data['id'])
+        assert (order.shipping_fee, order.tax, order.discount, order.total, order.coupon_code) == (
+            *(Decimal(str(quote[name])) for name in ('shipping_fee', 'tax', 'discount', 'total')), 'WELCOME10'
+        )
+        assert Coupon.objects.get().times_used == 1
+
+        response = api_client.post('/api/orders/create_order/', {**self.SHIPPING, **params}, format='json')
+        assert response.status_code == 400 and response.data['error'] == 'Coupon has been fully redeemed'
+        assert Order.objects.count() == 1
+
+
+class TestSweepCarts:
+    """Test the batched abandoned-cart sweeper."""
+
+    def test_stale_anonymous_carts_are_snapshotted_and_deleted(self, test_user, menu_item):
+        old = timezone.now() - timedelta(days=40)
+        stale_full = Cart.objects.create(session_id='a' * 32)
+        CartItem.objects.create(cart=stale_full, menu_item=menu_item, quantity=2, price_at_add=menu_item.price)
+        stale_empty = Cart.objects.create(session_id='b' * 32)
+        touched = Cart.objects.create(session_id='c' * 32)
+        CartItem.objects.create(cart=touched, menu_item=menu_item, quantity=1, price_at_add=menu_item.price)
+        user_cart = Cart.objects.create(user=test_user)
+        Cart.objects.update(updated_at=old)
+        CartItem.objects.filter(cart=stale_full).update(updated_at=old)
+        fresh = Cart.objects.create(session_id='d' * 32)
+
+        out = StringIO()
+        call_command('sweep_carts', '--older-than', '30', '--batch-size', '1', '--snapshot', stdout=out)
+        assert 'Swept 2 cart(s) and 1 line(s), snapshotted 1' in out.getvalue()
+
+        assert set(Cart.objects.values_list('pk', flat=True)) == {touched.pk, user_cart.pk, fresh.pk}
+        assert not Cart.objects.filter(pk=stale_empty.pk).exists()
+        snapshot = AbandonedCart.objects.get()
+        assert (snapshot.session_id, snapshot.item_count, snapshot.total) == ('a' * 32, 2, Decimal('9000.00'))
+        assert snapshot.items == [{'menu_item_id': menu_item.pk, 'name': 'Egusi Soup', 'quantity': 2, 'price': '4500.00'}]
+
+    def test_reading_an_empty_cart_creates_no_row(self, api_client, settings, db):
+        settings.ANONYMOUS_CART_STORE = 'heddiekitchen.orders.cart_store.DatabaseCartStore'
+        data = api_client.get('/api/orders/cart/list_cart/').data
+        assert (data['id'], data['items']) == (None, [])
+        assert not Cart.objects.exists()
+
+
+class TestOrderStatus:
+    """Test the order status state machine and its event timeline."""
+
+    def test_transitions_follow_the_graph(self, test_user):
+        order = make_order(test_user, status='payment_pending')
+        transition(order, 'processing', note='Payment confirmed')
+        transition(order, 'dispatched', location='Wuse 2, Abuja')
+        assert Order.objects.get(pk=order.pk).current_location == 'Wuse 2, Abuja'
+
+        with pytest.raises(InvalidTransition):
+            transition(order, 'paid')
+        stale = Order.objects.get(pk=order.pk)
+        transition(order, 'delivered')
+        # A copy validated against an old status cannot overwrite the newer one
+        stale.status = 'dispatched'
+        with pytest.raises(InvalidTransition):
+            transition(stale, 'delivered')
+        assert list(order.status_events.values_list('from_status', 'to_status')) == [
+            ('payment_pending', 'processing'), ('processing', 'dispatched'), ('dispatched', 'delivered')
+        ]
+
+    def test_bulk_transition_skips_disallowed_orders(self, test_user, django_assert_num_queries):
+        orders = [make_order(test_user, status='processing') for _ in range(3)]
+        delivered = make_order(test_user, status='delivered')
+
+        # Savepoint, locked read, UPDATE, bulk INSERT of events, release
+        with django_assert_num_queries(5):
+            moved, skipped = bulk_transition(Order.objects.all(), 'dispatched', actor=test_user)
+        assert (moved, skipped) == (3, 1)
+        assert set(Order.objects.values_list('status', flat=True)) == {'dispatched', 'delivered'}
+        assert OrderStatusEvent.objects.filter(to_status='dispatched', actor=test_user).count() == 3
+        assert not delivered.status_events.exists()
+        assert all(order.status_events.get().from_status == 'processing' for order in orders)
+
+    def test_tracking_renders_timeline(self, api_client, test_user, menu_item, django_assert_num_queries):
+        cart = Cart.objects.create(user=test_user)
+        CartItem.objects.create(cart=cart, menu_item=menu_item, quantity=1, price_at_add=menu_item.price)
+        api_client.force_authenticate(user=test_user)
+        response = api_client.post('/api/orders/create_order/', TestCreateOrder.SHIPPING, format='json')
+        order = Order.objects.get(pk=response.data['id'])
+        transition(order, 'processing')
+        transition(order, 'dispatched', location='Garki, Abuja')
+
+        with django_assert_num_queries(2):
+            data = api_client.get(f'/api/orders/{order.pk}/tracking/').data
+        assert data['current_location'] == 'Garki, Abuja'
+        assert [(event['status'], event['location']) for event in data['timeline']] == [
+            ('payment_pending', ''), ('processing', ''), ('dispatched', 'Garki, Abuja')
+        ]
@@ -1,49 +1,107 @@
 """
 Views for orders app.
 """
+import threading
+
 from rest_framework import viewsets, permissions, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from django.shortcuts import get_object_or_404
-from heddiekitchen.orders.models import Cart, CartItem, Order, OrderItem
+from django.db import transaction
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+from django.http import Http404
+from heddiekitchen.core.idempotency import idempotent
+from heddiekitchen.orders.cart_store import CartBatchError, get_cart_store, remember_cart_for_order, set_cart_token
+from heddiekitchen.orders import pricing
+from heddiekitchen.orders.models import Order, OrderItem
 from heddiekitchen.menu.models import MenuItem
+from heddiekitchen.menu import pairings
+from heddiekitchen.menu.serializers import MenuItemListSerializer
+from heddiekitchen.orders.status import record_placed, timeline
+from heddiekitchen.orders.stock import InsufficientStock, reserve_stock
+from heddiekitchen.pagination import CreatedAtCursorPagination
+from heddiekitchen.serializers import is_expanded
 from heddiekitchen.orders.serializers import (
-    CartSerializer, CartItemSerializer, OrderDetailSerializer,
-    OrderListSerializer, CreateOrderSerializer
+    CartBatchSerializer, CartSerializer, CartItemSerializer, OrderDetailSerializer,
+    OrderListSerializer, CreateOrderSerializer, QuoteSerializer
 )
-import uuid
-from decimal import Decimal
+
+QUOTE_MONEY_FIELDS = ('subtotal', 'shipping_fee', 'tax', 'tax_rate', 'discount', 'total')
+
+
+def send_order_confirmation_async(order):
+    """Render and send the order confirmation in a background thread, so it never blocks the response."""
+    from heddiekitchen.core.email_utils import send_order_confirmation_email
+
+    def send_email():
+        try:
+            send_order_confirmation_email(order)
+        except Exception as e:
+            print(f"Error sending order confirmation email: {e}")
+
+    try:
+        thread = threading.Thread(target=send_email)
+        thread.daemon = True
+        thread.start()
+    except Exception as e:
+        # Log error but don't fail the order creation
+        print(f"Error setting up order email thread: {e}")
 
 
 class CartViewSet(viewsets.ViewSet):
-    """ViewSet for cart operations."""
+    """
+    ViewSet for cart operations. Carts live in the store picked by
+    get_cart_store(): Cart rows for signed-in users, the anonymous cart store
+    (the cache by default) for everyone else.
+    """
     permission_classes = [permissions.AllowAny]
 
-    def _get_or_create_cart(self, request):
-        """Get or create cart for user or session."""
-        if request.user.is_authenticated:
-            cart, _ = Cart.objects.get_or_create(user=request.user)
-        else:
-            session_id = request.session.get('cart_session_id')
-            if not session_id:
-                session_id = str(uuid.uuid4())
-                request.session['cart_session_id'] = session_id
-            cart, _ = Cart.objects.get_or_create(session_id=session_id)
-        return cart
+    def _get_store(self, request):
+        if not hasattr(request, 'cart_store'):
+            request.cart_store = get_cart_store(request)
+        return request.cart_store
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        if hasattr(request, 'cart_store'):
+            set_cart_token(request, response)
+        return response
+
+    def _line_id(self, request):
+        try:
+            return int(request.data.get('cart_item_id'))
+        except (TypeError, ValueError):
+            return None
+
+    def _quantity(self, request, default=None):
+        """The requested quantity, or None unless it is a whole number of at least 1."""
+        try:
+            quantity = int(request.data.get('quantity', default))
+        except (TypeError, ValueError):
+            return None
+        return quantity if quantity >= 1 else None
 
     @action(detail=False, methods=['get'])
     def list_cart(self, request):
-        """Get current cart."""
-        cart = self._get_or_create_cart(request)
+        """Get current cart. Pass ?expand=items.menu_item to embed the menu items."""
+        cart = self._get_store(request).get_cart(expand_menu_items=is_expanded(request, 'items.menu_item'))
         serializer = CartSerializer(cart, context={'request': request})
         return Response(serializer.data)
 
+    @action(detail=False, methods=['get'])
+    def summary(self, request):
+        """Item count and total only, for the cart badge. Served from the cache between cart changes."""
+        return Response(self._get_store(request).summary())
+
     @action(detail=False, methods=['post'])
     def add_item(self, request):
         """Add item to cart."""
-        cart = self._get_or_create_cart(request)
+        store = self._get_store(request)
         menu_item_id = request.data.get('menu_item_id')
-        quantity = int(request.data.get('quantity', 1))
+        quantity = self._quantity(request, default=1)
+        if quantity is None:
+            return Response({'error': 'Quantity must be a whole number of at least 1'},
+                            status=status.HTTP_400_BAD_REQUEST)
         special_instructions = request.data.get('special_instructions', '')
 
         try:
@@ -51,30 +109,31 @@ class CartViewSet(viewsets.ViewSet):
         except MenuItem.DoesNotExist:
             return Response({'error': 'Menu item not found'}, status=status.HTTP_404_NOT_FOUND)
 
-        cart_item, created = CartItem.objects.get_or_create(
-            cart=cart,
-            menu_item=menu_item,
-            defaults={'quantity': quantity, 'price_at_add': menu_item.price, 'special_instructions': special_instructions}
-        )
-
-        if not created:
-            cart_item.quantity += quantity
-            cart_item.special_instructions = special_instructions
-            cart_item.save()
+        if not menu_item.is_available:
+            return Response({'error': 'Menu item is not available'}, status=status.HTTP_400_BAD_REQUEST)
+        if menu_item.track_stock:
+            if store.quantity_of(menu_item.pk) + quantity > menu_item.stock_quantity:
+                return Response(
+                    {'error': 'Not enough stock', 'available': menu_item.stock_quantity},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
 
+        cart_item, created = store.add(menu_item, quantity, special_instructions)
         serializer = CartItemSerializer(cart_item, context={'request': request})
         return Response(serializer.data, status=status.HTTP_201_CREATED if created else status.HTTP_200_OK)
 
     @action(detail=False, methods=['put'])
     def update_item(self, request):
         """Update cart item quantity."""
-        cart = self._get_or_create_cart(request)
-        cart_item_id = request.data.get('cart_item_id')
-        quantity = int(request.data.get('quantity', 1))
+        store = self._get_store(request)
+        quantity = self._quantity(request)
+        if quantity is None:
+            return Response({'error': 'Quantity must be a whole number of at least 1'},
+                            status=status.HTTP_400_BAD_REQUEST)
 
-        cart_item = get_object_or_404(CartItem, id=cart_item_id, cart=cart)
-        cart_item.quantity = quantity
-        cart_item.save()
+        cart_item = store.set_quantity(self._line_id(request), quantity)
+        if cart_item is None:
+            raise Http404('Cart item not found')
 
         serializer = CartItemSerializer(cart_item, context={'request': request})
         return Response(serializer.data)
@@ -82,17 +141,55 @@ class CartViewSet(viewsets.ViewSet):
     @action(detail=False, methods=['delete'])
     def remove_item(self, request):
         """Remove item from cart."""
-        cart = self._get_or_create_cart(request)
-        cart_item_id = request.data.get('cart_item_id')
-        cart_item = get_object_or_404(CartItem, id=cart_item_id, cart=cart)
-        cart_item.delete()
+        if not self._get_store(request).remove(self._line_id(request)):
+            raise Http404('Cart item not found')
         return Response(status=status.HTTP_204_NO_CONTENT)
 
+    @action(detail=False, methods=['post'])
+    def batch(self, request):
+        """
+        Apply several operations in one transaction and return the cart.
+        POST /api/orders/cart/batch/ {"operations": [
+            {"op": "add", "menu_item_id": 3, "quantity": 2},
+            {"op": "update", "cart_item_id": 7, "quantity": 1},
+            {"op": "remove", "cart_item_id": 9}
+        ]}
+        Nothing is applied if any operation fails.
+        """
+        serializer = CartBatchSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(
+                {'error': 'Validation failed', 'details': serializer.errors},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        store = self._get_store(request)
+        try:
+            store.apply_batch(serializer.validated_data['operations'])
+        except CartBatchError as e:
+            return Response(
+                {'error': 'Some operations could not be applied', 'details': e.errors},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        cart = store.get_cart(expand_menu_items=is_expanded(request, 'items.menu_item'))
+        return Response(CartSerializer(cart, context={'request': request}).data)
+
+    @action(detail=False, methods=['get'])
+    def complete_meal(self, request):
+        """Suggest items that are frequently bought with what is in the cart."""
+        lines = self._get_store(request).lines()
+        suggestions = pairings.complete_meal([line.menu_item_id for line in lines], limit=6)
+        items = MenuItemListSerializer(
+            [item for item, _ in suggestions], many=True, context={'request': request}
+        ).data
+        for item, (_, score) in zip(items, suggestions):
+            item['score'] = round(score, 4)
+        return Response(items)
+
     @action(detail=False, methods=['post'])
     def clear_cart(self, request):
         """Clear entire cart."""
-        cart = self._get_or_create_cart(request)
-        cart.items.all().delete()
+        self._get_store(request).clear()
         return Response({'message': 'Cart cleared'}, status=status.HTTP_200_OK)
 
 
@@ -100,12 +197,28 @@ class OrderViewSet(viewsets.ModelViewSet):
     """ViewSet for orders."""
     serializer_class = OrderDetailSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = CreatedAtCursorPagination
+    ordering_fields = ['created_at']
+    ordering = ['-created_at', '-id']
 
     def get_queryset(self):
         """Users can only see their own orders."""
         if self.request.user.is_staff:
-            return Order.objects.all()
-        return Order.objects.filter(user=self.request.user)
+            queryset = Order.objects.all()
+        else:
+            queryset = Order.objects.filter(user=self.request.user)
+        if self.action == 'list':
+            # Correlated subquery rather than a JOIN + GROUP BY, so the
+            # (-created_at, -id) index still drives the page scan
+            items_total = OrderItem.objects.filter(order=OuterRef('pk')).order_by().values('order').annotate(
+                total=Count('id')
+            ).values('total')
+            queryset = queryset.annotate(
+                items_total=Coalesce(Subquery(items_total, output_field=IntegerField()), Value(0))
+            )
+        elif self.action == 'retrieve' and is_expanded(self.request, 'items'):
+            queryset = queryset.prefetch_related('items')
+        return queryset
 
     def get_serializer_class(self):
         """Use list serializer for list action."""
@@ -113,9 +226,35 @@ class OrderViewSet(viewsets.ModelViewSet):
             return OrderListSerializer
         return OrderDetailSerializer
 
+    @action(detail=False, methods=['get'], permission_classes=[permissions.AllowAny])
+    def quote(self, request):
+        """
+        Exact totals the current cart would be charged, without writing an order.
+        GET /api/orders/quote/?shipping_state=Lagos&shipping_city=Ikeja&coupon_code=WELCOME10
+        Answered from the cached cart summary and the in-memory pricing table.
+        """
+        serializer = QuoteSerializer(data=request.query_params)
+        if not serializer.is_valid():
+            return Response(
+                {'error': 'Validation failed', 'details': serializer.errors},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        data = serializer.validated_data
+        summary = get_cart_store(request).summary()
+        totals = pricing.quote(
+            summary['total'], data['shipping_city'], data['shipping_state'], data['shipping_country'],
+            data['coupon_code'],
+        )
+        # Plain numbers, not the strings DecimalField gives Order, so the client can add them up
+        money = {name: float(totals[name]) for name in QUOTE_MONEY_FIELDS}
+        response = Response({**totals, **money, 'item_count': summary['item_count']})
+        set_cart_token(request, response)
+        return response
+
     @action(detail=False, methods=['post'], permission_classes=[permissions.AllowAny])
+    @idempotent('orders.create_order')
     def create_order(self, request):
-        """Create order from cart."""
+        """Create order from cart. Send an Idempotency-Key header to make retries safe."""
         serializer = CreateOrderSerializer(data=request.data)
         if not serializer.is_valid():
             # Return detailed validation errors
@@ -124,92 +263,98 @@ class OrderViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        # Get or create cart
-        if request.user.is_authenticated:
-            cart = get_object_or_404(Cart, user=request.user)
-        else:
-            session_id = request.session.get('cart_session_id')
-            cart = get_object_or_404(Cart, session_id=session_id)
-
-        cart_items = cart.items.all()
-        if not cart_items.exists():
-            return Response({'error': 'Cart is empty'}, status=status.HTTP_400_BAD_REQUEST)
-
-        # Calculate totals
-        subtotal = sum(item.get_subtotal() for item in cart_items)
-        # Default delivery fee (can be customized based on location)
-        shipping_fee = Decimal('4000.00')  # Default delivery fee
-        tax = subtotal * Decimal('0.075')  # 7.5% tax
-        total = subtotal + shipping_fee + tax
-
-        # Create order
-        order = Order.objects.create(
-            user=request.user if request.user.is_authenticated else None,
-            guest_email=serializer.validated_data.get('shipping_email'),
-            order_type='single',
-            status='payment_pending',
-            subtotal=subtotal,
-            shipping_fee=shipping_fee,
-            tax=tax,
-            total=total,
-            shipping_name=serializer.validated_data['shipping_name'],
-            shipping_email=serializer.validated_data['shipping_email'],
-            shipping_phone=serializer.validated_data['shipping_phone'],
-            shipping_address=serializer.validated_data['shipping_address'],
-            shipping_city=serializer.validated_data['shipping_city'],
-            shipping_state=serializer.validated_data['shipping_state'],
-            shipping_country=serializer.validated_data.get('shipping_country', 'Nigeria'),
-            shipping_zip=serializer.validated_data.get('shipping_zip', ''),
-            delivery_date=serializer.validated_data.get('delivery_date'),
-            special_instructions=serializer.validated_data.get('special_instructions', ''),
-            payment_method=serializer.validated_data.get('payment_method', 'paystack'),
-        )
+        # Signing in merges any anonymous cart the client still carries
+        store = get_cart_store(request)
+
+        # Read the cart once, then create the order, its items and the stock
+        # hold together: if any tracked item is short, nothing is written
+        try:
+            with transaction.atomic():
+                cart_items = store.lines(with_menu_items=True)
+                if not cart_items:
+                    return Response({'error': 'Cart is empty'}, status=status.HTTP_400_BAD_REQUEST)
+
+                data = serializer.validated_data
+                totals = pricing.quote(
+                    sum(item.get_subtotal() for item in cart_items),
+                    data['shipping_city'], data['shipping_state'], data.get('shipping_country', 'Nigeria'),
+                    data['coupon_code'],
+                )
+                if totals['coupon_error']:
+                    return Response({'error': totals['coupon_error']}, status=status.HTTP_400_BAD_REQUEST)
+                if totals['coupon_code'] and not pricing.redeem_coupon(totals['coupon_code']):
+                    return Response({'error': 'Coupon has been fully redeemed'}, status=status.HTTP_400_BAD_REQUEST)
+
+                order = Order.objects.create(
+                    user=request.user if request.user.is_authenticated else None,
+                    guest_email=serializer.validated_data.get('shipping_email'),
+                    order_type='single',
+                    status='payment_pending',
+                    subtotal=totals['subtotal'],
+                    shipping_fee=totals['shipping_fee'],
+                    tax=totals['tax'],
+                    discount=totals['discount'],
+                    coupon_code=totals['coupon_code'],
+                    total=totals['total'],
+                    shipping_name=serializer.validated_data['shipping_name'],
+                    shipping_email=serializer.validated_data['shipping_email'],
+                    shipping_phone=serializer.validated_data['shipping_phone'],
+                    shipping_address=serializer.validated_data['shipping_address'],
+                    shipping_city=serializer.validated_data['shipping_city'],
+                    shipping_state=serializer.validated_data['shipping_state'],
+                    shipping_country=serializer.validated_data.get('shipping_country', 'Nigeria'),
+                    shipping_zip=serializer.validated_data.get('shipping_zip', ''),
+                    delivery_date=serializer.validated_data.get('delivery_date'),
+                    special_instructions=serializer.validated_data.get('special_instructions', ''),
+                    payment_method=serializer.validated_data.get('payment_method', 'paystack'),
+                )
+
+                record_placed(order, actor=order.user)
 
-        # Create order items
-        for cart_item in cart_items:
-            OrderItem.objects.create(
-                order=order,
-                menu_item=cart_item.menu_item,
-                item_name=cart_item.menu_item.name,
-                quantity=cart_item.quantity,
-                unit_price=cart_item.price_at_add,
-                special_instructions=cart_item.special_instructions,
+                # bulk_create skips OrderItem.save(), so name and subtotal are filled in here
+                OrderItem.objects.bulk_create([
+                    OrderItem(
+                        order=order,
+                        menu_item=cart_item.menu_item,
+                        item_name=cart_item.menu_item.name,
+                        quantity=cart_item.quantity,
+                        unit_price=cart_item.price_at_add,
+                        subtotal=cart_item.get_subtotal(),
+                        special_instructions=cart_item.special_instructions,
+                    )
+                    for cart_item in cart_items
+                ])
+
+                reserve_stock(order, ((cart_item.menu_item_id, cart_item.quantity) for cart_item in cart_items))
+
+                # Send the confirmation only once the order is committed
+                transaction.on_commit(lambda: send_order_confirmation_async(order))
+        except InsufficientStock as e:
+            return Response(
+                {'error': 'Some items are out of stock', 'menu_item_ids': e.menu_item_ids},
+                status=status.HTTP_409_CONFLICT
             )
 
         # DON'T clear cart here - only clear after payment is successful
         # Cart will be cleared when payment webhook confirms payment
         # This allows users to retry if they cancel Paystack checkout
-
-        # Send order confirmation email asynchronously (don't block the response)
-        try:
-            import threading
-            from heddiekitchen.core.email_utils import send_order_confirmation_email
-            
-            def send_email_async():
-                try:
-                    send_order_confirmation_email(order)
-                except Exception as e:
-                    print(f"Error sending order confirmation email: {e}")
-            
-            # Send email in background thread
-            thread = threading.Thread(target=send_email_async)
-            thread.daemon = True
-            thread.start()
-        except Exception as e:
-            # Log error but don't fail the order creation
-            print(f"Error setting up order email thread: {e}")
+        if request.cart_token:
+            remember_cart_for_order(order, request.cart_token)
 
         response_serializer = OrderDetailSerializer(order, context={'request': request})
-        return Response(response_serializer.data, status=status.HTTP_201_CREATED)
+        response = Response(response_serializer.data, status=status.HTTP_201_CREATED)
+        set_cart_token(request, response)
+        return response
 
     @action(detail=True, methods=['get'])
     def tracking(self, request, pk=None):
-        """Get order tracking info."""
+        """Get order tracking info, with the status timeline oldest first."""
         order = self.get_object()
         return Response({
             'order_number': order.order_number,
             'status': order.status,
             'tracking_number': order.tracking_number,
             'delivery_date': order.delivery_date,
-            'current_location': order.notes,
+            'current_location': order.current_location,
+            'timeline': timeline(order),
         })
@@ -0,0 +1,21 @@
+# Generated by Django 4.2.11 on 2026-10-17 17:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(fields=['-created_at', '-id'], name='payments_pa_created_ceadf1_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='paystackwebhook',
+            index=models.Index(fields=['-created_at', '-id'], name='payments_pa_created_8d55eb_idx'),
+        ),
+    ]
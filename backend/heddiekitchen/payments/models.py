@@ -23,6 +23,9 @@ class Payment(models.Model):
 
     class Meta:
         db_table = 'payments_payment'
+        indexes = [
+            models.Index(fields=['-created_at', '-id']),
+        ]
 
     def save(self, *args, **kwargs):
         """Generate reference if not provided."""
@@ -45,6 +48,9 @@ class PaystackWebhook(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['-created_at', '-id']),
+        ]
 
     def __str__(self):
         return f"{self.event} - {self.reference}"
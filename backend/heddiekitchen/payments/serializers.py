@@ -8,8 +8,8 @@ class PaymentSerializer(serializers.ModelSerializer):
     class Meta:
         model = Payment
         fields = ['id', 'order', 'order_number', 'amount', 'currency', 'gateway',
-                  'reference', 'status', 'gateway_response', 'created_at', 'updated_at']
-        read_only_fields = ['created_at', 'updated_at', 'gateway_response']
+                  'reference', 'status', 'gateway_response', 'created_at', 'completed_at']
+        read_only_fields = ['created_at', 'completed_at', 'gateway_response']
 
 
 class PaymentInitializeSerializer(serializers.Serializer):
@@ -1,11 +1,14 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import PaymentViewSet, PaystackWebhookView
+from .views import PaymentViewSet, PaystackWebhookView, PaystackWebhookViewSet
 
 router = DefaultRouter()
+# Register named prefixes before the empty prefix so its {pk} route cannot shadow them
+router.register(r'webhooks', PaystackWebhookViewSet, basename='paystack-webhook-log')
 router.register(r'', PaymentViewSet, basename='payment')
 
 urlpatterns = [
-	path('', include(router.urls)),
+	# Must come before the router: PaymentViewSet's detail route would otherwise match 'webhook/'
 	path('webhook/', PaystackWebhookView.as_view(), name='paystack-webhook'),
+	path('', include(router.urls)),
 ]
\ No newline at end of file
@@ -3,6 +3,7 @@ import hashlib
 import hmac
 from django.conf import settings
 from django.views.decorators.csrf import csrf_exempt
+from django.utils import timezone
 from django.utils.decorators import method_decorator
 from rest_framework import viewsets, permissions, status
 from rest_framework.decorators import action
@@ -11,8 +12,13 @@ from rest_framework.views import APIView
 import requests
 # Removed TransactionResource import - using requests directly for better reliability
 from .models import Payment, PaystackWebhook
-from .serializers import PaymentSerializer, PaymentInitializeSerializer
+from .serializers import PaymentSerializer, PaymentInitializeSerializer, PaystackWebhookSerializer
+from heddiekitchen.core.idempotency import idempotent
+from heddiekitchen.orders.cart_store import clear_cart_for_order
 from heddiekitchen.orders.models import Order
+from heddiekitchen.orders.status import can_transition, transition
+from heddiekitchen.orders.stock import convert_reservations
+from heddiekitchen.pagination import CreatedAtCursorPagination
 
 
 class PaymentViewSet(viewsets.ReadOnlyModelViewSet):
@@ -23,6 +29,9 @@ class PaymentViewSet(viewsets.ReadOnlyModelViewSet):
     """
     serializer_class = PaymentSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = CreatedAtCursorPagination
+    ordering_fields = ['created_at']
+    ordering = ['-created_at', '-id']
     
     def get_queryset(self):
         """Users see only their own payments; admin sees all."""
@@ -32,6 +41,7 @@ class PaymentViewSet(viewsets.ReadOnlyModelViewSet):
         return Payment.objects.filter(order__user=user).select_related('order')
     
     @action(detail=False, methods=['post'], permission_classes=[permissions.AllowAny])
+    @idempotent('payments.initialize')
     def initialize(self, request):
         """
         Initialize a Paystack payment.
@@ -40,6 +50,8 @@ class PaymentViewSet(viewsets.ReadOnlyModelViewSet):
             "order_id": 1,
             "email": "user@example.com"
         }
+        With an Idempotency-Key header a retry replays the first response
+        instead of calling Paystack again.
         """
         serializer = PaymentInitializeSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
@@ -131,6 +143,21 @@ class PaymentViewSet(viewsets.ReadOnlyModelViewSet):
             )
 
 
+class PaystackWebhookViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    Staff-only log of received Paystack webhooks.
+    - GET /api/payments/webhooks/ - Webhook log (newest first)
+    - GET /api/payments/webhooks/{id}/ - Webhook detail
+    """
+    queryset = PaystackWebhook.objects.all()
+    serializer_class = PaystackWebhookSerializer
+    permission_classes = [permissions.IsAdminUser]
+    pagination_class = CreatedAtCursorPagination
+    filterset_fields = ['event', 'processed', 'reference']
+    ordering_fields = ['created_at']
+    ordering = ['-created_at', '-id']
+
+
 @method_decorator(csrf_exempt, name='dispatch')
 class PaystackWebhookView(APIView):
     """
@@ -196,24 +223,20 @@ class PaystackWebhookView(APIView):
             payment.status = 'completed'
             payment.save()
             
-            # Update order status
+            # Update order status; a repeated webhook finds it already moved
             order = payment.order
             order.payment_status = 'paid'
-            order.status = 'processing'
-            order.save()
+            if not order.paid_at:
+                order.paid_at = timezone.now()
+            order.save(update_fields=['payment_status', 'paid_at', 'updated_at'])
+            if can_transition(order.status, 'processing'):
+                transition(order, 'processing', note='Payment confirmed')
+
+            # The held stock is now sold
+            convert_reservations(order)
             
             # Clear cart only after payment is successful
-            if order.user:
-                from heddiekitchen.orders.models import Cart
-                try:
-                    cart = Cart.objects.get(user=order.user)
-                    cart.items.all().delete()
-                except Cart.DoesNotExist:
-                    pass
-            else:
-                # For guest users, clear by session (if we track it)
-                # This is handled by the frontend clearing the session cart
-                pass
+            clear_cart_for_order(order)
         except Payment.DoesNotExist:
             pass
     
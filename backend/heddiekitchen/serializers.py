@@ -0,0 +1,71 @@
+"""
+Shared serializer helpers for HEDDIEKITCHEN.
+"""
+
+
+def _param_set(request, name):
+    if request is None:
+        return set()
+    return {value.strip() for value in request.query_params.get(name, '').split(',') if value.strip()}
+
+
+def _relative(values, path):
+    """Entries of ``values`` below ``path``, with the path prefix removed."""
+    if not path:
+        return list(values)
+    prefix = path + '.'
+    return [value[len(prefix):] for value in values if value.startswith(prefix)]
+
+
+def is_expanded(request, path):
+    """True if ``?expand=`` asks for the nested relation at dotted ``path``."""
+    return path in _param_set(request, 'expand')
+
+
+def wants_field(request, name):
+    """True unless a top-level ``?fields=`` list leaves ``name`` out."""
+    fields = {value.split('.')[0] for value in _param_set(request, 'fields')}
+    return not fields or name in fields or is_expanded(request, name)
+
+
+class DynamicFieldsMixin:
+    """
+    Sparse fieldsets and opt-in expansion driven by the request.
+
+    ``?fields=id,name,items.quantity`` keeps only the listed fields. Dotted
+    names reach into nested serializers. ``?expand=reviews,items.menu_item``
+    swaps in the nested serializers declared in ``Meta.expandable_fields``:
+
+        expandable_fields = {'reviews': (MenuItemReviewSerializer, {'many': True, 'read_only': True})}
+
+    Unexpanded, such a field falls back to whatever ModelSerializer would
+    build from ``Meta.fields`` (usually a primary key), or is omitted when it
+    is not listed there. Expanded fields are always included.
+    """
+
+    def _field_path(self):
+        names = []
+        node = self
+        while node.parent is not None:
+            if node.field_name:
+                names.append(node.field_name)
+            node = node.parent
+        return '.'.join(reversed(names))
+
+    def get_fields(self):
+        fields = super().get_fields()
+        request = self.context.get('request')
+        path = self._field_path()
+
+        expand = {value.split('.')[0] for value in _relative(_param_set(request, 'expand'), path)}
+        for name, (field_class, kwargs) in getattr(self.Meta, 'expandable_fields', {}).items():
+            if name in expand:
+                fields[name] = field_class(**kwargs)
+
+        requested = _relative(_param_set(request, 'fields'), path)
+        if requested:
+            allowed = {value.split('.')[0] for value in requested} | expand
+            for name in list(fields):
+                if name not in allowed:
+                    fields.pop(name)
+        return fields
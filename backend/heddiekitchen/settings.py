@@ -4,6 +4,7 @@ Django settings for HEDDIEKITCHEN e-commerce platform.
 
 import os
 from pathlib import Path
+from corsheaders.defaults import default_headers
 from dotenv import load_dotenv
 
 # Optional Sentry import (only if package is installed)
@@ -36,6 +37,10 @@ CORS_ALLOWED_ORIGINS = os.getenv(
     'CORS_ALLOWED_ORIGINS',
     'http://localhost:3000,http://localhost:5173,https://heddiekitchen.com,https://www.heddiekitchen.com'
 ).split(',')
+# Anonymous carts are identified by this header when cookies are not sent (see orders/cart_store.py);
+# checkout and payment accept Idempotency-Key (see core/idempotency.py)
+CORS_ALLOW_HEADERS = (*default_headers, 'x-cart-id', 'idempotency-key')
+CORS_EXPOSE_HEADERS = ['X-Cart-Id', 'Idempotent-Replayed']
 # CSRF_TRUSTED_ORIGINS must include all domains that can POST to Django (admin, forms, etc.)
 # This is critical for Django admin login and any form submissions
 CSRF_TRUSTED_ORIGINS = os.getenv(
@@ -262,7 +267,8 @@ REST_FRAMEWORK = {
     ],
     'DEFAULT_THROTTLE_RATES': {
         'anon': '100/hour',
-        'user': '1000/hour'
+        'user': '1000/hour',
+        'autocomplete': '120/minute'
     }
 }
 
@@ -324,6 +330,23 @@ else:
 # Django Ratelimit configuration – disable when no shared cache available
 RATELIMIT_ENABLE = USE_REDIS_CACHE
 
+# Anonymous carts live in the cache when it is shared between workers;
+# LocMem is per process, so fall back to Cart rows without Redis
+ANONYMOUS_CART_STORE = os.getenv('ANONYMOUS_CART_STORE', (
+    'heddiekitchen.orders.cart_store.CacheCartStore' if USE_REDIS_CACHE
+    else 'heddiekitchen.orders.cart_store.DatabaseCartStore'
+))
+
+# Catalogue list pages, their ETags and the facet category list are cached per
+# catalogue version. Bumps only reach other workers and management commands
+# through a shared cache, so without Redis they are served uncached
+CATALOG_CACHE_ENABLED = os.getenv('CATALOG_CACHE_ENABLED', str(USE_REDIS_CACHE)).strip().lower() == 'true'
+
+# In-process tables (pricing rules, the autocomplete index) are rebuilt when
+# their version counter moves. Without a shared cache other workers never see
+# the bump, so they are also rebuilt after this many seconds
+IN_PROCESS_TABLE_TTL = None if USE_REDIS_CACHE else int(os.getenv('IN_PROCESS_TABLE_TTL', 30))
+
 # Celery Configuration
 CELERY_BROKER_URL = REDIS_URL
 CELERY_RESULT_BACKEND = REDIS_URL
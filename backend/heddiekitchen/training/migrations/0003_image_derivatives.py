@@ -0,0 +1,18 @@
+# Generated by Django 4.2.11 on 2026-10-17 18:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('training', '0002_trainingenquiry'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='trainingpackage',
+            name='image_derivatives',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+    ]
@@ -68,6 +68,7 @@ class TrainingPackage(models.Model):
     is_active = models.BooleanField(default=True)
     display_order = models.IntegerField(default=0, help_text="Order for display (lower numbers first)")
     image = models.ImageField(upload_to='training/', null=True, blank=True)
+    image_derivatives = models.JSONField(default=dict, blank=True, editable=False)
     
     # Timestamps
     created_at = models.DateTimeField(auto_now_add=True)
@@ -2,12 +2,15 @@
 Serializers for training app.
 """
 from rest_framework import serializers
+from heddiekitchen.core.images import build_srcset
+from heddiekitchen.core.media import media_url
 from .models import TrainingPackage, TrainingEnquiry
 
 
 class TrainingPackageSerializer(serializers.ModelSerializer):
     """Serializer for training packages."""
     image_url = serializers.SerializerMethodField()
+    image_srcset = serializers.SerializerMethodField()
     package_type_display = serializers.CharField(source='get_package_type_display', read_only=True)
     features = serializers.SerializerMethodField()
     theory_topics = serializers.SerializerMethodField()
@@ -21,10 +24,10 @@ class TrainingPackageSerializer(serializers.ModelSerializer):
             'includes_baking', 'includes_local_dishes', 'includes_intercontinental',
             'includes_advanced_cooking', 'includes_upscale_dining', 'includes_event_catering',
             'includes_management', 'includes_general_kitchen_mgmt', 'includes_popular_african_menu',
-            'includes_certification', 'is_active', 'display_order', 'image', 'image_url',
+            'includes_certification', 'is_active', 'display_order', 'image', 'image_url', 'image_srcset',
             'created_at', 'updated_at'
         ]
-        read_only_fields = ['id', 'created_at', 'updated_at', 'image_url', 'features', 'theory_topics']
+        read_only_fields = ['id', 'created_at', 'updated_at', 'image_url', 'image_srcset', 'features', 'theory_topics']
     
     def get_features(self, obj):
         """Normalize features to always return an array."""
@@ -70,13 +73,11 @@ class TrainingPackageSerializer(serializers.ModelSerializer):
     
     def get_image_url(self, obj):
         """Get absolute URL for package image."""
-        request = self.context.get('request')
-        if obj.image and request:
-            url = obj.image.url
-            if url.startswith('http://') or url.startswith('https://'):
-                return url
-            return request.build_absolute_uri(url)
-        return None
+        return media_url(obj.image, self.context.get('request'))
+    
+    def get_image_srcset(self, obj):
+        """Responsive derivative URLs for the package image."""
+        return build_srcset(obj.image, self.context.get('request'))
 
 
 class TrainingEnquirySerializer(serializers.ModelSerializer):
@@ -20,12 +20,23 @@ apiClient.interceptors.request.use((config) => {
   if (token) {
     config.headers.Authorization = `Token ${token}`;
   }
+  // Guest cart id, for when the cart cookie is not sent (cross-origin dev setups)
+  const cartId = localStorage.getItem('cartId');
+  if (cartId) {
+    config.headers['X-Cart-Id'] = cartId;
+  }
   return config;
 });
 
 // Handle response errors
 apiClient.interceptors.response.use(
-  (response) => response,
+  (response) => {
+    const cartId = response.headers['x-cart-id'];
+    if (cartId) {
+      localStorage.setItem('cartId', cartId);
+    }
+    return response;
+  },
   (error) => {
     if (error.response?.status === 401) {
       localStorage.removeItem('authToken');
@@ -3,8 +3,14 @@ import apiClient from './client';
 import {
   MenuItem,
   MenuCategory,
+  MenuFacets,
+  MenuAutocompleteSuggestion,
+  MenuItemReviewPage,
   Cart,
+  CartOperation,
   Order,
+  OrderQuote,
+  OrderTracking,
   User,
   UserProfile,
   AuthResponse,
@@ -45,15 +51,30 @@ export const menuAPI = {
     apiClient.get<PaginatedResponse<MenuCategory>>('/menu/categories/'),
   getMenuItems: (params?: Record<string, any>) =>
     apiClient.get<PaginatedResponse<MenuItem>>('/menu/items/', { params }),
+  autocomplete: (q: string, limit = 8) =>
+    apiClient.get<{ query: string; results: MenuAutocompleteSuggestion[] }>('/menu/autocomplete/', { params: { q, limit } }),
+  getMenuFacets: (params?: Record<string, any>) =>
+    apiClient.get<MenuFacets>('/menu/items/facets/', { params }),
+  getPopularItems: (params?: { window?: 7 | 30 | 90; category?: number | string; limit?: number }) =>
+    apiClient.get<{ window: number; results: (MenuItem & { quantity_sold: number })[] }>('/menu/items/popular/', { params }),
   getMenuItemDetail: (id: number) =>
-    apiClient.get<MenuItem>(`/menu/items/${id}/`),
+    apiClient.get<MenuItem>(`/menu/items/${id}/`, { params: { expand: 'images,reviews' } }),
+  getMenuItemsBulk: (ids: number[]) =>
+    apiClient.get<{ results: MenuItem[]; missing: number[]; unavailable: number[] }>('/menu/items/bulk/', {
+      params: { ids: ids.join(',') },
+    }),
+  getPairsWith: (menuItemId: number, params?: { limit?: number }) =>
+    apiClient.get<(MenuItem & { lift: number })[]>(`/menu/items/${menuItemId}/pairs_with/`, { params }),
+  getReviews: (menuItemId: number, params?: { sort?: 'recent' | 'top'; page_size?: number; cursor?: string }) =>
+    apiClient.get<MenuItemReviewPage>(`/menu/items/${menuItemId}/reviews/`, { params }),
   addReview: (menuItemId: number, data: { rating: number; title: string; comment: string }) =>
     apiClient.post(`/menu/items/${menuItemId}/add_review/`, data),
 };
 
 // Cart APIs
 export const cartAPI = {
-  getCart: () => apiClient.get<Cart>('/orders/cart/list_cart/'),
+  getCart: () => apiClient.get<Cart>('/orders/cart/list_cart/', { params: { expand: 'items.menu_item' } }),
+  getSummary: () => apiClient.get<{ item_count: number; total: number }>('/orders/cart/summary/'),
   addItem: (data: { menu_item_id: number; quantity: number; special_instructions?: string }) =>
     apiClient.post('/orders/cart/add_item/', data),
   updateItem: (data: { cart_item_id: number; quantity: number }) =>
@@ -61,18 +82,26 @@ export const cartAPI = {
   removeItem: (cartItemId: number) =>
     apiClient.delete('/orders/cart/remove_item/', { data: { cart_item_id: cartItemId } }),
   clearCart: () => apiClient.post('/orders/cart/clear_cart/'),
+  batch: (operations: CartOperation[]) =>
+    apiClient.post<Cart>('/orders/cart/batch/', { operations }, { params: { expand: 'items.menu_item' } }),
+  getCompleteMeal: () =>
+    apiClient.get<(MenuItem & { score: number })[]>('/orders/cart/complete_meal/'),
 };
 
 // Order APIs
 export const orderAPI = {
-  createOrder: (data: any) =>
-    apiClient.post<Order>('/orders/create_order/', data),
+  createOrder: (data: any, idempotencyKey?: string) =>
+    apiClient.post<Order>('/orders/create_order/', data, {
+      headers: idempotencyKey ? { 'Idempotency-Key': idempotencyKey } : undefined,
+    }),
+  getQuote: (params?: { shipping_city?: string; shipping_state?: string; shipping_country?: string; coupon_code?: string }) =>
+    apiClient.get<OrderQuote>('/orders/quote/', { params }),
   getOrders: () =>
     apiClient.get<PaginatedResponse<Order>>('/orders/'),
   getOrderDetail: (id: number) =>
-    apiClient.get<Order>(`/orders/${id}/`),
+    apiClient.get<Order>(`/orders/${id}/`, { params: { expand: 'items' } }),
   trackOrder: (id: number) =>
-    apiClient.get<{ status: string; tracking_number: string }>(`/orders/${id}/tracking/`),
+    apiClient.get<OrderTracking>(`/orders/${id}/tracking/`),
 };
 
 // Blog APIs
@@ -80,7 +109,7 @@ export const blogAPI = {
   getPosts: (params?: Record<string, any>) =>
     apiClient.get<PaginatedResponse<BlogPost>>('/blog/posts/', { params }),
   getPostDetail: (slug: string) =>
-    apiClient.get<BlogPost>(`/blog/posts/${slug}/`),
+    apiClient.get<BlogPost>(`/blog/posts/${slug}/`, { params: { expand: 'comments' } }),
   likePost: (slug: string) =>
     apiClient.post(`/blog/posts/${slug}/like/`),
   unlikePost: (slug: string) =>
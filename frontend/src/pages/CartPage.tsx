@@ -1,9 +1,11 @@
-import React, { useEffect } from 'react';
+import React, { useEffect, useState } from 'react';
 import { Link, useNavigate } from 'react-router-dom';
 import { Trash2, Plus, Minus, ShoppingCart, ArrowRight } from 'lucide-react';
 import { motion } from 'framer-motion';
 import { useCartStore } from '../stores/cartStore';
 import { useAuthStore } from '../stores/authStore';
+import { orderAPI } from '../api';
+import { OrderQuote } from '../types';
 
 const CartPage: React.FC = () => {
   const navigate = useNavigate();
@@ -18,10 +20,17 @@ const CartPage: React.FC = () => {
     fetchCart();
   }, [fetchCart]);
 
-  const subtotal = cart?.items.reduce((sum, item) => sum + (item.price_at_add || item.menu_item.price) * item.quantity, 0) || 0;
-  const deliveryFee = 4000; // Fixed or dynamic based on location
-  const tax = subtotal * 0.075; // 7.5% tax
-  const total = subtotal + deliveryFee + tax;
+  // Server-side totals; the local estimate only shows until the quote arrives
+  const [quote, setQuote] = useState<OrderQuote | null>(null);
+  useEffect(() => {
+    if (!cart || cart.items.length === 0) return;
+    orderAPI.getQuote().then((response) => setQuote(response.data)).catch(() => setQuote(null));
+  }, [cart]);
+
+  const subtotal = quote?.subtotal ?? (cart?.items.reduce((sum, item) => sum + (item.price_at_add || item.menu_item.price) * item.quantity, 0) || 0);
+  const deliveryFee = quote?.shipping_fee ?? 4000;
+  const tax = quote?.tax ?? subtotal * 0.075;
+  const total = quote?.total ?? subtotal + deliveryFee + tax;
 
   if (!cart || cart.items.length === 0) {
     return (
@@ -183,7 +192,7 @@ const CartPage: React.FC = () => {
                   </span>
                 </div>
                 <div className="flex justify-between text-gray-700">
-                  <span>Tax (7.5%)</span>
+                  <span>Tax ({((quote?.tax_rate ?? 0.075) * 100).toLocaleString()}%)</span>
                   <span className="font-semibold">
                     ₦{tax.toLocaleString()}
                   </span>
@@ -1,10 +1,11 @@
-import React, { useState } from 'react';
+import React, { useEffect, useMemo, useState } from 'react';
 import { useNavigate } from 'react-router-dom';
 import { AlertCircle, MapPin } from 'lucide-react';
 import { useCartStore } from '../stores/cartStore';
 import { useAuthStore } from '../stores/authStore';
 import { orderAPI } from '../api';
 import apiClient from '../api/client';
+import { OrderQuote } from '../types';
 
 const CheckoutPage: React.FC = () => {
   const navigate = useNavigate();
@@ -23,10 +24,23 @@ const CheckoutPage: React.FC = () => {
     postal_code: '',
   });
 
-  const subtotal = cart?.items.reduce((sum, item) => sum + (item.price_at_add || item.menu_item.price) * item.quantity, 0) || 0;
-  const deliveryFee = 4000;
-  const tax = subtotal * 0.075;
-  const total = subtotal + deliveryFee + tax;
+  // Exact totals for the entered address, from the same pricing rules create_order charges
+  const [quote, setQuote] = useState<OrderQuote | null>(null);
+  useEffect(() => {
+    if (!cart || cart.items.length === 0) return;
+    orderAPI.getQuote({ shipping_city: shippingInfo.city, shipping_state: shippingInfo.state, shipping_country: 'Nigeria' })
+      .then((response) => setQuote(response.data))
+      .catch(() => setQuote(null));
+  }, [cart, shippingInfo.city, shippingInfo.state]);
+
+  const subtotal = quote?.subtotal ?? (cart?.items.reduce((sum, item) => sum + (item.price_at_add || item.menu_item.price) * item.quantity, 0) || 0);
+  const deliveryFee = quote?.shipping_fee ?? 4000;
+  const tax = quote?.tax ?? subtotal * 0.075;
+  const total = quote?.total ?? subtotal + deliveryFee + tax;
+
+  // One key per cart + shipping details: a double submit or a retry replays
+  // the first order instead of creating another
+  const idempotencyKey = useMemo(() => crypto.randomUUID(), [cart, shippingInfo]);
 
   const handleInputChange = (e: React.ChangeEvent<HTMLInputElement>) => {
     const { name, value } = e.target;
@@ -60,7 +74,7 @@ const CheckoutPage: React.FC = () => {
         payment_method: 'paystack',
       };
 
-      const orderResponse = await orderAPI.createOrder(orderData);
+      const orderResponse = await orderAPI.createOrder(orderData, idempotencyKey);
       const order = orderResponse.data;
 
       // Initialize Paystack payment
@@ -68,7 +82,7 @@ const CheckoutPage: React.FC = () => {
         const paymentResponse = await apiClient.post('/payments/initialize/', {
           order_id: order.id,
           email: shippingInfo.email,
-        });
+        }, { headers: { 'Idempotency-Key': `${idempotencyKey}:payment` } });
 
         if (paymentResponse.data.authorization_url) {
           // Redirect to Paystack payment page
@@ -253,7 +267,7 @@ const CheckoutPage: React.FC = () => {
                   <span>₦{deliveryFee.toLocaleString()}</span>
                 </div>
                 <div className="flex justify-between">
-                  <span className="text-gray-600">Tax (7.5%)</span>
+                  <span className="text-gray-600">Tax ({((quote?.tax_rate ?? 0.075) * 100).toLocaleString()}%)</span>
                   <span>₦{tax.toLocaleString()}</span>
                 </div>
                 <div className="border-t pt-3 flex justify-between font-bold text-lg">
@@ -214,9 +214,9 @@ const MenuItemDetailPage: React.FC = () => {
                   <span className="text-lg font-semibold text-gray-700">
                     {item.average_rating.toFixed(1)}
                   </span>
-                  {item.reviews && item.reviews.length > 0 && (
+                  {!!item.rating_count && (
                     <span className="text-gray-500">
-                      ({item.reviews.length} {item.reviews.length === 1 ? 'review' : 'reviews'})
+                      ({item.rating_count} {item.rating_count === 1 ? 'review' : 'reviews'})
                     </span>
                   )}
                 </motion.div>
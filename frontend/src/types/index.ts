@@ -76,11 +76,52 @@ export interface MenuItem {
   is_available: boolean;
   is_featured: boolean;
   average_rating?: number;
+  rating_count?: number;
+  rating_histogram?: Record<string, number>;
   created_at: string;
   images?: MenuItemImage[];
   reviews?: MenuItemReview[];
 }
 
+export interface MenuAutocompleteSuggestion {
+  type: 'item' | 'category' | 'ingredient';
+  id: number;
+  label: string;
+  slug: string;
+  fuzzy: boolean;
+}
+
+export interface MenuItemReviewPage {
+  next: string | null;
+  results: MenuItemReview[];
+  rating_count: number;
+  average_rating: number | null;
+  histogram: Record<string, number>;
+}
+
+export interface MenuFacetCategory {
+  id: number;
+  name: string;
+  slug: string;
+  count: number;
+}
+
+export interface MenuFacetBucket {
+  key: string;
+  min: number | null;
+  max: number | null;
+  count: number;
+}
+
+export interface MenuFacets {
+  total: number;
+  category: MenuFacetCategory[];
+  categories: MenuFacetCategory[];
+  is_featured: { true: number; false: number };
+  price: MenuFacetBucket[];
+  prep_time: MenuFacetBucket[];
+}
+
 export interface CartItem {
   id: number;
   menu_item: MenuItem;
@@ -92,13 +133,18 @@ export interface CartItem {
 }
 
 export interface Cart {
-  id: number;
+  id: number | null;
   items: CartItem[];
   total: number;
   item_count: number;
   updated_at: string;
 }
 
+export type CartOperation =
+  | { op: 'add'; menu_item_id: number; quantity?: number; special_instructions?: string }
+  | { op: 'update'; cart_item_id: number; quantity: number }
+  | { op: 'remove'; cart_item_id: number };
+
 export interface OrderItem {
   id: number;
   item_name: string;
@@ -118,6 +164,7 @@ export interface Order {
   shipping_fee: number;
   tax: number;
   discount: number;
+  coupon_code?: string;
   total: number;
   shipping_city: string;
   delivery_date?: string;
@@ -128,6 +175,29 @@ export interface Order {
   created_at: string;
 }
 
+export interface OrderTracking {
+  order_number: string;
+  status: string;
+  tracking_number: string;
+  delivery_date: string | null;
+  current_location: string;
+  timeline: { status: string; label: string; location: string; note: string; at: string }[];
+}
+
+// GET /orders/quote/ sends money as JSON numbers (tax_rate as a fraction), unlike Order
+export interface OrderQuote {
+  item_count: number;
+  subtotal: number;
+  shipping_fee: number;
+  tax: number;
+  tax_rate: number;
+  discount: number;
+  total: number;
+  coupon_code: string;
+  coupon_error: string | null;
+  destination: string | null;
+}
+
 export interface MealPlan {
   id: number;
   title: string;